@@ -5,18 +5,16 @@ __author__ = 'Marko Milutinovic'
 This class will implement an Arithmetic Coding decoder
 """
 
-import array
 import utils
-import math
+from FrequencyModel import FrequencyModel
+from BitStream import BitReader
 
 class ARDecoder:
-    BITS_IN_BYTE = 8
-
     def __init__(self, wordSize_, vocabularySize_, terminationSymbol_):
         """
         Initialize the object
 
-        :param wordSize_: The word size (bits) that will be used for compression. Must be greater than 2 and less than 16
+        :param wordSize_: The word size (bits) that will be used for compression. Must be greater than 2 and less than or equal to 62
         :param: vocabularySize_: The size of the vocabulary. Symbols run rom 0 to (vocabularySize -1)
         :param terminationSymbol_: Symbol which indicates the end of encoded data where decoding should stop. This is required to properly terminate decoding
         :return: None
@@ -38,8 +36,13 @@ class ARDecoder:
         for i in range(0, self.mWordSize):
             self.mWordBitMask = (self.mWordBitMask << 1) | 0x0001
 
-        # We are initializing with an assumption of a value of 1 for the count of each symbol.
-        self.mSymbolCount = array.array('i', [1]*self.mVocabularySize)
+        # We are initializing with an assumption of a value of 1 for the count of each symbol. The counts are kept in a
+        # binary indexed tree, mSymbolCount holds the individual symbol counts of the model
+        self.mFrequencyModel = FrequencyModel(self.mVocabularySize)
+        self.mSymbolCount = self.mFrequencyModel.mSymbolCount
+
+        # The encoded bits are read through the bit reader which loads several bytes of encoded data at a time
+        self.mBitReader = BitReader()
 
         # Reset member variables that are not constant
         self.reset()
@@ -54,8 +57,6 @@ class ARDecoder:
         self.mEncodedDataCount = 0                                              # Number of encoded bytes that we are un-compressing
         self.mDecodedData = None                                                # Holds the data being decoded
         self.mDecodedDataLen = 0                                                # The number of symbols that have been decoded
-        self.mCurrentEncodedDataByteIndex = 0                                   # Index of the encoded data with are currently working with
-        self.mCurrentEncodedDataBit = 0                                         # The current bit of the current byte we are using from the encoded data bytearray
         self.mTotalSymbolCount = self.mVocabularySize                           # The total number of symbols encountered
 
         self.mLowerTag = 0                                                      # The lower tag threshold
@@ -63,30 +64,9 @@ class ARDecoder:
         self.mCurrentTag = 0                                                    # The current tag we are processing
 
         # We are initializing with an assumption of a value of 1 for the count of each symbol
-        for i in range(0,self.mVocabularySize):
-            self.mSymbolCount[i] = 1
-
-    def _get_next_bit(self):
-        """
-        Get the next bit from encoded data (MSB first). If we move past the current byte move index over to the next one.
-        Once there is no more data return None
-
-        :return: next bit value or None if there is no more data
-        """
-
-        if(self.mCurrentEncodedDataByteIndex >= self.mEncodedDataCount):
-            raise Exception("Exceeded encoded data buffer")
-
-        bitValue = (self.mEncodedData[self.mCurrentEncodedDataByteIndex] >> (self.BITS_IN_BYTE - 1 - self.mCurrentEncodedDataBit)) & 0x0001
-
-        self.mCurrentEncodedDataBit += 1
+        self.mFrequencyModel.reset()
 
-        # If we have used all the bits in the current byte, move to the next byte
-        if(self.mCurrentEncodedDataBit == self.BITS_IN_BYTE):
-            self.mCurrentEncodedDataByteIndex += 1
-            self.mCurrentEncodedDataBit = 0
-
-        return bitValue
+        self.mBitReader.attach(None, 0)
 
     def _increment_count(self, indexToIncrement_):
         """
@@ -97,7 +77,7 @@ class ARDecoder:
         :return: None
         """
 
-        self.mSymbolCount[indexToIncrement_] += 1
+        self.mFrequencyModel.increment(indexToIncrement_)
         self.mTotalSymbolCount += 1
 
         # If we have reached the max number of bytes, we need to normalize the stats to allow us to continue
@@ -113,33 +93,30 @@ class ARDecoder:
                 Shift out MSB for both and shift in 1 for upper tag and 0 for lower tag. Shift the current tag to left by 1 and move in next bit
             E3: the upper and lower tag interval lies in the middle [0.25, 0.75). The second MSB of upper tag is 0 and the second bit of the lower tag is 1.
                 Complement second MSB bit of both and shift in 1 for upper tag and 0 for lower tag. Complement second MSB of the current tag, shift to the left by 1 and move in the next bit
+        All the E1/E2 scalings are performed in one step by counting the leading bits that are the same on both tags, followed
+        by all the E3 scalings in one step.
         :return:None
         """
-        sameMSB = ((self.mLowerTag & self.mWordMSBMask) == (self.mUpperTag & self.mWordMSBMask))
-        valueMSB = ((self.mLowerTag & self.mWordMSBMask) >> (self.mWordSize -1)) & 0x0001
-        tagRangeInMiddle = (((self.mUpperTag & self.mWordSecondMSBMask) == 0) and ((self.mLowerTag & self.mWordSecondMSBMask) == self.mWordSecondMSBMask))
-
-
-        while(sameMSB or tagRangeInMiddle):
-
-            # If the first bit is the same we need to perform E1 or E2 scaling. The same set of steps applies to both. If the range is in the middle we need to perform E3 scaling
-            if(sameMSB):
-                self.mLowerTag = (self.mLowerTag << 1) & self.mWordBitMask
-                self.mUpperTag = ((self.mUpperTag << 1) | 0x0001) & self.mWordBitMask
-                self.mCurrentTag = ((self.mCurrentTag << 1) | self._get_next_bit()) & self.mWordBitMask
-
-            elif(tagRangeInMiddle):
-                self.mLowerTag = (self.mLowerTag << 1) & self.mWordBitMask
-                self.mUpperTag = (self.mUpperTag << 1) & self.mWordBitMask
-                self.mCurrentTag = ((self.mCurrentTag << 1) | self._get_next_bit()) & self.mWordBitMask
-
-                self.mLowerTag = ((self.mLowerTag & (~self.mWordMSBMask)) | ((~self.mLowerTag) & self.mWordMSBMask))
-                self.mUpperTag = ((self.mUpperTag & (~self.mWordMSBMask)) | ((~self.mUpperTag) & self.mWordMSBMask))
-                self.mCurrentTag = ((self.mCurrentTag & (~self.mWordMSBMask)) | ((~self.mCurrentTag) & self.mWordMSBMask))
-
-            sameMSB = ((self.mLowerTag & self.mWordMSBMask) == (self.mUpperTag & self.mWordMSBMask))
-            valueMSB = ((self.mLowerTag & self.mWordMSBMask) >> (self.mWordSize -1)) & 0x0001
-            tagRangeInMiddle = (((self.mUpperTag & self.mWordSecondMSBMask) == 0) and ((self.mLowerTag & self.mWordSecondMSBMask) == self.mWordSecondMSBMask))
+        # The number of leading bits that are the same on both tags is the number of E1/E2 scalings required
+        sameBitCount = self.mWordSize - (self.mLowerTag ^ self.mUpperTag).bit_length()
+
+        if(sameBitCount > 0):
+            self.mLowerTag = (self.mLowerTag << sameBitCount) & self.mWordBitMask
+            self.mUpperTag = ((self.mUpperTag << sameBitCount) | ((1 << sameBitCount) - 1)) & self.mWordBitMask
+            self.mCurrentTag = ((self.mCurrentTag << sameBitCount) | self.mBitReader.readBits(sameBitCount)) & self.mWordBitMask
+
+        # The MSBs now differ. The number of E3 scalings is the number of bits after the MSB where the lower tag is 1 and
+        # the upper tag is 0
+        belowMSBMask = self.mWordBitMask >> 1
+        lowerOnesCount = (self.mWordSize - 1) - ((~self.mLowerTag) & belowMSBMask).bit_length()
+        upperZerosCount = (self.mWordSize - 1) - (self.mUpperTag & belowMSBMask).bit_length()
+        e3ScaleCount = min(lowerOnesCount, upperZerosCount)
+
+        if(e3ScaleCount > 0):
+            # Only the complement of the final MSB remains after the bits following the MSB are shifted out
+            self.mLowerTag = (self.mLowerTag << e3ScaleCount) & belowMSBMask
+            self.mUpperTag = ((self.mUpperTag << e3ScaleCount) & self.mWordBitMask) | self.mWordMSBMask
+            self.mCurrentTag = (((self.mCurrentTag << e3ScaleCount) | self.mBitReader.readBits(e3ScaleCount)) & self.mWordBitMask) ^ self.mWordMSBMask
 
     def _update_range_tags(self, currentSymbolIndex_, cumulativeCountSymbol_):
         """
@@ -155,8 +132,9 @@ class ARDecoder:
         rangeDiff = prevUpperTag - prevLowerTag
         cumulativeCountPrevSymbol = cumulativeCountSymbol_ - self.mSymbolCount[currentSymbolIndex_]
 
-        self.mLowerTag = int((prevLowerTag + math.floor(((rangeDiff + 1)*cumulativeCountPrevSymbol))/self.mTotalSymbolCount))
-        self.mUpperTag = int((prevLowerTag + math.floor(((rangeDiff + 1)*cumulativeCountSymbol_))/self.mTotalSymbolCount - 1))
+        # Use integer floor division so the tags are exact for any word size
+        self.mLowerTag = prevLowerTag + ((rangeDiff + 1)*cumulativeCountPrevSymbol)//self.mTotalSymbolCount
+        self.mUpperTag = prevLowerTag + ((rangeDiff + 1)*cumulativeCountSymbol_)//self.mTotalSymbolCount - 1
 
         self._increment_count(currentSymbolIndex_)
 
@@ -168,19 +146,144 @@ class ARDecoder:
         :return: None
         """
 
-        self.mTotalSymbolCount = 0
+        self.mTotalSymbolCount = self.mFrequencyModel.normalize()
+
+    def _decode_symbols(self, maxDecodedDataLen_):
+        """
+        Decode symbols until the termination symbol is reached. This performs the same steps as the symbol search,
+        _update_range_tags, _increment_count and _rescale for every symbol but keeps the tags, statistics and bit reader
+        state in local variables. The member variables are only updated once decoding is finished
+
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in mDecodedData array
+        :return: None
+        """
+
+        wordSize = self.mWordSize
+        wordBitMask = self.mWordBitMask
+        wordMSBMask = self.mWordMSBMask
+        wordSecondMSBMask = self.mWordSecondMSBMask
+        belowMSBMask = wordBitMask >> 1
+        maxTotalSymbolCount = self.mMaxDecodingBytes
+        terminationSymbol = self.mTerminationSymbol
+        vocabularySize = self.mVocabularySize
+        frequencyModel = self.mFrequencyModel
+        symbolCount = self.mSymbolCount
+        tree = frequencyModel.mTree
+        searchMask = frequencyModel.mSearchMask
+        decodedData = self.mDecodedData
+        bitReader = self.mBitReader
+        encodedData = bitReader.mBuffer
+        encodedDataLen = bitReader.mLength
+        accumulatorBytes = bitReader.ACCUMULATOR_BYTES
+
+        lowerTag = self.mLowerTag
+        upperTag = self.mUpperTag
+        currentTag = self.mCurrentTag
+        totalSymbolCount = self.mTotalSymbolCount
+        decodedDataLen = self.mDecodedDataLen
+        bitAccumulator = bitReader.mAccumulator
+        bitCount = bitReader.mBitCount
+        byteIndex = bitReader.mByteIndex
+
+        finished = False
+
+        # Until we have reached the end keep decompressing
+        while(not finished):
+            currentCumulativeCount = ((currentTag - lowerTag + 1)*totalSymbolCount - 1)//(upperTag - lowerTag + 1)
+
+            # Search the frequency model tree for the symbol whose cumulative count range holds the current cumulative count
+            currentSymbol = 0
+            remainingCount = currentCumulativeCount
+            mask = searchMask
+
+            while(mask > 0):
+                index = currentSymbol + mask
+
+                if((index <= vocabularySize) and (tree[index] <= remainingCount)):
+                    currentSymbol = index
+                    remainingCount -= tree[index]
+
+                mask >>= 1
+
+            if(currentSymbol >= vocabularySize):
+                raise Exception("Symbol count of out range")
+
+            # If we have reached the termination symbol then decoding is finished, otherwise store the decompressed symbol
+            if(currentSymbol == terminationSymbol):
+                finished = True
+            else:
+                if(decodedDataLen >= maxDecodedDataLen_):
+                    raise Exception('Not enough space to store decoded data')
+
+                decodedData[decodedDataLen] = currentSymbol
+                decodedDataLen += 1
+
+            # Update the range tags. The remaining count is the offset into the symbol's range, the rest is the
+            # cumulative count of the symbols before it
+            cumulativeCountPrevSymbol = currentCumulativeCount - remainingCount
+            currentSymbolCount = symbolCount[currentSymbol]
+            rangeWidth = upperTag - lowerTag + 1
+            upperTag = lowerTag + (rangeWidth*(cumulativeCountPrevSymbol + currentSymbolCount))//totalSymbolCount - 1
+            lowerTag = lowerTag + (rangeWidth*cumulativeCountPrevSymbol)//totalSymbolCount
+
+            # Update the statistics
+            symbolCount[currentSymbol] = currentSymbolCount + 1
+            index = currentSymbol + 1
+
+            while(index <= vocabularySize):
+                tree[index] += 1
+                index += index & (-index)
+
+            totalSymbolCount += 1
+
+            if(totalSymbolCount >= maxTotalSymbolCount):
+                totalSymbolCount = frequencyModel.normalize()
+
+            # E1/E2 scaling for all the leading bits that are the same on both tags
+            sameBitCount = wordSize - (lowerTag ^ upperTag).bit_length()
+
+            if(sameBitCount > 0):
+                lowerTag = (lowerTag << sameBitCount) & wordBitMask
+                upperTag = ((upperTag << sameBitCount) | ((1 << sameBitCount) - 1)) & wordBitMask
+
+            # E3 scaling for all the bits after the MSB where the lower tag is 1 and the upper tag is 0
+            scaleCount = 0
+
+            if((lowerTag & wordSecondMSBMask) and not (upperTag & wordSecondMSBMask)):
+                scaleCount = min((wordSize - 1) - ((~lowerTag) & belowMSBMask).bit_length(), (wordSize - 1) - (upperTag & belowMSBMask).bit_length())
+
+                lowerTag = (lowerTag << scaleCount) & belowMSBMask
+                upperTag = ((upperTag << scaleCount) & wordBitMask) | wordMSBMask
+
+            # The current tag takes in one bit for every scaling. Only the last E3 scaling complement of the MSB remains
+            shiftCount = sameBitCount + scaleCount
+
+            if(shiftCount > 0):
+                if(bitCount < shiftCount):
+                    loadByteCount = min(max(accumulatorBytes, (shiftCount - bitCount + 7) >> 3), encodedDataLen - byteIndex)
 
-        # Go through all the entries in the cumulative count array
-        for i in range(0, self.mVocabularySize):
+                    if(((loadByteCount*8) + bitCount) < shiftCount):
+                        raise Exception("Exceeded encoded data buffer")
 
-            value = int(self.mSymbolCount[i]/2)
+                    bitAccumulator = (bitAccumulator << (loadByteCount*8)) | int.from_bytes(encodedData[byteIndex:byteIndex + loadByteCount], 'big')
+                    byteIndex += loadByteCount
+                    bitCount += loadByteCount*8
 
-            # Ensure the count is at least 1
-            if(value == 0):
-                value = 1
+                bitCount -= shiftCount
+                currentTag = ((currentTag << shiftCount) | (bitAccumulator >> bitCount)) & wordBitMask
+                bitAccumulator &= (1 << bitCount) - 1
 
-            self.mSymbolCount[i] = value
-            self.mTotalSymbolCount += value
+                if(scaleCount > 0):
+                    currentTag ^= wordMSBMask
+
+        self.mLowerTag = lowerTag
+        self.mUpperTag = upperTag
+        self.mCurrentTag = currentTag
+        self.mTotalSymbolCount = totalSymbolCount
+        self.mDecodedDataLen = decodedDataLen
+        bitReader.mAccumulator = bitAccumulator
+        bitReader.mBitCount = bitCount
+        bitReader.mByteIndex = byteIndex
 
     def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_):
         """
@@ -207,43 +310,12 @@ class ARDecoder:
         self.mEncodedDataCount = encodedDataLen_
         self.mDecodedData = decodedData_
         self.mDecodedDataLen = 0
-        self.mCurrentEncodedDataByteIndex = 0
-        self.mCurrentEncodedDataBit = 0
-        self.mCurrentTag = 0
+        self.mBitReader.attach(encodedData_, encodedDataLen_)
 
         # Load the first word size bits into the current tag
-        for i in range(0, self.mWordSize):
-            self.mCurrentTag = (self.mCurrentTag | (self._get_next_bit() << ((self.mWordSize - 1) - i)))
-
-        finished = False
+        self.mCurrentTag = self.mBitReader.readBits(self.mWordSize)
 
         # Until we have reached the end keep decompressing
-        while(not finished):
-            currentSymbol = 0
-            currentCumulativeCount = int(math.floor(((self.mCurrentTag - self.mLowerTag + 1)*self.mTotalSymbolCount - 1)/(self.mUpperTag - self.mLowerTag +1)))
-
-            symbolCumulativeCount = self.mSymbolCount[0]
-
-            while(currentCumulativeCount >= symbolCumulativeCount):
-                currentSymbol += 1
-
-                if(currentSymbol >= self.mVocabularySize):
-                    raise Exception("Symbol count of out range")
-
-                symbolCumulativeCount += self.mSymbolCount[currentSymbol]
-
-            # If we have reached the termination symbol then decoding is finished, otherwise store the decompressed symbol
-            if(currentSymbol == self.mTerminationSymbol):
-                finished = True
-            else:
-                self.mDecodedData[self.mDecodedDataLen] = currentSymbol
-                self.mDecodedDataLen += 1
-
-                # If there is no more room extend the bytearray by BASE_OUT_SIZE bytes
-                if(self.mDecodedDataLen >= maxDecodedDataLen_):
-                    raise Exception('Not enough space to store decoded data')
-
-            self._update_range_tags(currentSymbol, symbolCumulativeCount)
-            self._rescale()
+        self._decode_symbols(maxDecodedDataLen_)
 
         return self.mDecodedDataLen
\ No newline at end of file
@@ -4,16 +4,16 @@ __author__ = 'Marko Milutinovic'
 This class will implement an Arithmetic Coding encoder
 """
 
-import array
 import utils
-import math
+from FrequencyModel import FrequencyModel
+from BitStream import BitWriter
 
 class AREncoder:
     def __init__(self, wordSize_, vocabularySize_):
         """
-        Initialize the object. The word size must be greater than 2 and less than or equal to 16
+        Initialize the object. The word size must be greater than 2 and less than or equal to 62
 
-        :param wordSize_: The word size (bits) that will be used for encoding. Must be greater than 2 and less than or equal to 16
+        :param wordSize_: The word size (bits) that will be used for encoding. Must be greater than 2 and less than or equal to 62
         :param vocabularySize_: The size of the vocabulary. Symbols run from 0 to (vocabularySize_ - 1)
         :return:
         """
@@ -32,8 +32,13 @@ class AREncoder:
         for i in range(0, self.mWordSize):
             self.mWordBitMask = (self.mWordBitMask << 1) | 0x0001
 
-        # We are initializing with an assumption of a value of 1 for the count of each symbol.
-        self.mSymbolCount = array.array('i', [1]*self.mVocabularySize)
+        # We are initializing with an assumption of a value of 1 for the count of each symbol. The counts are kept in a
+        # binary indexed tree, mSymbolCount holds the individual symbol counts of the model
+        self.mFrequencyModel = FrequencyModel(self.mVocabularySize)
+        self.mSymbolCount = self.mFrequencyModel.mSymbolCount
+
+        # The encoded bits are buffered by the bit writer before they are stored in the encoded data byte array
+        self.mBitWriter = BitWriter()
 
         # Reset all the member variables on which encoding is based on
         self.reset()
@@ -46,46 +51,19 @@ class AREncoder:
         """
 
         self.mEncodedData = None
-        self.mMaxEncodedDataLen = 0                                                # The max number of bytes that can be stored in mEncodedData
         self.mEncodedDataCount = int(0)                                            # The number of bytes compressed data is taking up
         self.mTotalSymbolCount = self.mVocabularySize                              # The total number of symbols encountered
         self.mE3ScaleCount = 0                                                     # Holds the number of E3 mappings currently outstanding
-        self.mCurrentBitCount = 0                                                  # The current number of bits loaded onto the mCurrentByte variable
+
+        self.mBitWriter.attach(None, 0)
 
         # We are initializing with an assumption of a value of 1 for the count of each symbol
-        for i in range(0,self.mVocabularySize):
-            self.mSymbolCount[i] = 1
+        self.mFrequencyModel.reset()
 
         # Initialize the range tags to min and max
         self.mLowerTag = 0
         self.mUpperTag = self.mWordBitMask
 
-    def _append_bit(self, bitValue_):
-        """
-        Take the incoming bit and append it to the mCurrentByte. Once 8 bits have been appended move to the next
-        index of the compressed data array
-
-        :param bitValue: The bit to be appended to the current outstanding compression byte
-        :return: None
-        """
-
-        # Store the current bit onto the pending byte
-        self.mEncodedData[self.mEncodedDataCount] = ((self.mEncodedData[self.mEncodedDataCount] << 1) | bitValue_) & 0xFF
-
-        # Increment the count of bits stored
-        self.mCurrentBitCount += 1
-
-        # If max number of bits have been appended, move to compressed data byte array
-        if(self.mCurrentBitCount == 8):
-            self.mEncodedDataCount += 1
-
-            # If there is no more room throw exception
-            if(self.mEncodedDataCount >= self.mMaxEncodedDataLen):
-                raise Exception('Out of space')
-
-            self.mCurrentBitCount = 0
-            self.mEncodedData[self.mEncodedDataCount] = int(0)
-
     def _increment_count(self, indexToIncrement_):
         """
         Update the count for the provided index. Update
@@ -95,7 +73,7 @@ class AREncoder:
         :return: None
         """
 
-        self.mSymbolCount[indexToIncrement_] += 1
+        self.mFrequencyModel.increment(indexToIncrement_)
         self.mTotalSymbolCount += 1
 
         # If we have reached the max number of bytes, we need to normalize the stats to allow us to continue
@@ -111,40 +89,42 @@ class AREncoder:
                 Shift out MSB for both and shift in 1 for upper tag and 0 for lower tag
             E3: the upper and lower tag interval lies in the middle [0.25, 0.75). The second MSB of upper tag is 0 and the second bit of the lower tag is 1.
                 Complement second MSB bit of both and shift in 1 for upper tag and 0 for lower tag. Keep track of consecutive E3 scalings
+        All the E1/E2 scalings are performed in one step by counting the leading bits that are the same on both tags, followed
+        by all the E3 scalings in one step.
         :param lowerTag_: The lower tag that will be used to rescale
         :param upperTag_: The upper tag that will be used to rescale
         :return: [lowerTag_, upperTag_] Return the updated lower and upper tags
         """
 
-        sameMSB = ((lowerTag_ & self.mWordMSBMask) == (upperTag_ & self.mWordMSBMask))
-        valueMSB = ((lowerTag_ & self.mWordMSBMask) >> (self.mWordSize -1)) & 0x0001
-        tagRangeInMiddle = (((upperTag_ & self.mWordSecondMSBMask) == 0) and ((lowerTag_ & self.mWordSecondMSBMask) == self.mWordSecondMSBMask))
-
-
-        while(sameMSB or tagRangeInMiddle):
+        # The number of leading bits that are the same on both tags is the number of E1/E2 scalings required
+        sameBitCount = self.mWordSize - (lowerTag_ ^ upperTag_).bit_length()
 
-            # If the first bit is the same we need to perform E1 or E2 scaling. The same set of steps applies to both. If the range is in the middle we need to perform E3 scaling
-            if(sameMSB):
-                self._append_bit(valueMSB)
-                lowerTag_ = (lowerTag_ << 1) & self.mWordBitMask
-                upperTag_ = ((upperTag_ << 1) | 0x0001) & self.mWordBitMask
+        if(sameBitCount > 0):
+            sameBits = lowerTag_ >> (self.mWordSize - sameBitCount)
+            valueMSB = sameBits >> (sameBitCount - 1)
 
-                while(self.mE3ScaleCount > 0):
-                    self._append_bit((~valueMSB) & 0x0001)
-                    self.mE3ScaleCount -= 1
+            # The first bit is followed by the complement of it for every outstanding E3 scaling and then the rest of the same bits
+            self.mBitWriter.writeBits(valueMSB, 1)
+            self.mBitWriter.writeRun(valueMSB ^ 0x01, self.mE3ScaleCount)
+            self.mBitWriter.writeBits(sameBits & ((1 << (sameBitCount - 1)) - 1), sameBitCount - 1)
+            self.mE3ScaleCount = 0
 
-            elif(tagRangeInMiddle):
-                lowerTag_ = (lowerTag_ << 1) & self.mWordBitMask
-                upperTag_ = (upperTag_ << 1) & self.mWordBitMask
+            lowerTag_ = (lowerTag_ << sameBitCount) & self.mWordBitMask
+            upperTag_ = ((upperTag_ << sameBitCount) | ((1 << sameBitCount) - 1)) & self.mWordBitMask
 
-                lowerTag_ = ((lowerTag_ & (~self.mWordMSBMask)) | ((~lowerTag_) & self.mWordMSBMask))
-                upperTag_ = ((upperTag_ & (~self.mWordMSBMask)) | ((~upperTag_) & self.mWordMSBMask))
+        # The MSBs now differ. The number of E3 scalings is the number of bits after the MSB where the lower tag is 1 and
+        # the upper tag is 0
+        belowMSBMask = self.mWordBitMask >> 1
+        lowerOnesCount = (self.mWordSize - 1) - ((~lowerTag_) & belowMSBMask).bit_length()
+        upperZerosCount = (self.mWordSize - 1) - (upperTag_ & belowMSBMask).bit_length()
+        e3ScaleCount = min(lowerOnesCount, upperZerosCount)
 
-                self.mE3ScaleCount += 1
+        if(e3ScaleCount > 0):
+            # Shifting out the bits after the MSB and complementing the MSB leaves the lower tag MSB at 0 and the upper tag MSB at 1
+            lowerTag_ = (lowerTag_ << e3ScaleCount) & belowMSBMask
+            upperTag_ = ((upperTag_ << e3ScaleCount) & self.mWordBitMask) | self.mWordMSBMask
 
-            sameMSB = ((lowerTag_ & self.mWordMSBMask) == (upperTag_ & self.mWordMSBMask))
-            valueMSB = ((lowerTag_ & self.mWordMSBMask) >> (self.mWordSize -1)) & 0x0001
-            tagRangeInMiddle = (((upperTag_ & self.mWordSecondMSBMask) == 0) and ((lowerTag_ & self.mWordSecondMSBMask) == self.mWordSecondMSBMask))
+            self.mE3ScaleCount += e3ScaleCount
 
         return [lowerTag_, upperTag_]
 
@@ -160,15 +140,12 @@ class AREncoder:
         """
 
         rangeDiff = upperTag_ - lowerTag_
-        cumulativeCountSymbol = 0
-
-        for i in range(0, currentSymbol_ + 1):
-            cumulativeCountSymbol += self.mSymbolCount[i]
-
+        cumulativeCountSymbol = self.mFrequencyModel.getCumulativeCount(currentSymbol_)
         cumulativeCountPrevSymbol = cumulativeCountSymbol - self.mSymbolCount[currentSymbol_]
 
-        upperTag_ = int((lowerTag_ + math.floor(((rangeDiff + 1)*cumulativeCountSymbol))/self.mTotalSymbolCount - 1))
-        lowerTag_ = int((lowerTag_ + math.floor(((rangeDiff + 1)*cumulativeCountPrevSymbol))/self.mTotalSymbolCount))
+        # Use integer floor division so the tags are exact for any word size
+        upperTag_ = lowerTag_ + ((rangeDiff + 1)*cumulativeCountSymbol)//self.mTotalSymbolCount - 1
+        lowerTag_ = lowerTag_ + ((rangeDiff + 1)*cumulativeCountPrevSymbol)//self.mTotalSymbolCount
 
         return [lowerTag_, upperTag_]
 
@@ -180,19 +157,114 @@ class AREncoder:
         :return: None
         """
 
-        self.mTotalSymbolCount = 0
+        self.mTotalSymbolCount = self.mFrequencyModel.normalize()
+
+    def _encode_symbols(self, dataToEncode_, dataLen_):
+        """
+        Encode the symbols passed in. This performs the same steps as _update_range_tags, _increment_count and _rescale
+        for every symbol but keeps the tags, statistics and outstanding bits in local variables. The member variables are
+        only updated once all the symbols have been encoded
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :return: None
+        """
+
+        wordSize = self.mWordSize
+        wordBitMask = self.mWordBitMask
+        wordMSBMask = self.mWordMSBMask
+        wordSecondMSBMask = self.mWordSecondMSBMask
+        belowMSBMask = wordBitMask >> 1
+        maxTotalSymbolCount = self.mMaxEncodeBytes
+        vocabularySize = self.mVocabularySize
+        frequencyModel = self.mFrequencyModel
+        symbolCount = self.mSymbolCount
+        tree = frequencyModel.mTree
+        bitWriter = self.mBitWriter
+
+        lowerTag = self.mLowerTag
+        upperTag = self.mUpperTag
+        e3ScaleCount = self.mE3ScaleCount
+        totalSymbolCount = self.mTotalSymbolCount
+        pendingBits = 0
+        pendingBitCount = 0
+
+        for i in range(0, dataLen_):
+            symbol = dataToEncode_[i]
+
+            # Sum the counts of all symbols before the current symbol from the frequency model tree
+            cumulativeCountPrevSymbol = 0
+            index = symbol
+
+            while(index > 0):
+                cumulativeCountPrevSymbol += tree[index]
+                index &= index - 1
+
+            currentSymbolCount = symbolCount[symbol]
+
+            # Update the range tags
+            rangeWidth = upperTag - lowerTag + 1
+            upperTag = lowerTag + (rangeWidth*(cumulativeCountPrevSymbol + currentSymbolCount))//totalSymbolCount - 1
+            lowerTag = lowerTag + (rangeWidth*cumulativeCountPrevSymbol)//totalSymbolCount
+
+            # Update the statistics
+            symbolCount[symbol] = currentSymbolCount + 1
+            index = symbol + 1
+
+            while(index <= vocabularySize):
+                tree[index] += 1
+                index += index & (-index)
+
+            totalSymbolCount += 1
 
-        # Go through all the entries in the cumulative count array
-        for i in range(0, self.mVocabularySize):
+            if(totalSymbolCount >= maxTotalSymbolCount):
+                totalSymbolCount = frequencyModel.normalize()
 
-            value = int(self.mSymbolCount[i]/2)
+            # E1/E2 scaling for all the leading bits that are the same on both tags
+            sameBitCount = wordSize - (lowerTag ^ upperTag).bit_length()
 
-            # Ensure the count is at least 1
-            if(value == 0):
-                value = 1
+            if(sameBitCount > 0):
+                sameBits = lowerTag >> (wordSize - sameBitCount)
 
-            self.mSymbolCount[i] = value
-            self.mTotalSymbolCount += value
+                # The first bit is followed by the complement of it for every outstanding E3 scaling
+                if(e3ScaleCount > 0):
+                    restBitCount = sameBitCount - 1
+                    restBits = sameBits & ((1 << restBitCount) - 1)
+
+                    if((sameBits >> restBitCount) == 0):
+                        sameBits = (((1 << e3ScaleCount) - 1) << restBitCount) | restBits
+                    else:
+                        sameBits = (1 << (e3ScaleCount + restBitCount)) | restBits
+
+                    pendingBits = (pendingBits << (sameBitCount + e3ScaleCount)) | sameBits
+                    pendingBitCount += sameBitCount + e3ScaleCount
+                    e3ScaleCount = 0
+                else:
+                    pendingBits = (pendingBits << sameBitCount) | sameBits
+                    pendingBitCount += sameBitCount
+
+                if(pendingBitCount >= 64):
+                    bitWriter.writeBits(pendingBits, pendingBitCount)
+                    pendingBits = 0
+                    pendingBitCount = 0
+
+                lowerTag = (lowerTag << sameBitCount) & wordBitMask
+                upperTag = ((upperTag << sameBitCount) | ((1 << sameBitCount) - 1)) & wordBitMask
+
+            # E3 scaling for all the bits after the MSB where the lower tag is 1 and the upper tag is 0
+            if((lowerTag & wordSecondMSBMask) and not (upperTag & wordSecondMSBMask)):
+                scaleCount = min((wordSize - 1) - ((~lowerTag) & belowMSBMask).bit_length(), (wordSize - 1) - (upperTag & belowMSBMask).bit_length())
+
+                lowerTag = (lowerTag << scaleCount) & belowMSBMask
+                upperTag = ((upperTag << scaleCount) & wordBitMask) | wordMSBMask
+                e3ScaleCount += scaleCount
+
+        bitWriter.writeBits(pendingBits, pendingBitCount)
+
+        self.mLowerTag = lowerTag
+        self.mUpperTag = upperTag
+        self.mE3ScaleCount = e3ScaleCount
+        self.mTotalSymbolCount = totalSymbolCount
 
     def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, lastDataBlock=True):
         """
@@ -219,14 +291,10 @@ class AREncoder:
 
         self.mEncodedData = encodedData_
         self.mEncodedDataCount = 0
-        self.mCurrentBitCount = 0
-        self.mMaxEncodedDataLen = maxEncodedDataLen_
+        self.mBitWriter.attach(encodedData_, maxEncodedDataLen_)
 
-        # Go through and compress data one byte at a time
-        for i in range(0, dataLen_):
-            [self.mLowerTag, self.mUpperTag] = self._update_range_tags(dataToEncode_[i], self.mLowerTag, self.mUpperTag)
-            self._increment_count(dataToEncode_[i])
-            [self.mLowerTag, self.mUpperTag] = self._rescale(self.mLowerTag, self.mUpperTag)
+        # Go through and compress data one symbol at a time
+        self._encode_symbols(dataToEncode_, dataLen_)
 
         lowerTagToSend = self.mLowerTag
 
@@ -238,19 +306,16 @@ class AREncoder:
             [lower, upper] = self._rescale(lower, upper)
             lowerTagToSend = lower
 
-        # Store the current state of the lower tag to mark the completion of the compression
-        for i in range(0, self.mWordSize):
-            bitValue = (lowerTagToSend >> ((self.mWordSize - 1) - i)) & 0x0001
-
-            self._append_bit(bitValue)
+        # Store the current state of the lower tag to mark the completion of the compression. Ensure we account for any
+        # E3 scaling after the first bit
+        firstBitValue = (lowerTagToSend >> (self.mWordSize - 1)) & 0x0001
 
-            # Ensure we account for any E3 scaling
-            while(self.mE3ScaleCount > 0):
-                self._append_bit((~bitValue) & 0x0001)
-                self.mE3ScaleCount -= 1
+        self.mBitWriter.writeBits(firstBitValue, 1)
+        self.mBitWriter.writeRun(firstBitValue ^ 0x0001, self.mE3ScaleCount)
+        self.mBitWriter.writeBits(lowerTagToSend & (self.mWordBitMask >> 1), self.mWordSize - 1)
+        self.mE3ScaleCount = 0
 
-        # Ensure that the current byte is added to the compressed data length if there are any outstanding bits on it
-        if(self.mCurrentBitCount != 0):
-            self.mEncodedDataCount += 1
+        # Store the outstanding bits, including the current byte if there are any outstanding bits on it
+        self.mEncodedDataCount = self.mBitWriter.flush()
 
         return self.mEncodedDataCount
\ No newline at end of file
@@ -0,0 +1,506 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This module provides an asyncio interface to Kompressor and Dekompressor. All the compression work is run in an
+executor so the event loop is never blocked for more than the time it takes to copy the data. The executor can be any
+concurrent.futures executor, if None the default executor of the event loop is used. A ProcessPoolExecutor avoids
+competing with the event loop for the GIL.
+
+akompress() and adekompress() convert whole buffers to and from the KompressedArchive format. AsyncKompressedWriter and
+AsyncKompressedReader write and read archives over an asyncio StreamWriter and StreamReader. They keep the state of one
+connection (pending data, block index, archive position) in the event loop and only send single blocks to the
+executor.
+
+At most maxInFlight_ blocks of a writer are in the executor at any time. When the window is full the writer waits for
+the oldest block and sends it to the stream before the next block is submitted, so memory use does not depend on the
+size of a write. Blocks that are done are sent after every write, in order, without waiting for the window to fill.
+
+The executor keeps the Kompressor or Dekompressor for the last few sets of parameters in every thread (or process),
+so the coders are not created again for every block and are never shared by two threads. Only MAX_CACHED_CODERS
+coders are kept per thread, the least recently used one is dropped to make room.
+"""
+
+import asyncio
+import collections
+import io
+import os
+import struct
+import threading
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+import KompressedArchive
+from KompressedArchive import KompressedReader
+
+MAX_CACHED_CODERS = 4                          # The max number of coders kept by one executor thread
+
+# Coders of the current executor thread, keyed by their parameters
+_threadState = threading.local()
+
+def _getCoder(coderClass_, parameters_, bufferSize_):
+    """
+    Get the coder of the current thread for a set of parameters, it is created the first time it is needed. The least
+    recently used coder is dropped once the thread holds MAX_CACHED_CODERS of them
+
+    :param coderClass_: Kompressor or Dekompressor
+    :param parameters_: (section size, generic max run, word size, use NumPy, coder, run length mode, move to front)
+    :param bufferSize_: The size of the output buffer created with the coder, it only depends on parameters_
+    :return: [coder, buffer], the buffer holds one compressed block for Kompressor and one section for Dekompressor
+    """
+
+    coders = getattr(_threadState, 'coders', None)
+
+    if(coders is None):
+        coders = collections.OrderedDict()                                      # Coders of the thread, least recently used first
+        _threadState.coders = coders
+
+    key = (coderClass_, parameters_)
+
+    if(key in coders):
+        coders.move_to_end(key)
+        return coders[key]
+
+    if(len(coders) >= MAX_CACHED_CODERS):
+        coders.popitem(last=False)
+
+    coders[key] = [coderClass_(*parameters_), bytearray(bufferSize_)]
+
+    return coders[key]
+
+def _kompressBlock(parameters_, maxCompressedDataLen_, blockData_):
+    """
+    Compress one block in the executor, as KompressedWriter does
+
+    :param parameters_: The Kompressor parameters
+    :param maxCompressedDataLen_: The max size of a compressed block, as given by KompressedArchive.calculateMaxCompressedBlockLen
+    :param blockData_: The data of the block (bytes)
+    :return: [uncompressed size, CRC32 of the uncompressed data, compressed data (bytes)]
+    """
+
+    [kompressor, compressedData] = _getCoder(Kompressor, parameters_, maxCompressedDataLen_)
+    [blockLen, blockCrc, compressedDataLen] = KompressedArchive.kompressBlock(kompressor, blockData_, compressedData)
+
+    return [blockLen, blockCrc, bytes(compressedData[0:compressedDataLen])]
+
+def _dekompressBlock(parameters_, compressedData_, uncompressedDataLen_, checksum_):
+    """
+    Decompress one block in the executor and verify it against its frame header
+
+    :param parameters_: The Dekompressor parameters
+    :param compressedData_: The compressed data of the block (bytes)
+    :param uncompressedDataLen_: The uncompressed size stored in the frame header
+    :param checksum_: The CRC32 stored in the frame header
+    :return: The uncompressed data of the block (bytes)
+    """
+
+    [dekompressor, uncompressedData] = _getCoder(Dekompressor, parameters_, parameters_[0])
+    uncompressedView = memoryview(uncompressedData)
+    blockLen = KompressedArchive.dekompressBlock(dekompressor, compressedData_, len(compressedData_), uncompressedView, uncompressedDataLen_, checksum_)
+
+    return bytes(uncompressedView[0:blockLen])
+
+def _kompressData(data_, parameters_):
+    """
+    Compress a buffer into an archive
+
+    :param data_: The data to compress (bytes)
+    :param parameters_: [section size, generic max run, word size, use NumPy, coder, run length mode, move to front]
+    :return: The archive (bytes)
+    """
+
+    archiveFile = io.BytesIO()
+
+    KompressedArchive.compress_stream(io.BytesIO(data_), archiveFile, *parameters_)
+
+    return archiveFile.getvalue()
+
+def _dekompressData(archiveData_, useNumpy_):
+    """
+    Decompress a whole archive
+
+    :param archiveData_: The archive (bytes)
+    :param useNumpy_: Passed to Dekompressor
+    :return: The uncompressed data (bytes)
+    """
+
+    return bytes(KompressedReader(io.BytesIO(archiveData_), useNumpy_).read())
+
+async def akompress(data_, sectionSize_ = KompressedArchive.DEFAULT_SECTION_SIZE, genericMaxRun_ = KompressedArchive.DEFAULT_GENERIC_MAX_RUN,
+                    encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC, runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC,
+                    moveToFront_ = False, executor_ = None):
+    """
+    Compress a buffer into a KompressedArchive in the executor
+
+    :param data_: The data to compress (bytes-like)
+    :param sectionSize_: Max size of a block
+    :param genericMaxRun_: The max run of generic symbols
+    :param encoderWordSize_: The size of words (in bits) to use for encoding data
+    :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+    :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+    :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+    :param moveToFront_: Perform the move-to-front stage
+    :param executor_: The executor that runs the compression. If None the default executor of the event loop is used
+    :return: The archive (bytes)
+    """
+
+    parameters = [sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_]
+
+    return await asyncio.get_running_loop().run_in_executor(executor_, _kompressData, bytes(data_), parameters)
+
+async def adekompress(archiveData_, useNumpy_ = None, executor_ = None):
+    """
+    Decompress a KompressedArchive in the executor
+
+    :param archiveData_: The archive (bytes-like)
+    :param useNumpy_: Passed to Dekompressor. If None NumPy will be used when it is available
+    :param executor_: The executor that runs the decompression. If None the default executor of the event loop is used
+    :return: The uncompressed data (bytes)
+    """
+
+    return await asyncio.get_running_loop().run_in_executor(executor_, _dekompressData, bytes(archiveData_), useNumpy_)
+
+class AsyncKompressedWriter:
+    def __init__(self, streamWriter_, sectionSize_ = KompressedArchive.DEFAULT_SECTION_SIZE, genericMaxRun_ = KompressedArchive.DEFAULT_GENERIC_MAX_RUN,
+                 encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC, runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC,
+                 moveToFront_ = False, executor_ = None, maxInFlight_ = None):
+        """
+        Initialize the writer. The archive header is sent with the first data written
+
+        :param streamWriter_: asyncio.StreamWriter the archive is written to
+        :param sectionSize_: Max size of a block
+        :param genericMaxRun_: The max run of generic symbols
+        :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+        :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+        :param moveToFront_: Perform the move-to-front stage
+        :param executor_: The executor that compresses the blocks. If None the default executor of the event loop is used
+        :param maxInFlight_: The max number of blocks in the executor at the same time. If None twice the number of CPUs
+        :return:
+        """
+
+        if(maxInFlight_ is None):
+            maxInFlight_ = 2*(os.cpu_count() or 1)
+
+        if(maxInFlight_ < 1):
+            raise Exception('At least one block must be allowed in flight')
+
+        # Ensure that generic max run is at least one, this matches KompressedWriter
+        if(genericMaxRun_ < 1):
+            genericMaxRun_ = 1
+
+        self.mStreamWriter = streamWriter_
+        self.mExecutor = executor_
+        self.mSectionSize = sectionSize_
+        self.mMaxInFlight = maxInFlight_
+        self.mParameters = (sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+        self.mMaxCompressedDataLen = KompressedArchive.calculateMaxCompressedBlockLen(sectionSize_, encoderWordSize_)
+        self.mPendingData = bytearray()                                         # Data that has not filled a block yet
+        self.mInFlight = collections.deque()                                    # Futures of the blocks being compressed, oldest first
+        self.mBlockIndex = []                                                   # [frame offset, uncompressed offset] of every block
+        self.mUncompressedSize = 0                                              # The number of bytes compressed into blocks
+        self.mClosed = False
+        self.mLock = asyncio.Lock()                                             # Keeps the blocks of concurrent writes in order
+
+        # Archive data not sent to the stream yet, and the size of the archive including it
+        self.mArchiveData = bytearray(KompressedArchive.packArchiveHeader(sectionSize_, genericMaxRun_, encoderWordSize_, coder_, runLengthMode_,
+                                                                          moveToFront_))
+        self.mArchiveSize = len(self.mArchiveData)
+
+    def _writeFrame(self, blockLen_, blockCrc_, compressedData_):
+        """
+        Add a compressed block to the archive data as a frame and add it to the block index
+
+        :param blockLen_: The uncompressed size of the block
+        :param blockCrc_: CRC32 of the uncompressed data of the block
+        :param compressedData_: The compressed data of the block (bytes)
+        :return: None
+        """
+
+        self.mBlockIndex.append([self.mArchiveSize, self.mUncompressedSize])
+
+        self.mArchiveData += KompressedArchive.packFrameHeader(len(compressedData_), blockLen_, blockCrc_)
+        self.mArchiveData += compressedData_
+        self.mArchiveSize += KompressedArchive.FRAME_HEADER_SIZE + len(compressedData_)
+        self.mUncompressedSize += blockLen_
+
+    async def _writeOldestBlock(self):
+        """
+        Wait for the oldest block in flight to be compressed and add it to the archive
+
+        :return: None
+        """
+
+        [blockLen, blockCrc, compressedData] = await self.mInFlight.popleft()
+
+        self._writeFrame(blockLen, blockCrc, compressedData)
+
+    async def _writeFinishedBlocks(self):
+        """
+        Add the blocks at the front of the window that are done to the archive, without waiting for the others
+
+        :return: None
+        """
+
+        while((len(self.mInFlight) > 0) and self.mInFlight[0].done()):
+            await self._writeOldestBlock()
+
+    async def _submitBlock(self, blockData_):
+        """
+        Send a block to the executor. If the window is full the oldest block is added to the archive first
+
+        :param blockData_: The data of the block, up to one section in size (bytes)
+        :return: None
+        """
+
+        if(len(self.mInFlight) >= self.mMaxInFlight):
+            await self._writeOldestBlock()
+
+        self.mInFlight.append(asyncio.get_running_loop().run_in_executor(self.mExecutor, _kompressBlock, self.mParameters, self.mMaxCompressedDataLen,
+                                                                         blockData_))
+
+    async def _writeInFlightBlocks(self):
+        """
+        Submit any data waiting for a full section as a shorter block and add all the blocks in flight to the archive
+
+        :return: None
+        """
+
+        if(len(self.mPendingData) > 0):
+            await self._submitBlock(bytes(self.mPendingData))
+            self.mPendingData = bytearray()
+
+        while(len(self.mInFlight) > 0):
+            await self._writeOldestBlock()
+
+    async def _drain(self):
+        """
+        Send the archive data written so far to the stream and wait until the stream can take more data
+
+        :return: None
+        """
+
+        if(len(self.mArchiveData) > 0):
+            self.mStreamWriter.write(bytes(self.mArchiveData))
+            self.mArchiveData = bytearray()
+
+        await self.mStreamWriter.drain()
+
+    async def write(self, data_):
+        """
+        Add data to the archive. Every full section is compressed in the executor and sent to the stream once it is done.
+        Blocks still being compressed when the call returns are sent by a later call
+
+        :param data_: The data to add (bytes-like)
+        :return: The number of bytes added
+        """
+
+        async with self.mLock:
+            if(self.mClosed):
+                raise Exception('Archive is closed')
+
+            dataView = memoryview(data_).cast('B')
+            dataOffset = 0
+
+            # Top up the pending data to a full section first
+            if(len(self.mPendingData) > 0):
+                dataOffset = min(self.mSectionSize - len(self.mPendingData), len(dataView))
+                self.mPendingData += dataView[0:dataOffset]
+
+                if(len(self.mPendingData) == self.mSectionSize):
+                    await self._submitBlock(bytes(self.mPendingData))
+                    self.mPendingData = bytearray()
+
+            # The blocks are copied since the executor may use them after the call returns
+            while((len(dataView) - dataOffset) >= self.mSectionSize):
+                await self._submitBlock(bytes(dataView[dataOffset:dataOffset + self.mSectionSize]))
+                dataOffset += self.mSectionSize
+
+                await self._writeFinishedBlocks()
+
+                if(len(self.mArchiveData) > 0):
+                    await self._drain()
+
+            self.mPendingData += dataView[dataOffset:]
+
+            await self._writeFinishedBlocks()
+            await self._drain()
+
+            return len(dataView)
+
+    async def flush(self):
+        """
+        Compress and send any data waiting for a full section as a shorter block, and all the blocks in flight
+
+        :return: None
+        """
+
+        async with self.mLock:
+            if(self.mClosed):
+                raise Exception('Archive is closed')
+
+            await self._writeInFlightBlocks()
+            await self._drain()
+
+    async def close(self):
+        """
+        Send any outstanding data, the end frame, the block index and the trailer. The stream itself is not closed
+
+        :return: None
+        """
+
+        async with self.mLock:
+            if(self.mClosed):
+                return
+
+            # The last block must be in the archive before the end frame and index
+            await self._writeInFlightBlocks()
+            self.mClosed = True
+
+            archiveEnd = KompressedArchive.packArchiveEnd(self.mBlockIndex, self.mArchiveSize, self.mUncompressedSize)
+            self.mArchiveData += archiveEnd
+            self.mArchiveSize += len(archiveEnd)
+            await self._drain()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, excType_, excValue_, traceback_):
+        # Only complete the archive if the data was written without errors
+        if(excType_ is None):
+            await self.close()
+            return False
+
+        # Wait for the blocks in flight so no work is left in the executor, their results and errors are dropped
+        async with self.mLock:
+            await asyncio.gather(*self.mInFlight, return_exceptions=True)
+            self.mInFlight.clear()
+
+        return False
+
+class AsyncKompressedReader:
+    def __init__(self, streamReader_, useNumpy_ = None, executor_ = None):
+        """
+        Initialize the reader. The archive header is read with the first block
+
+        :param streamReader_: asyncio.StreamReader the archive is read from
+        :param useNumpy_: Passed to Dekompressor. If None NumPy will be used when it is available
+        :param executor_: The executor that decompresses the blocks. If None the default executor of the event loop is used
+        :return:
+        """
+
+        self.mStreamReader = streamReader_
+        self.mUseNumpy = useNumpy_
+        self.mExecutor = executor_
+        self.mParameters = None                                                 # Dekompressor parameters, read from the header
+        self.mMaxCompressedDataLen = 0
+        self.mBlockCount = 0                                                    # The number of blocks read so far
+        self.mUncompressedSize = 0                                              # The size of the blocks read so far
+        self.mFinished = False                                                  # The trailer has been read
+        self.mLock = asyncio.Lock()
+
+    async def _readBytes(self, count_):
+        """
+        Read exactly count_ bytes from the stream, an exception is thrown if the stream ends first
+
+        :param count_: The number of bytes to read
+        :return: The bytes read
+        """
+
+        try:
+            return await self.mStreamReader.readexactly(count_)
+        except asyncio.IncompleteReadError:
+            raise Exception('Unexpected end of archive')
+
+    async def _readHeader(self):
+        """
+        Read the archive header and set up the Dekompressor parameters. Only the header is unpacked here, the coders are
+        created in the executor
+
+        :return: None
+        """
+
+        headerData = await self._readBytes(KompressedArchive.HEADER_SIZE)
+        [coder, wordSize, sectionSize, genericMaxRun, runLengthMode, moveToFront] = KompressedArchive.parseArchiveHeader(headerData)
+
+        self.mParameters = (sectionSize, genericMaxRun, wordSize, self.mUseNumpy, coder, runLengthMode, moveToFront)
+        self.mMaxCompressedDataLen = KompressedArchive.calculateMaxCompressedBlockLen(sectionSize, wordSize)
+
+    async def _readTrailer(self):
+        """
+        Read the block index and the trailer after the end frame and check them against the blocks read
+
+        :return: None
+        """
+
+        self.mFinished = True
+
+        trailerData = await self._readBytes(self.mBlockCount*KompressedArchive.INDEX_ENTRY_SIZE + KompressedArchive.TRAILER_SIZE)
+        [indexOffset, uncompressedSize, blockCount, magic] = struct.unpack(KompressedArchive.TRAILER_FORMAT, trailerData[-KompressedArchive.TRAILER_SIZE:])
+
+        if(magic != KompressedArchive.TRAILER_MAGIC):
+            raise Exception('Archive trailer not found')
+
+        if((blockCount != self.mBlockCount) or (uncompressedSize != self.mUncompressedSize)):
+            raise Exception('Invalid block index')
+
+    async def readBlock(self):
+        """
+        Read the next block and decompress it in the executor. After the last block the block index and trailer are
+        read so the stream is left at the end of the archive
+
+        :return: The uncompressed data of the block (bytes) or empty bytes at the end of the archive
+        """
+
+        async with self.mLock:
+            if(self.mFinished):
+                return b''
+
+            if(self.mParameters is None):
+                await self._readHeader()
+
+            frameHeader = await self._readBytes(KompressedArchive.FRAME_HEADER_SIZE)
+            [compressedDataLen, uncompressedDataLen, checksum] = struct.unpack(KompressedArchive.FRAME_HEADER_FORMAT, frameHeader)
+
+            if(compressedDataLen == 0):
+                await self._readTrailer()
+                return b''
+
+            if(uncompressedDataLen > self.mParameters[0]):
+                raise Exception('Block exceeds section size')
+
+            if(compressedDataLen > self.mMaxCompressedDataLen):
+                raise Exception('Compressed block too large')
+
+            compressedData = await self._readBytes(compressedDataLen)
+            blockData = await asyncio.get_running_loop().run_in_executor(self.mExecutor, _dekompressBlock, self.mParameters, compressedData,
+                                                                         uncompressedDataLen, checksum)
+
+            self.mBlockCount += 1
+            self.mUncompressedSize += len(blockData)
+
+            return blockData
+
+    async def read(self):
+        """
+        Read and decompress the rest of the archive
+
+        :return: The uncompressed data (bytes)
+        """
+
+        blocks = []
+
+        async for blockData in self:
+            blocks.append(blockData)
+
+        return b''.join(blocks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        blockData = await self.readBlock()
+
+        if(len(blockData) == 0):
+            raise StopAsyncIteration
+
+        return blockData
@@ -0,0 +1,187 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This module implements buffered bit level I/O for the coders. BitWriter collects bits in an integer accumulator and
+stores whole bytes into the output byte array with int.to_bytes. BitReader loads several bytes at a time into an
+integer accumulator with int.from_bytes and hands out bits from it. Both read and write bits MSB first.
+"""
+
+class BitWriter:
+    ACCUMULATOR_BITS = 64                       # Number of bits collected in the accumulator before whole bytes are stored
+
+    def __init__(self):
+        """
+        Initialize the object. A byte array must be attached before bits can be written
+
+        :return:
+        """
+
+        self.attach(None, 0)
+
+    def attach(self, buffer_, maxLen_):
+        """
+        Attach the byte array the bits are stored in and reset the writer to the start of it
+
+        :param buffer_: The byte array where the bits are stored (bytearray)
+        :param maxLen_: The max number of bytes that can be stored in buffer_
+        :return: None
+        """
+
+        self.mBuffer = buffer_
+        self.mMaxLen = maxLen_                                                  # The max number of bytes that can be stored in mBuffer
+        self.mByteCount = 0                                                     # The number of whole bytes stored in mBuffer
+        self.mAccumulator = 0                                                   # Holds the bits that have not been stored in mBuffer yet
+        self.mBitCount = 0                                                      # The number of bits held in mAccumulator
+        self.mFlushBitCount = min(self.ACCUMULATOR_BITS, self.mMaxLen*8)       # The accumulator is flushed once it holds this many bits
+
+    def _storeBytes(self):
+        """
+        Store all the whole bytes held in the accumulator into the byte array. An exception is thrown if there is not
+        enough room
+
+        :return: None
+        """
+
+        byteCount = self.mBitCount >> 3
+
+        if(byteCount == 0):
+            return
+
+        # If there is no more room throw exception. The last byte of the byte array is kept for the outstanding bits
+        if((self.mByteCount + byteCount) >= self.mMaxLen):
+            raise Exception('Out of space')
+
+        self.mBitCount &= 0x07
+        self.mBuffer[self.mByteCount:self.mByteCount + byteCount] = (self.mAccumulator >> self.mBitCount).to_bytes(byteCount, 'big')
+        self.mByteCount += byteCount
+        self.mAccumulator &= (1 << self.mBitCount) - 1
+
+        # Flush early enough that running out of room is reported as soon as it happens
+        self.mFlushBitCount = min(self.ACCUMULATOR_BITS, (self.mMaxLen - self.mByteCount)*8)
+
+    def writeBits(self, bitValues_, bitCount_):
+        """
+        Write bitCount_ bits (MSB first)
+
+        :param bitValues_: The bits to write, the last bit written is the LSB
+        :param bitCount_: The number of bits to write
+        :return: None
+        """
+
+        self.mAccumulator = (self.mAccumulator << bitCount_) | bitValues_
+        self.mBitCount += bitCount_
+
+        if(self.mBitCount >= self.mFlushBitCount):
+            self._storeBytes()
+
+    def writeRun(self, bitValue_, bitCount_):
+        """
+        Write bitCount_ bits that all have the same value. The cost does not depend on the length of the run
+
+        :param bitValue_: The value of every bit in the run (0 or 1)
+        :param bitCount_: The number of bits to write
+        :return: None
+        """
+
+        if(bitValue_):
+            self.writeBits((1 << bitCount_) - 1, bitCount_)
+        else:
+            self.writeBits(0, bitCount_)
+
+    def getBitCount(self):
+        """
+        Get the total number of bits written since the byte array was attached
+
+        :return: The number of bits written
+        """
+
+        return (self.mByteCount*8) + self.mBitCount
+
+    def flush(self):
+        """
+        Store all the outstanding bits into the byte array. If the last byte is not complete its bits are stored in the
+        least significant bits of the byte. No more bits should be written until a byte array is attached again
+
+        :return: The number of bytes stored in the byte array
+        """
+
+        self._storeBytes()
+
+        if(self.mBitCount != 0):
+            self.mBuffer[self.mByteCount] = self.mAccumulator
+            self.mByteCount += 1
+            self.mAccumulator = 0
+            self.mBitCount = 0
+
+        return self.mByteCount
+
+class BitReader:
+    ACCUMULATOR_BYTES = 8                       # Min number of bytes loaded into the accumulator at a time
+
+    def __init__(self):
+        """
+        Initialize the object. A byte array must be attached before bits can be read
+
+        :return:
+        """
+
+        self.attach(None, 0)
+
+    def attach(self, buffer_, length_):
+        """
+        Attach the byte array the bits are read from and reset the reader to the start of it
+
+        :param buffer_: The byte array the bits are read from (bytearray)
+        :param length_: The number of bytes of buffer_ that can be read
+        :return: None
+        """
+
+        self.mBuffer = buffer_
+        self.mLength = length_                                                  # The number of bytes that can be read from mBuffer
+        self.mByteIndex = 0                                                     # Index of the next byte to load into the accumulator
+        self.mAccumulator = 0                                                   # Holds the bits loaded from mBuffer that have not been read yet
+        self.mBitCount = 0                                                      # The number of bits held in mAccumulator
+
+    def readBits(self, bitCount_):
+        """
+        Read the next bitCount_ bits (MSB first). An exception is thrown if there are not enough bits left
+
+        :param bitCount_: The number of bits to read
+        :return: The bits read, the last bit read is the LSB
+        """
+
+        if(self.mBitCount < bitCount_):
+            # Load enough bytes for the request but at least a full accumulator worth
+            byteCount = max(self.ACCUMULATOR_BYTES, (bitCount_ - self.mBitCount + 7) >> 3)
+            byteCount = min(byteCount, self.mLength - self.mByteIndex)
+
+            if(((byteCount*8) + self.mBitCount) < bitCount_):
+                raise Exception("Exceeded encoded data buffer")
+
+            self.mAccumulator = (self.mAccumulator << (byteCount*8)) | int.from_bytes(self.mBuffer[self.mByteIndex:self.mByteIndex + byteCount], 'big')
+            self.mByteIndex += byteCount
+            self.mBitCount += byteCount*8
+
+        self.mBitCount -= bitCount_
+        bitValues = self.mAccumulator >> self.mBitCount
+        self.mAccumulator &= (1 << self.mBitCount) - 1
+
+        return bitValues
+
+    def readBit(self):
+        """
+        Read the next bit. An exception is thrown if there are no bits left
+
+        :return: The bit value
+        """
+
+        return self.readBits(1)
+
+    def getBitPosition(self):
+        """
+        Get the number of bits read since the byte array was attached
+
+        :return: The number of bits read
+        """
+
+        return (self.mByteIndex*8) - self.mBitCount
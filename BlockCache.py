@@ -0,0 +1,103 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class implements a least recently used cache of decompressed blocks. The cache is limited by the total size of
+the blocks it holds rather than the number of blocks. Blocks are stored as immutable bytes so callers can take
+memoryviews of them without copying. Blocks are keyed by (archive key, block index) so one cache can be shared by
+several KompressedReader objects.
+"""
+
+import collections
+import threading
+
+class BlockCache:
+    def __init__(self, maxBytes_):
+        """
+        Initialize an empty cache
+
+        :param maxBytes_: The max total size of the blocks held in the cache
+        :return:
+        """
+
+        if(maxBytes_ < 0):
+            raise Exception('Cache size must not be negative')
+
+        self.mMaxBytes = maxBytes_
+        self.mBlocks = collections.OrderedDict()                                # Cached blocks, least recently used first
+        self.mCurrentBytes = 0                                                  # Total size of the cached blocks
+        self.mHits = 0                                                          # Number of lookups that found the block
+        self.mMisses = 0                                                        # Number of lookups that did not find the block
+        self.mEvictions = 0                                                     # Number of blocks removed to make room
+        self.mLock = threading.Lock()
+
+    def get(self, key_):
+        """
+        Look up a block and mark it as the most recently used
+
+        :param key_: The key of the block, (archive key, block index)
+        :return: The block data (bytes) or None if the block is not cached
+        """
+
+        with self.mLock:
+            blockData = self.mBlocks.get(key_)
+
+            if(blockData is None):
+                self.mMisses += 1
+                return None
+
+            self.mBlocks.move_to_end(key_)
+            self.mHits += 1
+
+            return blockData
+
+    def put(self, key_, blockData_):
+        """
+        Add a block to the cache, evicting the least recently used blocks until it fits. A block larger than the whole
+        cache is not stored
+
+        :param key_: The key of the block, (archive key, block index)
+        :param blockData_: The block data (bytes-like)
+        :return: The block data as bytes
+        """
+
+        blockData = bytes(blockData_)
+
+        if(len(blockData) > self.mMaxBytes):
+            return blockData
+
+        with self.mLock:
+            previousData = self.mBlocks.pop(key_, None)
+
+            if(previousData is not None):
+                self.mCurrentBytes -= len(previousData)
+
+            self.mBlocks[key_] = blockData
+            self.mCurrentBytes += len(blockData)
+
+            while(self.mCurrentBytes > self.mMaxBytes):
+                [evictedKey, evictedData] = self.mBlocks.popitem(last=False)
+                self.mCurrentBytes -= len(evictedData)
+                self.mEvictions += 1
+
+        return blockData
+
+    def clear(self):
+        """
+        Remove all blocks from the cache. The counters are not reset
+
+        :return: None
+        """
+
+        with self.mLock:
+            self.mBlocks.clear()
+            self.mCurrentBytes = 0
+
+    def getStatistics(self):
+        """
+        Get the cache counters
+
+        :return: [hits, misses, evictions]
+        """
+
+        with self.mLock:
+            return [self.mHits, self.mMisses, self.mEvictions]
@@ -11,27 +11,43 @@ this implementation.
 The de-compressor will go through five stages in order to de-compress the data.
 
 The stages are as follows:
-    1. Decode data from binary into an array integer of symbols
-    2. Expand symbols that indicate general runs into full symbol runs
+    1. Decode data from binary into an array integer of symbols (arithmetic coder or range coder)
+    2. Expand symbols that indicate general runs into full symbol runs (or bijective base 2 RUNA/RUNB run lengths)
+       and reverse the move-to-front transform if it was used
     3. Reverse the Burows-Wheeler transform
 """
 
 from array import *
 from ARDecoder import ARDecoder
+from RangeDecoder import RangeDecoder
 import utils
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class Dekompressor:
     BASE_BINARY_VOCABULARY_SIZE = 257 # 0-255 for 8 bit characters plus termination symbol
     TERMINATION_SYMBOL = 256 # Used to indicate end of compression sequence
     INVALID_SYMBOL = 0xFFFF
+    CODER_ARITHMETIC = 0 # Bit oriented arithmetic coder (ARDecoder)
+    CODER_RANGE = 1 # Byte oriented range coder (RangeDecoder)
+    RUN_LENGTH_GENERIC = 0 # One extended symbol per run of up to genericMaxRun symbols
+    RUN_LENGTH_BIJECTIVE = 1 # Run length written in bijective base 2 with the RUNA and RUNB symbols
+    RUN_LENGTH_BIJECTIVE_SYMBOL_COUNT = 2 # RUNA and RUNB
 
-    def __init__(self, sectionSize_, genericMaxRun_, decoderWordSize_ = 16):
+    def __init__(self, sectionSize_, genericMaxRun_, decoderWordSize_ = 16, useNumpy_ = None, coder_ = CODER_ARITHMETIC, runLengthMode_ = RUN_LENGTH_GENERIC, moveToFront_ = False):
         """
         Constructor
 
         :param sectionSize_: Data section size to use to break up data when compressing
         :param genericMaxRun_: The max run of generic symbols
         :param decoderWordSize_: The size of words (in bits) to use for decoding data
+        :param useNumpy_: Use the NumPy backed reverse BW transform. If None NumPy will be used when it is available
+        :param coder_: The entropy coder the data was compressed with, CODER_ARITHMETIC or CODER_RANGE. The range coder does not use decoderWordSize_
+        :param runLengthMode_: How runs were replaced, RUN_LENGTH_GENERIC or RUN_LENGTH_BIJECTIVE. The bijective mode does not use genericMaxRun_
+        :param moveToFront_: The move-to-front transform was performed on the BW transformed data
         :return:
         """
 
@@ -43,20 +59,51 @@ class Dekompressor:
         if(genericMaxRun_ < 1):
             genericMaxRun_ = 1
 
+        # Use NumPy if it is available unless told otherwise
+        if(useNumpy_ is None):
+            useNumpy_ = utils.isNumpyAvailable()
+        elif(useNumpy_ and (not utils.isNumpyAvailable())):
+            raise Exception('NumPy is not available')
+
+        self.mUseNumpy = useNumpy_
         self.mSectionSize = sectionSize_
         self.mGenericMaxRun = genericMaxRun_
         self.mGenericRunLengthStart = self.BASE_BINARY_VOCABULARY_SIZE
+        self.mRunSymbolA = self.BASE_BINARY_VOCABULARY_SIZE                    # RUNA, a bijective base 2 digit of 1. RUNB (digit of 2) follows it
+        self.mRunLengthMode = runLengthMode_
+        self.mMoveToFront = moveToFront_
+
+        if(runLengthMode_ == self.RUN_LENGTH_GENERIC):
+            self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + genericMaxRun_
+        elif(runLengthMode_ == self.RUN_LENGTH_BIJECTIVE):
+            self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + self.RUN_LENGTH_BIJECTIVE_SYMBOL_COUNT
+        else:
+            raise Exception('Invalid run length mode specified')
 
-        self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + genericMaxRun_
         self.mBWTransformStoreBytes = utils.getMinBytesToRepresent(sectionSize_)
         self.mSectionTransformDataMaxSize = sectionSize_ + self.mBWTransformStoreBytes
         self.mSectionTransformData = array('i', [0]*(self.mSectionTransformDataMaxSize))
-        self.mDecoder = ARDecoder(decoderWordSize_, self.mVocabularySize, self.TERMINATION_SYMBOL)
+        self.mCoder = coder_
+
+        if(coder_ == self.CODER_ARITHMETIC):
+            self.mDecoder = ARDecoder(decoderWordSize_, self.mVocabularySize, self.TERMINATION_SYMBOL)
+        elif(coder_ == self.CODER_RANGE):
+            self.mDecoder = RangeDecoder(self.mVocabularySize, self.TERMINATION_SYMBOL)
+        else:
+            raise Exception('Invalid coder specified')
 
         self.mWorkingArrayMaxSize = self.mSectionSize + self.mBWTransformStoreBytes
         self.mWorkingArray1 = array('i', [0]*(self.mWorkingArrayMaxSize))
         self.mWorkingArray2 = array('i', [0]*(self.mWorkingArrayMaxSize))
 
+        # Buffers used to reverse the BW transform, allocated once and reused for every section
+        if(self.mUseNumpy):
+            self.mLFMapping = numpy.zeros(self.mSectionSize, dtype=numpy.int64)
+            self.mSectionPositions = numpy.arange(self.mSectionSize, dtype=numpy.int64)
+        else:
+            self.mPrecedingCharacterCount = array('i', [0]*self.mVocabularySize)
+            self.mPreviousSymbolCountBeforeIndex = array('i', [0]*self.mSectionSize)
+
         self.mContinuousModeEnabled = False
         self.mContinuousModeTotalData = 0
         self.mContinuousModeDataDecompressed = 0
@@ -136,6 +183,9 @@ class Dekompressor:
         if(incomingDataSize_ == 0 ):
             return 0
 
+        if(self.mUseNumpy):
+            return self._expandRunsGenericNumpy(runLengthSymbolStart_, incomingData_, incomingDataSize_, expandedData_, expandedDataMaxSize_)
+
         currentSymbol = incomingData_[currentIncomingDataIndex]
         currentIncomingDataIndex += 1
 
@@ -165,7 +215,7 @@ class Dekompressor:
                 runLength = currentSymbol - runLengthSymbolStart_ + 1
 
                 # If there is not enough room to to store the expanded data throw exception
-                if((currentExpandedDataIndex + runLength) >= expandedDataMaxSize_):
+                if((currentExpandedDataIndex + runLength) > expandedDataMaxSize_):
                     raise Exception('Not enough space in expansion array 1')
 
                 for i in range(0, runLength):
@@ -173,7 +223,7 @@ class Dekompressor:
                     currentExpandedDataIndex += 1
             else:
                 # If there is not enough room to to store the symbol throw exception
-                if((currentExpandedDataIndex + 1) >= expandedDataMaxSize_):
+                if((currentExpandedDataIndex + 1) > expandedDataMaxSize_):
                     raise Exception('Not enough space in expansion array 2')
 
                 expandedData_[currentExpandedDataIndex] = currentSymbol
@@ -184,6 +234,194 @@ class Dekompressor:
 
         return currentExpandedDataIndex
 
+    def _expandRunsGenericNumpy(self, runLengthSymbolStart_, incomingData_, incomingDataSize_, expandedData_, expandedDataMaxSize_):
+        """
+        Expand extended symbols that indicate runs of generic symbols using NumPy. Every extended symbol is matched with
+        the last non extended symbol before it and all the symbols are repeated in one step. The same checks as
+        _expandRunsGeneric are performed and the exception for the first invalid symbol is thrown.
+
+        :param runLengthSymbolStart_: First extended symbol that is used to indicate how many times the original symbol is repeated. First symbol indicates a repeat of one
+        :param incomingData_: The data that needs to be expanded (integer array)
+        :param incomingDataSize_: The size of the incoming array. Must be greater than 0
+        :param expandedData_: The expanded data will be stored here (integer array)
+        :param maxExpandedDataSize: The max number of symbols that the expanded data can be. An exception will be thrown if exceeded
+        :return: The number of symbols stored in expandedData_
+        """
+
+        symbols = numpy.asarray(incomingData_[0:incomingDataSize_], dtype=numpy.int64)
+
+        # The first symbol must be a number between 0-255
+        if(symbols[0] > 255):
+            raise Exception('Invalid first symbol')
+
+        isRunSymbol = (symbols >= runLengthSymbolStart_)
+
+        # Every entry is repeated once unless it is an extended symbol, the first extended symbol represents a run of one
+        repeatCounts = numpy.where(isRunSymbol, symbols - runLengthSymbolStart_ + 1, 1)
+        expandedEnds = numpy.cumsum(repeatCounts)
+
+        # Find the first symbol out of range or that does not fit. The first symbol is always stored
+        invalidSymbols = (symbols > self.mVocabularySize) | (expandedEnds > expandedDataMaxSize_)
+        invalidSymbols[0] = False
+
+        if(invalidSymbols.any()):
+            invalidIndex = int(numpy.argmax(invalidSymbols))
+
+            if(symbols[invalidIndex] > self.mVocabularySize):
+                raise Exception('Symbol [' + str(int(symbols[invalidIndex])) + '] out of range')
+            elif(isRunSymbol[invalidIndex]):
+                raise Exception('Not enough space in expansion array 1')
+            else:
+                raise Exception('Not enough space in expansion array 2')
+
+        # Forward fill the index of the last non extended symbol, this is the symbol extended symbols repeat
+        literalIndexes = numpy.where(isRunSymbol, 0, numpy.arange(incomingDataSize_))
+        expandedSymbols = symbols[numpy.maximum.accumulate(literalIndexes)]
+
+        expandedDataSize = int(expandedEnds[-1])
+        expanded = numpy.repeat(expandedSymbols, repeatCounts).astype(numpy.intc)
+
+        expandedArray = array('i')
+        expandedArray.frombytes(expanded.tobytes())
+        expandedData_[0:expandedDataSize] = expandedArray
+
+        return expandedDataSize
+
+    def _expandRunsBijective(self, runSymbolA_, incomingData_, incomingDataSize_, expandedData_, expandedDataMaxSize_):
+        """
+        Expand runs whose length is written in bijective base 2 after the symbol, least significant digit first. RUNA
+        (runSymbolA_) is a digit of 1 and RUNB (runSymbolA_ + 1) is a digit of 2. All symbols are checked to be in range
+        before any data is expanded.
+
+        :param runSymbolA_: The RUNA symbol, RUNB is the symbol that follows it
+        :param incomingData_: The data that needs to be expanded (integer array)
+        :param incomingDataSize_: The size of the incoming array
+        :param expandedData_: The expanded data will be stored here (integer array)
+        :param expandedDataMaxSize_: The max number of symbols that the expanded data can be. An exception will be thrown if exceeded
+        :return: The number of symbols stored in expandedData_
+        """
+
+        if(incomingDataSize_ == 0):
+            return 0
+
+        # The first symbol must be a number between 0-255
+        if(incomingData_[0] > 255):
+            raise Exception('Invalid first symbol')
+
+        # Ensure all symbols are in allowed range. Must be less than max vocabulary size
+        if(max(incomingData_[0:incomingDataSize_]) >= self.mVocabularySize):
+            for currentSymbol in incomingData_[0:incomingDataSize_]:
+                if(currentSymbol >= self.mVocabularySize):
+                    raise Exception('Symbol [' + str(currentSymbol) + '] out of range')
+
+        if(self.mUseNumpy):
+            return self._expandRunsBijectiveNumpy(runSymbolA_, incomingData_, incomingDataSize_, expandedData_, expandedDataMaxSize_)
+
+        currentExpandedDataIndex = 0
+        previousSymbol = incomingData_[0]
+        runLength = 1
+        digitWeight = 1
+
+        # Go through all the incoming data. A run is stored once the symbol after its last digit is reached
+        for currentIncomingDataIndex in range(1, incomingDataSize_ + 1):
+
+            if(currentIncomingDataIndex < incomingDataSize_):
+                currentSymbol = incomingData_[currentIncomingDataIndex]
+
+                # Add the digit to the length of the current run
+                if(currentSymbol >= runSymbolA_):
+                    runLength += digitWeight*(currentSymbol - runSymbolA_ + 1)
+                    digitWeight <<= 1
+                    continue
+
+            # If there is not enough room to to store the run throw exception
+            if((currentExpandedDataIndex + runLength) > expandedDataMaxSize_):
+                raise Exception('Not enough space in expansion array')
+
+            expandedData_[currentExpandedDataIndex:currentExpandedDataIndex + runLength] = array('i', [previousSymbol])*runLength
+            currentExpandedDataIndex += runLength
+
+            if(currentIncomingDataIndex < incomingDataSize_):
+                previousSymbol = currentSymbol
+                runLength = 1
+                digitWeight = 1
+
+        return currentExpandedDataIndex
+
+    def _expandRunsBijectiveNumpy(self, runSymbolA_, incomingData_, incomingDataSize_, expandedData_, expandedDataMaxSize_):
+        """
+        Expand bijective base 2 run lengths using NumPy. Every digit is matched with the symbol before it and its position
+        in the run length, the run lengths are summed in bulk and all the symbols are repeated in one step. The symbols
+        must already have been checked to be in range.
+
+        :param runSymbolA_: The RUNA symbol, RUNB is the symbol that follows it
+        :param incomingData_: The data that needs to be expanded (integer array)
+        :param incomingDataSize_: The size of the incoming array. Must be greater than 0
+        :param expandedData_: The expanded data will be stored here (integer array)
+        :param expandedDataMaxSize_: The max number of symbols that the expanded data can be. An exception will be thrown if exceeded
+        :return: The number of symbols stored in expandedData_
+        """
+
+        symbols = numpy.asarray(incomingData_[0:incomingDataSize_], dtype=numpy.int64)
+        isDigit = (symbols >= runSymbolA_)
+        positions = numpy.arange(incomingDataSize_)
+
+        # Forward fill the index of the last non digit symbol, this is the symbol the digits belong to
+        literalIndexes = numpy.maximum.accumulate(numpy.where(isDigit, 0, positions))
+        digitOwners = literalIndexes[isDigit]
+        digitBits = positions[isDigit] - digitOwners - 1
+
+        # A digit in bit position b adds at least 2^b to the run, reject runs that can not fit before the sums overflow
+        if((digitBits.size > 0) and (int(digitBits.max()) >= expandedDataMaxSize_.bit_length())):
+            raise Exception('Not enough space in expansion array')
+
+        digitValues = (symbols[isDigit] - runSymbolA_ + 1) << digitBits
+        runLengths = 1 + numpy.bincount(digitOwners, weights=digitValues, minlength=incomingDataSize_).astype(numpy.int64)
+        runLengths = runLengths[~isDigit]
+
+        expandedDataSize = int(runLengths.sum())
+
+        if(expandedDataSize > expandedDataMaxSize_):
+            raise Exception('Not enough space in expansion array')
+
+        expanded = numpy.repeat(symbols[~isDigit], runLengths).astype(numpy.intc)
+
+        expandedArray = array('i')
+        expandedArray.frombytes(expanded.tobytes())
+        expandedData_[0:expandedDataSize] = expandedArray
+
+        return expandedDataSize
+
+    def _reverseMTFTransform(self, incomingData_, incomingDataSize_):
+        """
+        Replace every move-to-front rank with the symbol at that rank in the table of byte symbols ordered by how
+        recently they were seen, then move the symbol to the front of the table. The table is a 256 byte bytearray so
+        the shift of the symbols is done in C. The data is transformed in place.
+
+        :param incomingData_: The ranks that need to be transformed (integer array)
+        :param incomingDataSize_: The number of ranks
+        :return: None
+        """
+
+        if(incomingDataSize_ == 0):
+            return
+
+        if(max(incomingData_[0:incomingDataSize_]) > 255):
+            raise Exception('Invalid move to front rank')
+
+        symbolOrder = bytearray(range(0, 256))
+        restoredData = bytearray(incomingDataSize_)
+
+        for i, rank in enumerate(bytes(incomingData_[0:incomingDataSize_].tolist())):
+            if(rank != 0):
+                currentSymbol = symbolOrder[rank]
+                symbolOrder[1:rank + 1] = symbolOrder[0:rank]
+                symbolOrder[0] = currentSymbol
+
+            restoredData[i] = symbolOrder[0]
+
+        incomingData_[0:incomingDataSize_] = array('i', array('B', restoredData))
+
     def _reverseBWTransform(self, incomingData_, incomingDataSize_, restoredData_, restoredDataMaxLen_):
         """
         Reverse BW transform on incomingData_. This will revert the data to it's pre transform state.
@@ -209,12 +447,21 @@ class Dekompressor:
         for i in range(0, self.mBWTransformStoreBytes):
             originalIndex |= ((incomingData_[i] & 0xFF) << (i*8))
 
-        precedingCharacterCount = array('i', [0]*self.mVocabularySize)
-        previousSymbolCountBeforeIndex = array('i', [0]*self.mSectionSize)
-
         startingIndex = self.mBWTransformStoreBytes
         dataSize = incomingDataSize_ - self.mBWTransformStoreBytes
 
+        if(dataSize > self.mSectionSize):
+            raise Exception('Data length exceeds max section size')
+
+        if(self.mUseNumpy):
+            return self._reverseBWTransformNumpy(incomingData_, startingIndex, dataSize, originalIndex, restoredData_)
+
+        precedingCharacterCount = self.mPrecedingCharacterCount
+        previousSymbolCountBeforeIndex = self.mPreviousSymbolCountBeforeIndex
+
+        for i in range(0, self.mVocabularySize):
+            precedingCharacterCount[i] = 0
+
         # Generate preceding symbol count values
         for i in range(0, dataSize):
             symbol = incomingData_[startingIndex+i]
@@ -239,6 +486,38 @@ class Dekompressor:
 
         return (incomingDataSize_ - self.mBWTransformStoreBytes)
 
+    def _reverseBWTransformNumpy(self, incomingData_, startingIndex_, dataSize_, originalIndex_, restoredData_):
+        """
+        Reverse BW transform using NumPy. The LF-mapping (the row each rotation moves to when rotated right by one) is
+        built with a stable argsort of the last column, only the walk through the mapping is done one symbol at a time.
+
+        :param incomingData_: The data to be reverted which is an array
+        :param startingIndex_: Index of the first transformed symbol in incomingData_ (after the original index bytes)
+        :param dataSize_: The number of transformed symbols
+        :param originalIndex_: The index of the original data sequence in the sorted rotations
+        :param restoredData_: The reversed data will be stored here. This is an array
+        :return: The size of the reverted data
+        """
+
+        lastColumn = numpy.asarray(incomingData_[startingIndex_:startingIndex_ + dataSize_], dtype=numpy.int64)
+
+        # Stable sort of the last column gives the first column, the symbol at position order[j] in the last column
+        # is the symbol at position j in the first column so the LF-mapping is the inverse of order
+        order = numpy.argsort(lastColumn, kind='stable')
+        lfMapping = self.mLFMapping[0:dataSize_]
+        lfMapping[order] = self.mSectionPositions[0:dataSize_]
+
+        lastColumnSymbols = lastColumn.tolist()
+        lfMappingIndexes = lfMapping.tolist()
+        index = originalIndex_
+
+        # Generate required amount of symbols
+        for i in range(dataSize_ - 1, -1, -1):
+            restoredData_[i] = lastColumnSymbols[index]
+            index = lfMappingIndexes[index]
+
+        return dataSize_
+
     def dekompress(self, compressedData_, compressedDataLen_, outputData_, maxOutputDataLen_):
         """
         Pass in a byte array of data that has been compressed using Kompressor initialized with
@@ -249,7 +528,7 @@ class Dekompressor:
 
         :param compressedData_: Compressed that needs to be uncompressed. Data must be passed in a bytearray
         :param compressedDataLen_: The size of compressed data
-        :param outputData_: Uncompressed data will be stored here, this must  be a bytearray
+        :param outputData_: Uncompressed data will be stored here. Either an integer array or any writable bytes-like object (bytearray, memoryview, mmap, NumPy uint8 array)
         :param maxOutputDataLen_:  The max size of outputData_. If there is not enough room to store all the data an exception will be thrown
         :return: Number of bytes stored in outputData_
         """
@@ -260,8 +539,15 @@ class Dekompressor:
         # Decode the data first
         decodedDataLen_ = self.mDecoder.decode(compressedData_, compressedDataLen_,self.mWorkingArray1, self.mWorkingArrayMaxSize)
 
-        # Perform generic symbol run expansion
-        lengthAfterGenericExpansion = self._expandRunsGeneric(self.mGenericRunLengthStart, self.mGenericMaxRun, self.mWorkingArray1, decodedDataLen_, self.mWorkingArray2, self.mWorkingArrayMaxSize)
+        # Perform symbol run expansion
+        if(self.mRunLengthMode == self.RUN_LENGTH_BIJECTIVE):
+            lengthAfterGenericExpansion = self._expandRunsBijective(self.mRunSymbolA, self.mWorkingArray1, decodedDataLen_, self.mWorkingArray2, self.mWorkingArrayMaxSize)
+        else:
+            lengthAfterGenericExpansion = self._expandRunsGeneric(self.mGenericRunLengthStart, self.mGenericMaxRun, self.mWorkingArray1, decodedDataLen_, self.mWorkingArray2, self.mWorkingArrayMaxSize)
+
+        # Replace every move-to-front rank with its symbol
+        if(self.mMoveToFront):
+            self._reverseMTFTransform(self.mWorkingArray2, lengthAfterGenericExpansion)
 
         # Reverse the BW transform
         lengthAfterBWReverse = self._reverseBWTransform(self.mWorkingArray2, lengthAfterGenericExpansion, self.mWorkingArray1, self.mWorkingArrayMaxSize)
@@ -274,13 +560,8 @@ class Dekompressor:
         if(lengthAfterBWReverse  > maxOutputDataLen_):
             raise Exception('Not enough space to store uncompressed data')
 
-        # Copy the data to the byte array, all data should be between 0-255
-        for i in range(0, lengthAfterBWReverse):
-
-            if(self.mWorkingArray1[i] > 255):
-                raise Exception('Invalid symbol, not in byte range')
-
-            outputData_[i] = self.mWorkingArray1[i]
+        # Copy the data to the output in one operation, all data should be between 0-255
+        utils.storeBytes(outputData_, self.mWorkingArray1, lengthAfterBWReverse)
 
         return lengthAfterBWReverse
 
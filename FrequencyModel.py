@@ -0,0 +1,150 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class implements the adaptive symbol frequency model used by the Arithmetic Coding encoder and decoder. The symbol
+counts are stored in a binary indexed (Fenwick) tree so that cumulative counts, count increments and the search for a
+symbol by cumulative count all take O(log V) operations, where V is the vocabulary size.
+"""
+
+import array
+
+class FrequencyModel:
+    def __init__(self, vocabularySize_):
+        """
+        Initialize the model with a count of 1 for every symbol
+
+        :param vocabularySize_: The size of the vocabulary. Symbols run from 0 to (vocabularySize_ - 1)
+        :return:
+        """
+
+        if(vocabularySize_ < 1):
+            raise Exception("Invalid vocabulary size specified")
+
+        self.mVocabularySize = vocabularySize_
+        self.mSymbolCount = array.array('q', [1]*self.mVocabularySize)                            # The count of each symbol (64-bit to support large word sizes)
+        self.mTree = array.array('q', [0]*(self.mVocabularySize + 1))                             # Binary indexed tree of the counts (1 based)
+        self.mSearchMask = 1 << (self.mVocabularySize.bit_length() - 1)                           # Largest power of two not exceeding the vocabulary size
+
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the count of each symbol to 1
+
+        :return: None
+        """
+
+        for i in range(0, self.mVocabularySize):
+            self.mSymbolCount[i] = 1
+
+        self._rebuild()
+
+    def _rebuild(self):
+        """
+        Rebuild the binary indexed tree from the symbol counts in O(V)
+
+        :return: None
+        """
+
+        tree = self.mTree
+
+        tree[0] = 0
+
+        for i in range(1, self.mVocabularySize + 1):
+            tree[i] = self.mSymbolCount[i - 1]
+
+        # Push each node's sum into its parent
+        for i in range(1, self.mVocabularySize + 1):
+            parent = i + (i & (-i))
+
+            if(parent <= self.mVocabularySize):
+                tree[parent] += tree[i]
+
+    def increment(self, symbol_):
+        """
+        Increment the count of the provided symbol by one
+
+        :param symbol_: The symbol whose count is incremented
+        :return: None
+        """
+
+        self.mSymbolCount[symbol_] += 1
+
+        tree = self.mTree
+        index = symbol_ + 1
+
+        while(index <= self.mVocabularySize):
+            tree[index] += 1
+            index += index & (-index)
+
+    def getCumulativeCount(self, symbol_):
+        """
+        Get the cumulative count of the symbol, this is the sum of the counts of all symbols up to and including symbol_
+
+        :param symbol_: The symbol for which the cumulative count is calculated
+        :return: The cumulative count
+        """
+
+        tree = self.mTree
+        index = symbol_ + 1
+        cumulativeCount = 0
+
+        while(index > 0):
+            cumulativeCount += tree[index]
+            index &= index - 1
+
+        return cumulativeCount
+
+    def findSymbol(self, cumulativeCount_):
+        """
+        Find the symbol whose cumulative count range contains cumulativeCount_. This is the first symbol whose cumulative
+        count is greater than cumulativeCount_
+
+        :param cumulativeCount_: The cumulative count to search for
+        :return: [symbol, symbolCumulativeCount] The symbol found and its cumulative count
+        """
+
+        tree = self.mTree
+        position = 0
+        remainingCount = cumulativeCount_
+        mask = self.mSearchMask
+
+        # Descend the tree, skipping over every node whose sum does not exceed the remaining count
+        while(mask > 0):
+            nextPosition = position + mask
+
+            if((nextPosition <= self.mVocabularySize) and (tree[nextPosition] <= remainingCount)):
+                position = nextPosition
+                remainingCount -= tree[nextPosition]
+
+            mask >>= 1
+
+        if(position >= self.mVocabularySize):
+            raise Exception("Symbol count of out range")
+
+        return [position, cumulativeCount_ - remainingCount + self.mSymbolCount[position]]
+
+    def normalize(self):
+        """
+        Divide the count for each symbol by 2 but ensure each symbol count is at least 1
+
+        :return: The new total count of all symbols
+        """
+
+        totalCount = 0
+
+        # Go through all the entries in the count array
+        for i in range(0, self.mVocabularySize):
+
+            value = self.mSymbolCount[i] >> 1
+
+            # Ensure the count is at least 1
+            if(value == 0):
+                value = 1
+
+            self.mSymbolCount[i] = value
+            totalCount += value
+
+        self._rebuild()
+
+        return totalCount
@@ -0,0 +1,741 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This module implements a self describing container format for data compressed with Kompressor. KompressedWriter breaks
+the data up into blocks of up to one section, compresses each block independently (the coder statistics are reset for
+every block) and stores it in a frame. KompressedReader reads the frames back either in order (streaming) or through the
+block index at the end of the archive (random access).
+
+All values are stored big endian. The layout is as follows:
+
+    Header:     magic 'KMPR', version, flags, coder, word size, section size, generic max run
+    Frames:     compressed length, uncompressed length, CRC32 of the uncompressed data, compressed data
+    End frame:  a frame header with all fields set to 0
+    Index:      for every block the offset of its frame and the offset of its data in the uncompressed stream
+    Trailer:    index offset, uncompressed size, block count, magic 'KMPI'
+
+Offsets are relative to the start of the archive header.
+"""
+
+import bisect
+import itertools
+import struct
+import zlib
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+import utils
+
+ARCHIVE_MAGIC = b'KMPR'
+ARCHIVE_VERSION = 1
+TRAILER_MAGIC = b'KMPI'
+
+FLAG_BIJECTIVE_RUN_LENGTH = 0x01               # Runs were replaced using Kompressor.RUN_LENGTH_BIJECTIVE
+FLAG_MOVE_TO_FRONT = 0x02                      # The move-to-front stage was used
+
+HEADER_FORMAT = '>4sBBBBII'                    # Magic, version, flags, coder, word size, section size, generic max run
+FRAME_HEADER_FORMAT = '>III'                   # Compressed length, uncompressed length, CRC32
+INDEX_ENTRY_FORMAT = '>QQ'                     # Frame offset, uncompressed offset
+TRAILER_FORMAT = '>QQI4s'                      # Index offset, uncompressed size, block count, magic
+
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FORMAT)
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY_FORMAT)
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+
+DEFAULT_SECTION_SIZE = 1 << 16                 # Section size used by compress_stream unless told otherwise
+DEFAULT_GENERIC_MAX_RUN = 10                   # Generic max run used by compress_stream unless told otherwise
+
+# Source of the default archive keys used for the block cache, every reader gets a unique key
+_archiveKeys = itertools.count()
+
+def packArchiveHeader(sectionSize_, genericMaxRun_, encoderWordSize_, coder_, runLengthMode_, moveToFront_):
+    """
+    Create the archive header recording the Kompressor parameters
+
+    :param sectionSize_: Max size of a block
+    :param genericMaxRun_: The max run of generic symbols
+    :param encoderWordSize_: The size of words (in bits) used for encoding
+    :param coder_: The entropy coder, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+    :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+    :param moveToFront_: The move-to-front stage is performed
+    :return: The header (bytes)
+    """
+
+    flags = 0
+
+    if(runLengthMode_ == Kompressor.RUN_LENGTH_BIJECTIVE):
+        flags |= FLAG_BIJECTIVE_RUN_LENGTH
+
+    if(moveToFront_):
+        flags |= FLAG_MOVE_TO_FRONT
+
+    return struct.pack(HEADER_FORMAT, ARCHIVE_MAGIC, ARCHIVE_VERSION, flags, coder_, encoderWordSize_, sectionSize_, genericMaxRun_)
+
+def packFrameHeader(compressedDataLen_, uncompressedDataLen_, checksum_):
+    """
+    Create the header of a frame, the compressed data follows it
+
+    :param compressedDataLen_: The size of the compressed data
+    :param uncompressedDataLen_: The size of the block
+    :param checksum_: CRC32 of the uncompressed data of the block
+    :return: The frame header (bytes)
+    """
+
+    return struct.pack(FRAME_HEADER_FORMAT, compressedDataLen_, uncompressedDataLen_, checksum_)
+
+def packArchiveEnd(blockIndex_, archiveSize_, uncompressedSize_):
+    """
+    Create the end of an archive: the end frame, the block index and the trailer
+
+    :param blockIndex_: [frame offset, uncompressed offset] of every block
+    :param archiveSize_: The size of the archive up to the end frame
+    :param uncompressedSize_: The size of all the data in the blocks
+    :return: The end of the archive (bytearray)
+    """
+
+    archiveEnd = bytearray(packFrameHeader(0, 0, 0))
+
+    for [frameOffset, uncompressedOffset] in blockIndex_:
+        archiveEnd += struct.pack(INDEX_ENTRY_FORMAT, frameOffset, uncompressedOffset)
+
+    archiveEnd += struct.pack(TRAILER_FORMAT, archiveSize_ + FRAME_HEADER_SIZE, uncompressedSize_, len(blockIndex_), TRAILER_MAGIC)
+
+    return archiveEnd
+
+def parseArchiveHeader(headerData_):
+    """
+    Check an archive header and get the Dekompressor parameters stored in it
+
+    :param headerData_: The HEADER_SIZE bytes of the header
+    :return: [coder, word size, section size, generic max run, run length mode, move to front]
+    """
+
+    [magic, version, flags, coder, wordSize, sectionSize, genericMaxRun] = struct.unpack(HEADER_FORMAT, headerData_)
+
+    if(magic != ARCHIVE_MAGIC):
+        raise Exception('Not a kompressed archive')
+
+    if(version != ARCHIVE_VERSION):
+        raise Exception('Unsupported archive version [' + str(version) + ']')
+
+    if(flags & FLAG_BIJECTIVE_RUN_LENGTH):
+        runLengthMode = Dekompressor.RUN_LENGTH_BIJECTIVE
+    else:
+        runLengthMode = Dekompressor.RUN_LENGTH_GENERIC
+
+    return [coder, wordSize, sectionSize, genericMaxRun, runLengthMode, ((flags & FLAG_MOVE_TO_FRONT) != 0)]
+
+def calculateMaxCompressedBlockLen(sectionSize_, wordSize_):
+    """
+    Calculate the max size of the compressed data of a block. A block never produces more symbols than the transformed
+    section (the section plus the bytes storing the BW transform index) plus the termination symbol
+
+    :param sectionSize_: Max size of a block
+    :param wordSize_: The size of words (in bits) used for encoding
+    :return: The max size of the compressed data of a frame
+    """
+
+    return utils.calculateMaxCompressedBytes(sectionSize_ + utils.getMinBytesToRepresent(sectionSize_) + 1, wordSize_)
+
+def kompressBlock(kompressor_, blockData_, compressedData_):
+    """
+    Compress one block with reset coder statistics, so that it can be decompressed on its own. Used by every writer,
+    whichever thread or process the block is compressed in
+
+    :param kompressor_: The Kompressor to use
+    :param blockData_: The data of the block, up to one section in size (bytes-like)
+    :param compressedData_: Where the compressed data is stored, it must hold calculateMaxCompressedBlockLen() bytes (writable bytes-like)
+    :return: [uncompressed size, CRC32 of the uncompressed data, compressed size]
+    """
+
+    kompressor_.reset()
+    compressedDataLen = kompressor_.kompress(blockData_, len(blockData_), compressedData_, len(compressedData_))
+
+    return [len(blockData_), zlib.crc32(blockData_), compressedDataLen]
+
+def dekompressBlock(dekompressor_, compressedData_, compressedDataLen_, uncompressedData_, uncompressedDataLen_, checksum_):
+    """
+    Decompress one block with reset coder statistics and verify it against its frame header. Used by every reader,
+    whichever thread or process the block is decompressed in
+
+    :param dekompressor_: The Dekompressor to use
+    :param compressedData_: The compressed data of the block (bytes-like)
+    :param compressedDataLen_: The size of the compressed data
+    :param uncompressedData_: Where the block is decompressed to (writable memoryview of bytes)
+    :param uncompressedDataLen_: The uncompressed size stored in the frame header
+    :param checksum_: The CRC32 stored in the frame header
+    :return: The size of the block
+    """
+
+    # Every block was compressed with fresh statistics
+    dekompressor_.reset()
+    blockLen = dekompressor_.dekompress(compressedData_, compressedDataLen_, uncompressedData_, min(len(uncompressedData_), dekompressor_.mSectionSize))
+
+    if(blockLen != uncompressedDataLen_):
+        raise Exception('Block length mismatch')
+
+    if(zlib.crc32(uncompressedData_[0:blockLen]) != checksum_):
+        raise Exception('Block checksum mismatch')
+
+    return blockLen
+
+class KompressedWriter:
+    def __init__(self, file_, sectionSize_, genericMaxRun_, encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC,
+                 runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC, moveToFront_ = False):
+        """
+        Initialize the writer and write the archive header to file_. The Kompressor parameters are recorded in the
+        header so the archive can be read back without knowing them
+
+        :param file_: Binary file object the archive is written to
+        :param sectionSize_: Max size of a block. Data is compressed one block at a time
+        :param genericMaxRun_: The max run of generic symbols
+        :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+        :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+        :param moveToFront_: Perform the move-to-front stage
+        :return:
+        """
+
+        # Ensure that generic max run is at least one, this matches Kompressor
+        if(genericMaxRun_ < 1):
+            genericMaxRun_ = 1
+
+        self.mKompressor = Kompressor(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+
+        self.mFile = file_
+        self.mSectionSize = sectionSize_
+        self.mPendingData = bytearray()                                         # Data that has not filled a block yet
+        self.mBlockIndex = []                                                   # [frame offset, uncompressed offset] of every block
+        self.mArchiveSize = 0                                                   # The number of bytes written to file_
+        self.mUncompressedSize = 0                                              # The number of bytes compressed into blocks
+        self.mClosed = False
+
+        self.mMaxCompressedDataLen = calculateMaxCompressedBlockLen(sectionSize_, encoderWordSize_)
+        self.mCompressedData = bytearray(self.mMaxCompressedDataLen)
+
+        self._writeBytes(packArchiveHeader(sectionSize_, genericMaxRun_, encoderWordSize_, coder_, runLengthMode_, moveToFront_))
+
+    def _writeBytes(self, data_):
+        """
+        Write data to the file and keep track of the archive size
+
+        :param data_: The bytes to write (bytes-like)
+        :return: None
+        """
+
+        self.mFile.write(data_)
+        self.mArchiveSize += len(data_)
+
+    def _writeBlock(self, blockData_):
+        """
+        Compress a block of data and write it as a frame. The coder statistics are reset first so that every block can
+        be decompressed on its own
+
+        :param blockData_: The data of the block, up to one section in size (bytes-like)
+        :return: None
+        """
+
+        [blockLen, blockCrc, compressedDataLen] = kompressBlock(self.mKompressor, blockData_, self.mCompressedData)
+
+        self._writeFrame(blockLen, blockCrc, memoryview(self.mCompressedData)[0:compressedDataLen])
+
+    def _writeFrame(self, blockLen_, blockCrc_, compressedData_):
+        """
+        Write a compressed block as a frame and add it to the block index
+
+        :param blockLen_: The uncompressed size of the block
+        :param blockCrc_: CRC32 of the uncompressed data of the block
+        :param compressedData_: The compressed data of the block (bytes-like)
+        :return: None
+        """
+
+        self.mBlockIndex.append([self.mArchiveSize, self.mUncompressedSize])
+
+        self._writeBytes(packFrameHeader(len(compressedData_), blockLen_, blockCrc_))
+        self._writeBytes(compressedData_)
+
+        self.mUncompressedSize += blockLen_
+
+    def write(self, data_):
+        """
+        Add data to the archive. Every time a full section of data is available it is compressed and written as a block.
+        Only data that does not fill a section is copied, full sections are compressed straight from data_
+
+        :param data_: The data to add (bytes-like)
+        :return: The number of bytes added
+        """
+
+        if(self.mClosed):
+            raise Exception('Archive is closed')
+
+        dataView = memoryview(data_).cast('B')
+        dataOffset = 0
+
+        # Top up the pending data to a full section first
+        if(len(self.mPendingData) > 0):
+            dataOffset = min(self.mSectionSize - len(self.mPendingData), len(dataView))
+            self.mPendingData += dataView[0:dataOffset]
+
+            if(len(self.mPendingData) < self.mSectionSize):
+                return len(dataView)
+
+            self._writeBlock(self.mPendingData)
+            self.mPendingData = bytearray()
+
+        # Compress all the full sections, the rest waits for more data
+        while((len(dataView) - dataOffset) >= self.mSectionSize):
+            self._writeBlock(dataView[dataOffset:dataOffset + self.mSectionSize])
+            dataOffset += self.mSectionSize
+
+        self.mPendingData += dataView[dataOffset:]
+
+        return len(dataView)
+
+    def flush(self):
+        """
+        Compress and write any data waiting for a full section as a shorter block
+
+        :return: None
+        """
+
+        if(self.mClosed):
+            raise Exception('Archive is closed')
+
+        if(len(self.mPendingData) > 0):
+            self._writeBlock(self.mPendingData)
+            self.mPendingData = bytearray()
+
+    def close(self):
+        """
+        Write any outstanding data, the end frame, the block index and the trailer. No more data can be added after the
+        archive is closed. The file itself is not closed
+
+        :return: None
+        """
+
+        if(self.mClosed):
+            return
+
+        self.flush()
+        self.mClosed = True
+
+        self._writeBytes(packArchiveEnd(self.mBlockIndex, self.mArchiveSize, self.mUncompressedSize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType_, excValue_, traceback_):
+        # Only complete the archive if the data was written without errors
+        if(excType_ is None):
+            self.close()
+
+        return False
+
+class KompressedReader:
+    def __init__(self, file_, useNumpy_ = None, blockCache_ = None, archiveKey_ = None):
+        """
+        Initialize the reader and read the archive header from file_. The archive must start at the current position of
+        file_. The block index is only read when it is needed, so streaming through the blocks with readBlocks() works
+        on files that can not seek
+
+        :param file_: Binary file object the archive is read from
+        :param useNumpy_: Passed to Dekompressor. If None NumPy will be used when it is available
+        :param blockCache_: BlockCache used by readBlock() and read_at() to keep recently decompressed blocks. If None blocks are not cached
+        :param archiveKey_: Identifies the archive in blockCache_. Readers of the same archive can share cached blocks by using the same key. If None a unique key is used
+        :return:
+        """
+
+        if(archiveKey_ is None):
+            archiveKey_ = ('reader', next(_archiveKeys))
+
+        self.mFile = file_
+        self.mBlockCache = blockCache_
+        self.mArchiveKey = archiveKey_
+        self.mStartOffset = file_.tell() if file_.seekable() else 0
+
+        [coder, wordSize, sectionSize, genericMaxRun, runLengthMode, moveToFront] = parseArchiveHeader(self._readBytes(HEADER_SIZE))
+
+        self.mCoder = coder
+        self.mWordSize = wordSize
+        self.mSectionSize = sectionSize
+        self.mGenericMaxRun = genericMaxRun
+        self.mRunLengthMode = runLengthMode
+        self.mMoveToFront = moveToFront
+
+        self.mDekompressor = Dekompressor(sectionSize, genericMaxRun, wordSize, useNumpy_, coder, runLengthMode, self.mMoveToFront)
+
+        # Buffers reused for every block
+        self.mMaxCompressedDataLen = calculateMaxCompressedBlockLen(sectionSize, wordSize)
+        self.mCompressedData = bytearray(self.mMaxCompressedDataLen)
+        self.mCompressedDataView = memoryview(self.mCompressedData)
+        self.mUncompressedData = bytearray(sectionSize)
+        self.mUncompressedDataView = memoryview(self.mUncompressedData)
+
+        self.mBlockIndex = None                                                 # [frame offset, uncompressed offset] of every block
+        self.mBlockOffsets = None                                               # Uncompressed offset of every block, used for binary search
+        self.mUncompressedSize = 0                                              # Total size of the uncompressed data
+
+    def _readBytes(self, count_):
+        """
+        Read exactly count_ bytes from the file, an exception is thrown if the file ends first. Short reads are
+        continued until all the bytes are read
+
+        :param count_: The number of bytes to read
+        :return: The bytes read (bytearray)
+        """
+
+        data = bytearray(count_)
+        self._readBytesInto(memoryview(data))
+
+        return data
+
+    def _readBytesInto(self, buffer_):
+        """
+        Fill buffer_ from the file, an exception is thrown if the file ends first
+
+        :param buffer_: The buffer to fill (writable memoryview)
+        :return: None
+        """
+
+        count = 0
+
+        while(count < len(buffer_)):
+            readCount = self.mFile.readinto(buffer_[count:])
+
+            if(not readCount):
+                raise Exception('Unexpected end of archive')
+
+            count += readCount
+
+    def _readIndex(self):
+        """
+        Read the trailer at the end of the file and the block index it points to
+
+        :return: None
+        """
+
+        if(self.mBlockIndex is not None):
+            return
+
+        archiveEnd = self.mFile.seek(0, 2)
+
+        if((archiveEnd - self.mStartOffset) < (HEADER_SIZE + FRAME_HEADER_SIZE + TRAILER_SIZE)):
+            raise Exception('Unexpected end of archive')
+
+        self.mFile.seek(archiveEnd - TRAILER_SIZE)
+        [indexOffset, uncompressedSize, blockCount, magic] = struct.unpack(TRAILER_FORMAT, self._readBytes(TRAILER_SIZE))
+
+        if(magic != TRAILER_MAGIC):
+            raise Exception('Archive trailer not found')
+
+        if((self.mStartOffset + indexOffset + (blockCount*INDEX_ENTRY_SIZE)) != (archiveEnd - TRAILER_SIZE)):
+            raise Exception('Invalid block index')
+
+        self.mFile.seek(self.mStartOffset + indexOffset)
+        index = self._readBytes(blockCount*INDEX_ENTRY_SIZE)
+
+        self.mBlockIndex = [list(entry) for entry in struct.iter_unpack(INDEX_ENTRY_FORMAT, index)]
+        self.mBlockOffsets = [uncompressedOffset for [frameOffset, uncompressedOffset] in self.mBlockIndex]
+        self.mUncompressedSize = uncompressedSize
+
+    def _readFrameHeader(self):
+        """
+        Read and check the header of the frame at the current file position
+
+        :return: [compressed length, uncompressed length, CRC32], the compressed length is 0 for the end frame
+        """
+
+        [compressedDataLen, uncompressedDataLen, checksum] = struct.unpack(FRAME_HEADER_FORMAT, self._readBytes(FRAME_HEADER_SIZE))
+
+        if(uncompressedDataLen > self.mSectionSize):
+            raise Exception('Block exceeds section size')
+
+        if(compressedDataLen > self.mMaxCompressedDataLen):
+            raise Exception('Compressed block too large')
+
+        return [compressedDataLen, uncompressedDataLen, checksum]
+
+    def _readFrame(self, uncompressedData_):
+        """
+        Read the frame at the current file position, decompress it into uncompressedData_ and verify its checksum. The
+        compressed data buffer is reused for every frame
+
+        :param uncompressedData_: Where the block is decompressed to (writable memoryview of bytes)
+        :return: The size of the block or -1 if the end frame was reached
+        """
+
+        [compressedDataLen, uncompressedDataLen, checksum] = self._readFrameHeader()
+
+        if(compressedDataLen == 0):
+            return -1
+
+        self._readBytesInto(self.mCompressedDataView[0:compressedDataLen])
+
+        return dekompressBlock(self.mDekompressor, self.mCompressedData, compressedDataLen, uncompressedData_, uncompressedDataLen, checksum)
+
+    def getBlockCount(self):
+        """
+        Get the number of blocks in the archive
+
+        :return: The number of blocks
+        """
+
+        self._readIndex()
+
+        return len(self.mBlockIndex)
+
+    def getUncompressedSize(self):
+        """
+        Get the total size of the data stored in the archive
+
+        :return: The size of the uncompressed data
+        """
+
+        self._readIndex()
+
+        return self.mUncompressedSize
+
+    def _checkBlockIndex(self, blockIndex_):
+        """
+        Read the block index if needed and ensure a block is in it
+
+        :param blockIndex_: The index of the block
+        :return: None
+        """
+
+        self._readIndex()
+
+        if((blockIndex_ < 0) or (blockIndex_ >= len(self.mBlockIndex))):
+            raise Exception('Block index out of range')
+
+    def _readIndexedFrame(self, blockIndex_, uncompressedData_):
+        """
+        Find the frame of a block through the block index and decompress it into uncompressedData_
+
+        :param blockIndex_: The index of the block, it must be in the block index
+        :param uncompressedData_: Where the block is decompressed to (writable memoryview of bytes)
+        :return: The size of the block
+        """
+
+        self.mFile.seek(self.mStartOffset + self.mBlockIndex[blockIndex_][0])
+        blockLen = self._readFrame(uncompressedData_)
+
+        if(blockLen < 0):
+            raise Exception('Invalid block index')
+
+        return blockLen
+
+    def _getBlock(self, blockIndex_):
+        """
+        Get a block from the block cache, or decompress it into the reader buffer and add it to the cache
+
+        :param blockIndex_: The index of the block to read
+        :return: The block data, bytes if a block cache is used and a memoryview of the reader buffer otherwise
+        """
+
+        self._checkBlockIndex(blockIndex_)
+
+        if(self.mBlockCache is not None):
+            blockData = self.mBlockCache.get((self.mArchiveKey, blockIndex_))
+
+            if(blockData is not None):
+                return blockData
+
+        blockLen = self._readIndexedFrame(blockIndex_, self.mUncompressedDataView)
+
+        if(self.mBlockCache is not None):
+            return self.mBlockCache.put((self.mArchiveKey, blockIndex_), self.mUncompressedDataView[0:blockLen])
+
+        return self.mUncompressedDataView[0:blockLen]
+
+    def readBlock(self, blockIndex_):
+        """
+        Decompress a single block using the block index. If a block cache is used the block is taken from the cache
+        when possible and added to it otherwise
+
+        :param blockIndex_: The index of the block to read
+        :return: The uncompressed data of the block (bytes)
+        """
+
+        # Cached blocks are already bytes and are returned without a copy
+        return bytes(self._getBlock(blockIndex_))
+
+    def readBlockView(self, blockIndex_):
+        """
+        Decompress a single block using the block index, as readBlock() does, without copying it. Without a block cache
+        the view refers to the reader buffer and is only valid until the next block is read
+
+        :param blockIndex_: The index of the block to read
+        :return: The uncompressed data of the block (read only memoryview starting at the beginning of the object it refers to)
+        """
+
+        return memoryview(self._getBlock(blockIndex_)).toreadonly()
+
+    def read_at(self, offset_, length_):
+        """
+        Read length_ bytes of the uncompressed data starting at offset_. The block holding offset_ is found with a binary
+        search of the block index and only the blocks covering the requested range are decompressed. Fewer bytes are
+        returned if the range goes past the end of the data
+
+        :param offset_: Offset into the uncompressed data
+        :param length_: The number of bytes to read
+        :return: The data read (bytes)
+        """
+
+        if((offset_ < 0) or (length_ < 0)):
+            raise Exception('Invalid offset or length')
+
+        self._readIndex()
+
+        endOffset = min(offset_ + length_, self.mUncompressedSize)
+
+        if(offset_ >= endOffset):
+            return b''
+
+        # The covering block is the last block that starts at or before the offset
+        blockIndex = bisect.bisect_right(self.mBlockOffsets, offset_) - 1
+        data = bytearray()
+        currentOffset = offset_
+
+        while(currentOffset < endOffset):
+            blockData = self.readBlockView(blockIndex)
+            blockStart = self.mBlockOffsets[blockIndex]
+
+            data += blockData[currentOffset - blockStart:endOffset - blockStart]
+            currentOffset = blockStart + len(blockData)
+            blockIndex += 1
+
+        return bytes(data)
+
+    def readBlockInto(self, buffer_, blockIndex_ = None):
+        """
+        Decompress a block straight into buffer_. If blockIndex_ is None the next block in order is read from the current
+        file position, which is the first block once the reader is created and the following block after every call.
+        The block index is not used in that case so this works on files that can not seek. Otherwise the block is found
+        through the block index and the block cache is used as readBlock() does
+
+        :param buffer_: Writable bytes-like object the block is decompressed into, a full section must fit
+        :param blockIndex_: The index of the block to read, None to read the next block in order
+        :return: The size of the block or 0 once the end of the archive is reached
+        """
+
+        bufferView = memoryview(buffer_).cast('B')
+
+        if(blockIndex_ is None):
+            blockLen = self._readFrame(bufferView)
+
+            if(blockLen < 0):
+                return 0
+
+            return blockLen
+
+        # With a block cache the block is copied out of the cache, or added to it after it is decompressed
+        if(self.mBlockCache is not None):
+            blockData = self._getBlock(blockIndex_)
+            bufferView[0:len(blockData)] = blockData
+
+            return len(blockData)
+
+        self._checkBlockIndex(blockIndex_)
+
+        return self._readIndexedFrame(blockIndex_, bufferView)
+
+    def readBlocks(self):
+        """
+        Decompress the blocks in order, starting from the first block. The block index is not used so this works on
+        files that can not seek
+
+        :return: Generator that yields the uncompressed data of every block (bytearray)
+        """
+
+        if(self.mFile.seekable()):
+            self.mFile.seek(self.mStartOffset + HEADER_SIZE)
+
+        while(True):
+            blockLen = self.readBlockInto(self.mUncompressedData)
+
+            if(blockLen == 0):
+                return
+
+            yield self.mUncompressedData[0:blockLen]
+
+    def read(self):
+        """
+        Decompress all the data in the archive
+
+        :return: The uncompressed data (bytearray)
+        """
+
+        data = bytearray()
+
+        for blockData in self.readBlocks():
+            data += blockData
+
+        return data
+
+def compress_stream(src_, dst_, sectionSize_ = DEFAULT_SECTION_SIZE, genericMaxRun_ = DEFAULT_GENERIC_MAX_RUN, encoderWordSize_ = 16, useNumpy_ = None,
+                    coder_ = Kompressor.CODER_ARITHMETIC, runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC, moveToFront_ = False):
+    """
+    Compress everything read from src_ into an archive written to dst_. The input is read one section at a time into a
+    single buffer and every block is written as soon as it is compressed, so memory use does not depend on the size of
+    the input
+
+    :param src_: Binary file object the data is read from
+    :param dst_: Binary file object the archive is written to
+    :param sectionSize_: Max size of a block
+    :param genericMaxRun_: The max run of generic symbols
+    :param encoderWordSize_: The size of words (in bits) to use for encoding data
+    :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+    :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+    :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+    :param moveToFront_: Perform the move-to-front stage
+    :return: [uncompressed size, archive size]
+    """
+
+    writer = KompressedWriter(dst_, sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+    sectionData = bytearray(sectionSize_)
+    sectionView = memoryview(sectionData)
+
+    while(True):
+        readCount = src_.readinto(sectionData)
+
+        # A non-blocking source returns None when no data is ready, that is not the end of the stream
+        if(readCount is None):
+            raise Exception('No data available from non-blocking source')
+
+        if(readCount == 0):
+            break
+
+        writer.write(sectionView[0:readCount])
+
+    writer.close()
+
+    return [writer.mUncompressedSize, writer.mArchiveSize]
+
+def decompress_stream(src_, dst_, useNumpy_ = None):
+    """
+    Decompress the archive read from src_ and write the data to dst_. The blocks are read in order without the block
+    index, so src_ does not need to seek. Every block is decompressed into the same buffer and written straight from it
+
+    :param src_: Binary file object the archive is read from
+    :param dst_: Binary file object the data is written to
+    :param useNumpy_: Passed to Dekompressor. If None NumPy will be used when it is available
+    :return: The number of bytes written to dst_
+    """
+
+    reader = KompressedReader(src_, useNumpy_)
+    blockData = bytearray(reader.mSectionSize)
+    blockView = memoryview(blockData)
+    uncompressedSize = 0
+
+    while(True):
+        blockLen = reader.readBlockInto(blockData)
+
+        if(blockLen == 0):
+            break
+
+        dst_.write(blockView[0:blockLen])
+        uncompressedSize += blockLen
+
+    return uncompressedSize
@@ -12,18 +12,29 @@ The compressor will go through five stages in order to compress the data.
 The stages are as follows:
     1. The Burrows-Wheeler transform will be performed on the data. This stage will maximize the runs of symbols
     2. Replace runs of symbols with initial symbol and extra symbol indicating length of run. Extended symbols will be
-       added to support this.
-    3. Encoded data into binary using an encoder
+       added to support this. Alternatively the length of the run can be written in bijective base 2 using two
+       extended symbols, RUNA and RUNB (bzip2 style), so a run of length L costs O(log L) symbols.
+       Optionally a move-to-front transform is performed before this stage, which turns the symbols of every BW
+       context into small ranks.
+    3. Encoded data into binary using an encoder (arithmetic coder or range coder)
 """
 
 from array import *
 from AREncoder import AREncoder
+from RangeEncoder import RangeEncoder
+import SuffixArray
 import utils
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 dataSorting = None
 dataSortingSize = 0
 
-# This class is used to sort data for the BW transform
+# This class is used to sort data for the BW transform with a comparison sort. The BW transform now sorts rotations using
+# the suffix array (see SuffixArray.py), this class is kept as the reference ordering
 class SortKey:
     def __init__(self, keyData_, *args):
         self.mIndex = keyData_[0]
@@ -62,14 +73,23 @@ class Kompressor:
     BASE_BINARY_VOCABULARY_SIZE = 257 # 0-255 for 8-bit characters plus termination symbol
     TERMINATION_SYMBOL = 256 # Used to indicate end of compression sequence
     INVALID_SYMBOL = 0xFFFF
+    CODER_ARITHMETIC = 0 # Bit oriented arithmetic coder (AREncoder)
+    CODER_RANGE = 1 # Byte oriented range coder (RangeEncoder)
+    RUN_LENGTH_GENERIC = 0 # One extended symbol per run of up to genericMaxRun symbols
+    RUN_LENGTH_BIJECTIVE = 1 # Run length written in bijective base 2 with the RUNA and RUNB symbols
+    RUN_LENGTH_BIJECTIVE_SYMBOL_COUNT = 2 # RUNA and RUNB
 
-    def __init__(self, sectionSize_, genericMaxRun_, encoderWordSize_ = 16):
+    def __init__(self, sectionSize_, genericMaxRun_, encoderWordSize_ = 16, useNumpy_ = None, coder_ = CODER_ARITHMETIC, runLengthMode_ = RUN_LENGTH_GENERIC, moveToFront_ = False):
         """
         Constructor
 
         :param sectionSize_: Data section size to use to break up data when compressing
         :param genericMaxRun_: The max run of generic symbols
         :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Use the NumPy backed BW transform (prefix doubling) and run replacement. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, CODER_ARITHMETIC or CODER_RANGE. The range coder does not use encoderWordSize_
+        :param runLengthMode_: How runs are replaced, RUN_LENGTH_GENERIC or RUN_LENGTH_BIJECTIVE. The bijective mode does not use genericMaxRun_
+        :param moveToFront_: Perform the move-to-front transform on the BW transformed data before runs are replaced
         :return:
         """
 
@@ -81,15 +101,38 @@ class Kompressor:
         if(genericMaxRun_ < 1):
             genericMaxRun_ = 1
 
+        # Use NumPy if it is available unless told otherwise
+        if(useNumpy_ is None):
+            useNumpy_ = utils.isNumpyAvailable()
+        elif(useNumpy_ and (not utils.isNumpyAvailable())):
+            raise Exception('NumPy is not available')
+
+        self.mUseNumpy = useNumpy_
         self.mSectionSize = sectionSize_
         self.mGenericMaxRun = genericMaxRun_
         self.mGenericRunLengthStart = self.BASE_BINARY_VOCABULARY_SIZE
+        self.mRunSymbolA = self.BASE_BINARY_VOCABULARY_SIZE                    # RUNA, a bijective base 2 digit of 1. RUNB (digit of 2) follows it
+        self.mRunLengthMode = runLengthMode_
+        self.mMoveToFront = moveToFront_
+
+        if(runLengthMode_ == self.RUN_LENGTH_GENERIC):
+            self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + genericMaxRun_
+        elif(runLengthMode_ == self.RUN_LENGTH_BIJECTIVE):
+            self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + self.RUN_LENGTH_BIJECTIVE_SYMBOL_COUNT
+        else:
+            raise Exception('Invalid run length mode specified')
 
-        self.mVocabularySize = self.BASE_BINARY_VOCABULARY_SIZE + genericMaxRun_
         self.mBWTransformStoreBytes = utils.getMinBytesToRepresent(sectionSize_)
         self.mSectionTransformDataMaxSize = sectionSize_ + self.mBWTransformStoreBytes
-        self.mSectionTransformData = array('i', [0]*(self.mSectionTransformDataMaxSize))
-        self.mEncoder = AREncoder(encoderWordSize_, self.mVocabularySize)
+        self.mSectionTransformData = array('i', [0]*(self.mSectionTransformDataMaxSize + 1))       # One extra entry for the termination symbol
+        self.mCoder = coder_
+
+        if(coder_ == self.CODER_ARITHMETIC):
+            self.mEncoder = AREncoder(encoderWordSize_, self.mVocabularySize)
+        elif(coder_ == self.CODER_RANGE):
+            self.mEncoder = RangeEncoder(self.mVocabularySize)
+        else:
+            raise Exception('Invalid coder specified')
 
         self.mContinuousModeEnabled = False
         self.mContinuousModeTotalData = 0
@@ -117,6 +160,9 @@ class Kompressor:
         if((dataSize_ == 0) or (maxRunLength_ <= 1)):
             return dataSize_
 
+        if(self.mUseNumpy):
+            return self._replaceRunsGenericNumpy(runLengthSymbolStart_, maxRunLength_, dataSection_, dataSize_)
+
         # Go through all the data
         for i in range(0, dataSize_):
             # If the next symbol encountered is a repeat increment the duplicate count, otherwise process change
@@ -162,6 +208,165 @@ class Kompressor:
 
         return outDataIndex
 
+    def _replaceRunsGenericNumpy(self, runLengthSymbolStart_, maxRunLength_, dataSection_, dataSize_):
+        """
+        Replace runs of symbols with generic symbol replacements using NumPy. The runs are found in bulk and the number of
+        max run symbols and the remainder symbol for every run are calculated arithmetically. The output is the same as
+        the one produced by _replaceRunsGeneric.
+
+        :param runLengthSymbolStart_: First extended symbol that is used to indicate how many times the original symbol is repeated. First symbol indicates a repeat of one
+        :param maxRunLength_: The max size of a run that can be replaced. Must be greater than 1
+        :param dataSection_: The data section on which we are working. This is an array
+        :param dataSize_: The size of the array. Must be greater than 0
+        :return: The new size of the dataSection_ array after replacement is finished
+        """
+
+        maxDuplicateCount = maxRunLength_ - 1
+        data = numpy.asarray(dataSection_[0:dataSize_], dtype=numpy.int64)
+
+        # A run starts wherever the symbol differs from the previous one
+        runStarts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(data)) + 1))
+        duplicateCounts = numpy.diff(numpy.append(runStarts, dataSize_)) - 1
+
+        # Every run is replaced by its symbol, a max run symbol for every full max run of duplicates and a symbol for
+        # the remaining 1 to maxDuplicateCount duplicates
+        maxRunSymbolCounts = numpy.maximum(duplicateCounts - 1, 0)//maxDuplicateCount
+        remainingDuplicateCounts = duplicateCounts - (maxRunSymbolCounts*maxDuplicateCount)
+        hasRemainder = (remainingDuplicateCounts > 0)
+        outputCounts = 1 + maxRunSymbolCounts + hasRemainder
+        outputStarts = numpy.cumsum(outputCounts) - outputCounts
+        outputSize = int(outputStarts[-1] + outputCounts[-1])
+
+        # Start with every position holding the max run symbol and scatter the run symbols and remainder symbols over it
+        output = numpy.full(outputSize, runLengthSymbolStart_ + maxDuplicateCount - 1, dtype=numpy.intc)
+        output[outputStarts] = data[runStarts]
+        output[(outputStarts + 1 + maxRunSymbolCounts)[hasRemainder]] = runLengthSymbolStart_ + remainingDuplicateCounts[hasRemainder] - 1
+
+        replacedData = array('i')
+        replacedData.frombytes(output.tobytes())
+        dataSection_[0:outputSize] = replacedData
+
+        return outputSize
+
+    def _replaceRunsBijective(self, runSymbolA_, dataSection_, dataSize_):
+        """
+        Replace runs of symbols with the first symbol in the run followed by the number of times it's repeated written
+        in bijective base 2, least significant digit first. RUNA (runSymbolA_) is a digit of 1 and RUNB (runSymbolA_ + 1)
+        is a digit of 2, so a run of length L is replaced by 1 + floor(log2(L)) symbols.
+
+        :param runSymbolA_: The RUNA symbol, RUNB is the symbol that follows it
+        :param dataSection_: The data section on which we are working. This is an array
+        :param dataSize_: The size of the array
+        :return: The new size of the dataSection_ array after replacement is finished
+        """
+
+        # If no data just return 0
+        if(dataSize_ == 0):
+            return 0
+
+        if(self.mUseNumpy):
+            return self._replaceRunsBijectiveNumpy(runSymbolA_, dataSection_, dataSize_)
+
+        outDataIndex = 0
+        runStart = 0
+
+        # Go through all the runs. The replacement is never longer than the run so it can be written in place
+        while(runStart < dataSize_):
+            currentSymbol = dataSection_[runStart]
+            runEnd = runStart + 1
+
+            while((runEnd < dataSize_) and (dataSection_[runEnd] == currentSymbol)):
+                runEnd += 1
+
+            # Insert the symbol
+            dataSection_[outDataIndex] = currentSymbol
+            outDataIndex += 1
+
+            # Insert the digits of the duplicate count. Run count does not include original symbol
+            duplicateCount = runEnd - runStart - 1
+
+            while(duplicateCount > 0):
+                if(duplicateCount & 0x01):
+                    dataSection_[outDataIndex] = runSymbolA_
+                    duplicateCount = (duplicateCount - 1) >> 1
+                else:
+                    dataSection_[outDataIndex] = runSymbolA_ + 1
+                    duplicateCount = (duplicateCount - 2) >> 1
+
+                outDataIndex += 1
+
+            runStart = runEnd
+
+        return outDataIndex
+
+    def _replaceRunsBijectiveNumpy(self, runSymbolA_, dataSection_, dataSize_):
+        """
+        Replace runs of symbols with bijective base 2 run lengths using NumPy. The output is the same as the one produced
+        by _replaceRunsBijective.
+
+        The bijective base 2 digits of a count d are the bits of d + 1 below its leading bit, least significant first,
+        with a 0 bit written as RUNA and a 1 bit written as RUNB. This lets the digits of every run be calculated in bulk.
+
+        :param runSymbolA_: The RUNA symbol, RUNB is the symbol that follows it
+        :param dataSection_: The data section on which we are working. This is an array
+        :param dataSize_: The size of the array. Must be greater than 0
+        :return: The new size of the dataSection_ array after replacement is finished
+        """
+
+        data = numpy.asarray(dataSection_[0:dataSize_], dtype=numpy.int64)
+
+        # A run starts wherever the symbol differs from the previous one
+        runStarts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(data)) + 1))
+        digitValues = numpy.diff(numpy.append(runStarts, dataSize_))
+
+        # The number of digits is one less than the bit length of d + 1 (frexp returns the bit length as the exponent)
+        digitCounts = numpy.frexp(digitValues)[1].astype(numpy.int64) - 1
+        outputCounts = 1 + digitCounts
+        outputStarts = numpy.cumsum(outputCounts) - outputCounts
+        outputSize = int(outputStarts[-1] + outputCounts[-1])
+
+        # Work out which run and which bit every digit comes from
+        digitRuns = numpy.repeat(numpy.arange(runStarts.size), digitCounts)
+        digitStarts = numpy.cumsum(digitCounts) - digitCounts
+        digitBits = numpy.arange(digitRuns.size) - numpy.repeat(digitStarts, digitCounts)
+
+        isDigit = numpy.ones(outputSize, dtype=bool)
+        isDigit[outputStarts] = False
+
+        output = numpy.empty(outputSize, dtype=numpy.intc)
+        output[outputStarts] = data[runStarts]
+        output[isDigit] = runSymbolA_ + ((digitValues[digitRuns] >> digitBits) & 0x01)
+
+        replacedData = array('i')
+        replacedData.frombytes(output.tobytes())
+        dataSection_[0:outputSize] = replacedData
+
+        return outputSize
+
+    def _performMTFTransform(self, dataSection_, dataSize_):
+        """
+        Replace every symbol with its rank in a table of all byte symbols ordered by how recently they were seen, then
+        move the symbol to the front of the table. The table is a 256 byte bytearray so that the search for a symbol and
+        the shift of the symbols in front of it are done in C. Symbols that are already at the front (the common case
+        after the BW transform) cost a single comparison. The data is transformed in place.
+
+        :param dataSection_: The data section on which we are working, all symbols must be between 0-255. This is an array
+        :param dataSize_: The size of the array
+        :return: None
+        """
+
+        symbolOrder = bytearray(range(0, 256))
+        ranks = bytearray(dataSize_)
+
+        for i, currentSymbol in enumerate(bytes(dataSection_[0:dataSize_].tolist())):
+            if(symbolOrder[0] != currentSymbol):
+                rank = symbolOrder.index(currentSymbol)
+                symbolOrder[1:rank + 1] = symbolOrder[0:rank]
+                symbolOrder[0] = currentSymbol
+                ranks[i] = rank
+
+        dataSection_[0:dataSize_] = array('i', array('B', ranks))
+
     def _bytearrayLessThan(self, originalData_, leftPermutationIndex_, rightPermutationIndex_, len_):
         """
         Determine which byte array is less based on data sorted in lexigraphical order. Use the permutation indeces and the original
@@ -199,39 +404,38 @@ class Kompressor:
         if(transformedDataMaxLen_ < (dataSize_ + self.mBWTransformStoreBytes)):
             raise Exception("Output data array to small")
 
-        #K = SortKey(dataSection_, dataSize_)
-        sortData = []
-        for i in range(0, dataSize_):
-            sortData.append([i, dataSection_, dataSize_])
+        if(dataSize_ < 1):
+            raise Exception("No data to transform")
 
-        indecesOfDataPermutations = sorted(sortData, key=SortKey)
+        # Sort the rotations of the data section using prefix doubling if NumPy is enabled, otherwise use the SA-IS suffix array
+        if(self.mUseNumpy):
+            indecesOfDataPermutations = SuffixArray.sortRotationsPrefixDoubling(dataSection_, dataSize_).tolist()
+        else:
+            indecesOfDataPermutations = SuffixArray.sortRotations(dataSection_, dataSize_, max(dataSection_[0:dataSize_]) + 1)
 
         #Find the original data sequence in the sorted indecesOfDataPermutations
-        originalSequenceIndex = indecesOfDataPermutations.index([0, dataSection_, dataSize_])
+        originalSequenceIndex = indecesOfDataPermutations.index(0)
 
         # Add the original sequence index at the front of the transform (split into bytes, little endian)
         for i in range(0, self.mBWTransformStoreBytes):
             transformedData_[i] = ((originalSequenceIndex >> (i*8)) & 0xFF)
 
         for i in range(self.mBWTransformStoreBytes, dataSize_ + self.mBWTransformStoreBytes):
-            transformedData_[i] = dataSection_[(dataSize_ - 1 + indecesOfDataPermutations[i-self.mBWTransformStoreBytes][0])%dataSize_]
+            transformedData_[i] = dataSection_[(dataSize_ - 1 + indecesOfDataPermutations[i-self.mBWTransformStoreBytes])%dataSize_]
 
         return (dataSize_ + self.mBWTransformStoreBytes)
 
-    def kompress(self, inputData_, inputDataLen_, outputData_, maxOutputLen_, lastDataBlock=True):
+    def transformSection(self, inputData_, inputDataLen_):
         """
-        Pass in integer array of data that needs to be compressed. The compressed data will
-        be stored in the outputData_ bytearray.
+        Run the transform stages on a section of data: the BW transform, the optional move-to-front stage and the run
+        replacement. The termination symbol is appended. The encoder is not used so sections can be transformed in any
+        order, even by a different Kompressor, and encoded later with encodeSection()
 
-        :param inputData_: bytearray that holds the data that needs to be compressed. Data will be modified during compression sequence
+        :param inputData_: The data that needs to be compressed. Either an integer array or any bytes-like object (bytes, bytearray, memoryview, mmap, NumPy uint8 array), which is read through a memoryview without per-byte conversion
         :param inputDataLen_: The data size must be less than or equal to self.mSectionSize
-        :param outputData_: Byte array that will hold the compressed binary data
-        :param maxOutputLen_: The maximum size of the outputData_ array. If this is not enough to store compressed data an exception will be thrown
-        :return: Return the size of the compressed data in outputData_
+        :return: The number of symbols stored in self.mSectionTransformData
         """
 
-        lengthAfterSymbol1Replacement = 0
-        lengthAfterSymbol2Replacement = 0
         lengthAfterBWTransform = 0
         lengthAfterGenericReplacement = 0
 
@@ -239,17 +443,55 @@ class Kompressor:
         if(inputDataLen_ > self.mSectionSize):
             raise Exception('Data length exceeds max section size')
 
+        inputSymbols = utils.getSymbolArray(inputData_, inputDataLen_)
+
         # Transform data using BW transform
-        lengthAfterBWTransform = self._performBWTransform(inputData_, inputDataLen_, self.mSectionTransformData, self.mSectionTransformDataMaxSize)
+        lengthAfterBWTransform = self._performBWTransform(inputSymbols, inputDataLen_, self.mSectionTransformData, self.mSectionTransformDataMaxSize)
 
-        # Perform generic symbol run replacement
-        lengthAfterGenericReplacement = self._replaceRunsGeneric(self.mGenericRunLengthStart, self.mGenericMaxRun, self.mSectionTransformData, lengthAfterBWTransform)
+        # Replace every symbol with its move-to-front rank
+        if(self.mMoveToFront):
+            self._performMTFTransform(self.mSectionTransformData, lengthAfterBWTransform)
+
+        # Perform symbol run replacement
+        if(self.mRunLengthMode == self.RUN_LENGTH_BIJECTIVE):
+            lengthAfterGenericReplacement = self._replaceRunsBijective(self.mRunSymbolA, self.mSectionTransformData, lengthAfterBWTransform)
+        else:
+            lengthAfterGenericReplacement = self._replaceRunsGeneric(self.mGenericRunLengthStart, self.mGenericMaxRun, self.mSectionTransformData, lengthAfterBWTransform)
 
-        # Encode the data
         self.mSectionTransformData[lengthAfterGenericReplacement] = self.TERMINATION_SYMBOL
-        lengthAfterGenericReplacement += 1
 
-        return self.mEncoder.encode(self.mSectionTransformData, lengthAfterGenericReplacement, outputData_, maxOutputLen_, lastDataBlock=lastDataBlock)
+        return (lengthAfterGenericReplacement + 1)
+
+    def encodeSection(self, transformedData_, transformedDataLen_, outputData_, maxOutputLen_, lastDataBlock=True):
+        """
+        Encode a section produced by transformSection(). The encoder statistics carry over from the previous section
+        unless reset() is called, so sections must be encoded in order
+
+        :param transformedData_: The transformed symbols, including the termination symbol (integer array)
+        :param transformedDataLen_: The number of transformed symbols
+        :param outputData_: Byte array that will hold the compressed binary data
+        :param maxOutputLen_: The maximum size of the outputData_ array. If this is not enough to store compressed data an exception will be thrown
+        :param lastDataBlock: Is this the last data block being encoded
+        :return: Return the size of the compressed data in outputData_
+        """
+
+        return self.mEncoder.encode(transformedData_, transformedDataLen_, outputData_, maxOutputLen_, lastDataBlock=lastDataBlock)
+
+    def kompress(self, inputData_, inputDataLen_, outputData_, maxOutputLen_, lastDataBlock=True):
+        """
+        Pass in the data that needs to be compressed. The compressed data will be stored in the outputData_ bytearray.
+
+        :param inputData_: The data that needs to be compressed. Either an integer array or any bytes-like object (bytes, bytearray, memoryview, mmap, NumPy uint8 array), which is read through a memoryview without per-byte conversion
+        :param inputDataLen_: The data size must be less than or equal to self.mSectionSize
+        :param outputData_: Byte array that will hold the compressed binary data
+        :param maxOutputLen_: The maximum size of the outputData_ array. If this is not enough to store compressed data an exception will be thrown
+        :return: Return the size of the compressed data in outputData_
+        """
+
+        transformedDataLen = self.transformSection(inputData_, inputDataLen_)
+
+        # Encode the data
+        return self.encodeSection(self.mSectionTransformData, transformedDataLen, outputData_, maxOutputLen_, lastDataBlock=lastDataBlock)
 
     def reset(self):
         """
@@ -0,0 +1,496 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This module implements a file object that transparently compresses data written to it and decompresses data read from
+it, in the same way as gzip.GzipFile and gzip.open. The file holds a KompressedArchive. Reads decompress one block at a
+time and seeks use the block index, so only the blocks that are actually read are decompressed. If the underlying file
+can not seek the blocks are streamed in order and only forward seeks are possible.
+
+Errors that are part of the file object protocol (closed file, unsupported operation, invalid mode) are reported with
+the exceptions the io module uses so KompressorFile can be used wherever a binary file is expected. For the same reason
+the arguments shared with io and gzip (filename, mode, fileobj, size, offset, whence, encoding, errors, newline) keep
+their standard names so they can be passed by keyword.
+"""
+
+import bisect
+import builtins
+import io
+import os
+from Kompressor import Kompressor
+import KompressedArchive
+from KompressedArchive import KompressedWriter, KompressedReader
+
+READ_MODES = ('r', 'rb')
+WRITE_MODES = ('w', 'wb', 'x', 'xb')
+
+class KompressorFile(io.BufferedIOBase):
+    def __init__(self, filename = None, mode = 'rb', fileobj = None, sectionSize_ = KompressedArchive.DEFAULT_SECTION_SIZE,
+                 genericMaxRun_ = KompressedArchive.DEFAULT_GENERIC_MAX_RUN, encoderWordSize_ = 16, useNumpy_ = None,
+                 coder_ = Kompressor.CODER_ARITHMETIC, runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC, moveToFront_ = False,
+                 blockCache_ = None):
+        """
+        Open a compressed file for reading or writing. The compression parameters are only used when writing, when
+        reading they are taken from the archive header
+
+        :param filename: Name of the file to open. Not used if fileobj is provided
+        :param mode: 'r' or 'rb' to read, 'w', 'wb', 'x' or 'xb' to write
+        :param fileobj: Binary file object holding the archive. It is not closed when the KompressorFile is closed
+        :param sectionSize_: Max size of a block
+        :param genericMaxRun_: The max run of generic symbols
+        :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Passed to Kompressor and Dekompressor. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+        :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+        :param moveToFront_: Perform the move-to-front stage
+        :param blockCache_: BlockCache used by the reader. If None only the current block is kept
+        :return:
+        """
+
+        super().__init__()
+
+        self.mReader = None
+        self.mWriter = None
+        self.mOwnsFile = False
+
+        if((mode not in READ_MODES) and (mode not in WRITE_MODES)):
+            raise ValueError('Invalid mode [' + str(mode) + ']')
+
+        if(fileobj is None):
+            if(filename is None):
+                raise ValueError('A file name or file object must be provided')
+
+            fileobj = builtins.open(filename, mode[0] + 'b')
+            self.mOwnsFile = True
+
+        self.mFile = fileobj
+        self.name = os.fspath(filename) if filename is not None else getattr(fileobj, 'name', '')
+        self.mode = mode[0] + 'b'
+
+        try:
+            if(mode in READ_MODES):
+                self.mReader = KompressedReader(fileobj, useNumpy_, blockCache_)
+                self.mStreaming = not fileobj.seekable()                          # Blocks are read in order without the block index
+                self.mStreamBuffer = bytearray(self.mReader.mSectionSize) if self.mStreaming else None
+                self.mStreamEnded = False                                          # The end frame has been read while streaming
+                self.mStreamOffset = 0                                             # Uncompressed offset of the next block streamed
+                self.mBlockView = memoryview(b'')                                  # The block holding the current position
+                self.mBlockData = self.mBlockView.obj                              # Object the block view starts at, used to search for newlines
+                self.mBlockStart = 0                                               # Uncompressed offset of the current block
+                self.mPosition = 0                                                 # Current position in the uncompressed data
+            else:
+                self.mWriter = KompressedWriter(fileobj, sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+        except:
+            if(self.mOwnsFile):
+                fileobj.close()
+
+            raise
+
+    def _checkOpen(self, reading_):
+        """
+        Ensure the file is open in the mode required for an operation
+
+        :param reading_: True if the operation reads, False if it writes
+        :return: None
+        """
+
+        if(self.closed):
+            raise ValueError('I/O operation on closed file')
+
+        if(reading_ and (self.mReader is None)):
+            raise io.UnsupportedOperation('File not open for reading')
+
+        if((not reading_) and (self.mWriter is None)):
+            raise io.UnsupportedOperation('File not open for writing')
+
+    def _loadBlock(self):
+        """
+        Make the block holding the current position the current block
+
+        :return: True if the current block holds the current position, False if the position is at or past the end of the data
+        """
+
+        blockOffset = self.mPosition - self.mBlockStart
+
+        if((blockOffset >= 0) and (blockOffset < len(self.mBlockView))):
+            return True
+
+        if(self.mStreaming):
+            # Blocks can only be streamed in order, skip over the ones before the position
+            while(self.mStreamOffset <= self.mPosition):
+                blockLen = self._readStreamBlock(self.mStreamBuffer)
+
+                if(blockLen == 0):
+                    return False
+
+                self._setBlock(memoryview(self.mStreamBuffer)[0:blockLen], self.mStreamOffset - blockLen)
+
+            return True
+
+        if(self.mPosition >= self.mReader.getUncompressedSize()):
+            return False
+
+        blockIndex = bisect.bisect_right(self.mReader.mBlockOffsets, self.mPosition) - 1
+
+        self._setBlock(self.mReader.readBlockView(blockIndex), self.mReader.mBlockOffsets[blockIndex])
+
+        return True
+
+    def _setBlock(self, blockView_, blockStart_):
+        """
+        Make a block the current block
+
+        :param blockView_: The data of the block (memoryview starting at the beginning of the object it refers to)
+        :param blockStart_: Uncompressed offset of the block
+        :return: None
+        """
+
+        self.mBlockView = blockView_
+        self.mBlockData = blockView_.obj
+        self.mBlockStart = blockStart_
+
+    def _readStreamBlock(self, buffer_):
+        """
+        Decompress the next streamed block into buffer_
+
+        :param buffer_: Writable bytes-like object that holds at least a full section
+        :return: The size of the block or 0 once the end of the archive is reached
+        """
+
+        if(self.mStreamEnded):
+            return 0
+
+        blockLen = self.mReader.readBlockInto(buffer_)
+
+        if(blockLen == 0):
+            self.mStreamEnded = True
+
+        self.mStreamOffset += blockLen
+
+        return blockLen
+
+    def _readBlockInto(self, bufferView_):
+        """
+        Decompress the block starting at the current position straight into the caller buffer, without going through the
+        current block. This is only done when the position is at the start of a block that is not loaded and the buffer
+        holds a full section
+
+        :param bufferView_: The rest of the caller buffer (writable memoryview of bytes)
+        :return: The size of the block, or 0 if the block has to be read through the current block
+        """
+
+        blockOffset = self.mPosition - self.mBlockStart
+
+        if((len(bufferView_) < self.mReader.mSectionSize) or ((blockOffset >= 0) and (blockOffset < len(self.mBlockView)))):
+            return 0
+
+        if(self.mStreaming):
+            if(self.mPosition != self.mStreamOffset):
+                return 0
+
+            blockLen = self._readStreamBlock(bufferView_)
+
+            # The current block is now behind the position and its data can not be read again
+            self._setBlock(memoryview(b''), self.mStreamOffset)
+
+            return blockLen
+
+        if(self.mPosition >= self.mReader.getUncompressedSize()):
+            return 0
+
+        blockIndex = bisect.bisect_right(self.mReader.mBlockOffsets, self.mPosition) - 1
+
+        if(self.mReader.mBlockOffsets[blockIndex] != self.mPosition):
+            return 0
+
+        return self.mReader.readBlockInto(bufferView_, blockIndex)
+
+    def readable(self):
+        return (self.mReader is not None)
+
+    def writable(self):
+        return (self.mWriter is not None)
+
+    def seekable(self):
+        return (self.mReader is not None) and (not self.mStreaming)
+
+    def readinto(self, buffer_):
+        """
+        Read data straight into buffer_, stopping at the end of the data. Blocks that start at the current position and
+        fit in the rest of buffer_ are decompressed into it without any copy
+
+        :param buffer_: Writable bytes-like object to fill
+        :return: The number of bytes stored in buffer_
+        """
+
+        self._checkOpen(True)
+
+        bufferView = memoryview(buffer_).cast('B')
+        count = 0
+
+        while(count < len(bufferView)):
+            blockLen = self._readBlockInto(bufferView[count:])
+
+            if(blockLen > 0):
+                count += blockLen
+                self.mPosition += blockLen
+                continue
+
+            if(not self._loadBlock()):
+                break
+
+            blockOffset = self.mPosition - self.mBlockStart
+            copyCount = min(len(bufferView) - count, len(self.mBlockView) - blockOffset)
+
+            bufferView[count:count + copyCount] = self.mBlockView[blockOffset:blockOffset + copyCount]
+            count += copyCount
+            self.mPosition += copyCount
+
+        return count
+
+    def readinto1(self, buffer_):
+        return self.readinto(buffer_)
+
+    def read(self, size = -1):
+        """
+        Read up to size bytes. If size is negative or None read until the end of the data
+
+        :param size: The max number of bytes to read
+        :return: The data read (bytes)
+        """
+
+        self._checkOpen(True)
+
+        if(size is None):
+            size = -1
+
+        parts = []
+
+        # The parts are copied since the buffer of the current block is reused by the next block
+        while((size != 0) and self._loadBlock()):
+            blockOffset = self.mPosition - self.mBlockStart
+            copyCount = len(self.mBlockView) - blockOffset
+
+            if(size > 0):
+                copyCount = min(copyCount, size)
+                size -= copyCount
+
+            parts.append(bytes(self.mBlockView[blockOffset:blockOffset + copyCount]))
+            self.mPosition += copyCount
+
+        return b''.join(parts)
+
+    def read1(self, size = -1):
+        """
+        Read up to size bytes from the current block only
+
+        :param size: The max number of bytes to read. If negative or None the rest of the current block is read
+        :return: The data read (bytes)
+        """
+
+        self._checkOpen(True)
+
+        if((size == 0) or (not self._loadBlock())):
+            return b''
+
+        blockOffset = self.mPosition - self.mBlockStart
+        copyCount = len(self.mBlockView) - blockOffset
+
+        if((size is not None) and (size > 0)):
+            copyCount = min(copyCount, size)
+
+        self.mPosition += copyCount
+
+        return bytes(self.mBlockView[blockOffset:blockOffset + copyCount])
+
+    def peek(self, size = 0):
+        """
+        Return the data from the current position to the end of the current block without moving the position
+
+        :param size: Unused, at least one byte is returned unless the end of the data was reached
+        :return: The data (bytes)
+        """
+
+        self._checkOpen(True)
+
+        if(not self._loadBlock()):
+            return b''
+
+        return bytes(self.mBlockView[self.mPosition - self.mBlockStart:])
+
+    def readline(self, size = -1):
+        """
+        Read up to and including the next newline
+
+        :param size: The max number of bytes to read. If negative or None there is no limit
+        :return: The line read (bytes)
+        """
+
+        self._checkOpen(True)
+
+        if(size is None):
+            size = -1
+
+        parts = []
+
+        while((size != 0) and self._loadBlock()):
+            blockOffset = self.mPosition - self.mBlockStart
+            blockEnd = len(self.mBlockView)
+
+            if(size > 0):
+                blockEnd = min(blockEnd, blockOffset + size)
+
+            lineEnd = self.mBlockData.find(b'\n', blockOffset, blockEnd)
+            copyCount = (blockEnd if (lineEnd < 0) else (lineEnd + 1)) - blockOffset
+
+            if(size > 0):
+                size -= copyCount
+
+            parts.append(bytes(self.mBlockView[blockOffset:blockOffset + copyCount]))
+            self.mPosition += copyCount
+
+            if(lineEnd >= 0):
+                break
+
+        return b''.join(parts)
+
+    def write(self, data_):
+        """
+        Compress data into the file. Data is written in blocks of one section
+
+        :param data_: The data to write (bytes-like)
+        :return: The number of bytes written
+        """
+
+        self._checkOpen(False)
+
+        return self.mWriter.write(data_)
+
+    def seek(self, offset, whence = io.SEEK_SET):
+        """
+        Move to a position in the uncompressed data. The block holding the new position is found through the block
+        index. If the file can not seek only forward moves are possible
+
+        :param offset: The offset relative to whence
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+        :return: The new position
+        """
+
+        self._checkOpen(True)
+
+        if(whence == io.SEEK_SET):
+            position = offset
+        elif(whence == io.SEEK_CUR):
+            position = self.mPosition + offset
+        elif(whence == io.SEEK_END):
+            if(self.mStreaming):
+                raise io.UnsupportedOperation('Can not seek from the end of a stream')
+
+            position = self.mReader.getUncompressedSize() + offset
+        else:
+            raise ValueError('Invalid whence [' + str(whence) + ']')
+
+        if(position < 0):
+            raise ValueError('Negative seek position [' + str(position) + ']')
+
+        if(self.mStreaming and (position < self.mBlockStart)):
+            raise io.UnsupportedOperation('Can not seek backwards in a stream')
+
+        self.mPosition = position
+
+        return self.mPosition
+
+    def tell(self):
+        """
+        Get the current position in the uncompressed data
+
+        :return: The position
+        """
+
+        if(self.closed):
+            raise ValueError('I/O operation on closed file')
+
+        if(self.mWriter is not None):
+            return self.mWriter.mUncompressedSize + len(self.mWriter.mPendingData)
+
+        return self.mPosition
+
+    def flush(self):
+        """
+        Flush the underlying file. Data waiting for a full section stays pending so blocks are not cut short
+
+        :return: None
+        """
+
+        if(self.closed):
+            raise ValueError('I/O operation on closed file')
+
+        if(self.mWriter is not None):
+            self.mFile.flush()
+
+    def close(self):
+        """
+        Finish the archive when writing and close the underlying file if it was opened by this object
+
+        :return: None
+        """
+
+        if(self.closed):
+            return
+
+        try:
+            if(self.mWriter is not None):
+                self.mWriter.close()
+        finally:
+            # IOBase.close flushes so the underlying file is closed last
+            try:
+                super().close()
+            finally:
+                if(self.mOwnsFile):
+                    self.mFile.close()
+
+def open(filename, mode = 'rb', sectionSize_ = KompressedArchive.DEFAULT_SECTION_SIZE, genericMaxRun_ = KompressedArchive.DEFAULT_GENERIC_MAX_RUN,
+         encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC, runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC,
+         moveToFront_ = False, blockCache_ = None, encoding = None, errors = None, newline = None):
+    """
+    Open a compressed file in binary or text mode, in the same way as gzip.open
+
+    :param filename: Name of the file or a binary file object
+    :param mode: 'r', 'rb', 'w', 'wb', 'x' or 'xb' for binary mode, 'rt', 'wt' or 'xt' for text mode
+    :param sectionSize_: Max size of a block
+    :param genericMaxRun_: The max run of generic symbols
+    :param encoderWordSize_: The size of words (in bits) to use for encoding data
+    :param useNumpy_: Passed to Kompressor and Dekompressor. If None NumPy will be used when it is available
+    :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+    :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+    :param moveToFront_: Perform the move-to-front stage
+    :param blockCache_: BlockCache used when reading. If None only the current block is kept
+    :param encoding: Text mode only, passed to io.TextIOWrapper
+    :param errors: Text mode only, passed to io.TextIOWrapper
+    :param newline: Text mode only, passed to io.TextIOWrapper
+    :return: KompressorFile in binary mode or io.TextIOWrapper in text mode
+    """
+
+    if('t' in mode):
+        if('b' in mode):
+            raise ValueError('Invalid mode [' + str(mode) + ']')
+
+        binaryMode = mode.replace('t', '')
+    else:
+        if((encoding is not None) or (errors is not None) or (newline is not None)):
+            raise ValueError('Encoding, errors and newline are only used in text mode')
+
+        binaryMode = mode
+
+    if(isinstance(filename, (str, bytes, os.PathLike))):
+        binaryFile = KompressorFile(filename, binaryMode, None, sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_,
+                                    blockCache_)
+    elif(hasattr(filename, 'read') or hasattr(filename, 'write')):
+        binaryFile = KompressorFile(None, binaryMode, filename, sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_,
+                                    blockCache_)
+    else:
+        raise TypeError('filename must be a str, bytes, os.PathLike or file object')
+
+    if('t' in mode):
+        return io.TextIOWrapper(binaryFile, encoding, errors, newline)
+
+    return binaryFile
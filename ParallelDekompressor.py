@@ -0,0 +1,254 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class reads the same archives as KompressedReader but decompresses the blocks in parallel. The frames are read in
+the main process, using the block index when the file can seek, and sent to a pool of worker processes. Each worker
+keeps one Dekompressor (and so one decoder) for its whole life and resets it for every block, the same way
+KompressedReader does.
+
+The decompressed blocks are returned in archive order. At most maxInFlight_ blocks are being decompressed or waiting to
+be returned at any time, blocks that complete early wait in this reorder window until the blocks before them are done.
+
+With TRANSPORT_SHARED_MEMORY every block in flight has a slot in a SharedMemoryRing. The compressed frame is read from
+the file straight into the slot, the worker decompresses it into the output region of the slot and only the slot number
+and lengths go through the pool queues.
+"""
+
+import collections
+import concurrent.futures
+import os
+from Dekompressor import Dekompressor
+import KompressedArchive
+from KompressedArchive import KompressedReader
+from SharedMemoryRing import SharedMemoryRing
+
+# Dekompressor, output buffer and shared memory ring of the current worker process, created by _initializeWorker
+_workerDekompressor = None
+_workerUncompressedData = None
+_workerRing = None
+
+def _initializeWorker(sectionSize_, genericMaxRun_, decoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_, ringParameters_ = None):
+    """
+    Create the Dekompressor used by the worker process for all the blocks it decompresses
+
+    :param ringParameters_: [name, slot count, input size, output size] of the SharedMemoryRing to attach to, None if blocks are pickled
+    :return: None
+    """
+
+    global _workerDekompressor
+    global _workerUncompressedData
+    global _workerRing
+
+    _workerDekompressor = Dekompressor(sectionSize_, genericMaxRun_, decoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+    _workerUncompressedData = bytearray(sectionSize_)
+
+    if(ringParameters_ is not None):
+        [ringName, slotCount, inputSize, outputSize] = ringParameters_
+        _workerRing = SharedMemoryRing(slotCount, inputSize, outputSize, ringName)
+
+def _dekompressBlock(compressedData_, uncompressedDataLen_, checksum_):
+    """
+    Decompress one block in a worker process and verify it against its frame header
+
+    :param compressedData_: The compressed data of the block (bytes)
+    :param uncompressedDataLen_: The uncompressed size stored in the frame header
+    :param checksum_: The CRC32 stored in the frame header
+    :return: The uncompressed data of the block (bytes)
+    """
+
+    uncompressedView = memoryview(_workerUncompressedData)
+    blockLen = KompressedArchive.dekompressBlock(_workerDekompressor, compressedData_, len(compressedData_), uncompressedView, uncompressedDataLen_, checksum_)
+
+    return bytes(uncompressedView[0:blockLen])
+
+def _dekompressSharedBlock(slot_, compressedDataLen_, uncompressedDataLen_, checksum_):
+    """
+    Decompress one block held in a slot of the shared memory ring into the output region of the same slot and verify
+    it against its frame header
+
+    :param slot_: The slot holding the compressed data
+    :param compressedDataLen_: The size of the compressed data
+    :param uncompressedDataLen_: The uncompressed size stored in the frame header
+    :param checksum_: The CRC32 stored in the frame header
+    :return: The size of the block
+    """
+
+    compressedView = _workerRing.getInputView(slot_)
+    outputView = _workerRing.getOutputView(slot_)
+
+    try:
+        return KompressedArchive.dekompressBlock(_workerDekompressor, compressedView, compressedDataLen_, outputView, uncompressedDataLen_, checksum_)
+    finally:
+        compressedView.release()
+        outputView.release()
+
+class ParallelDekompressor(KompressedReader):
+    TRANSPORT_PICKLE = 0
+    TRANSPORT_SHARED_MEMORY = 1
+
+    def __init__(self, file_, useNumpy_ = None, blockCache_ = None, archiveKey_ = None, maxWorkers_ = None, maxInFlight_ = None,
+                 transport_ = TRANSPORT_PICKLE):
+        """
+        Initialize the reader, read the archive header from file_ and start the worker processes. readBlock() and
+        read_at() decompress single blocks in the calling process as KompressedReader does
+
+        :param file_: Binary file object the archive is read from
+        :param useNumpy_: Passed to Dekompressor. If None NumPy will be used when it is available
+        :param blockCache_: BlockCache used by readBlock() and read_at(). If None blocks are not cached
+        :param archiveKey_: Identifies the archive in blockCache_. If None a unique key is used
+        :param maxWorkers_: The number of worker processes. If None the number of CPUs is used
+        :param maxInFlight_: The max number of blocks being decompressed or waiting to be returned. If None twice the number of workers
+        :param transport_: How blocks are sent to the workers, TRANSPORT_PICKLE or TRANSPORT_SHARED_MEMORY
+        :return:
+        """
+
+        if(maxWorkers_ is None):
+            maxWorkers_ = os.cpu_count() or 1
+
+        if(maxInFlight_ is None):
+            maxInFlight_ = 2*maxWorkers_
+
+        if(maxWorkers_ < 1):
+            raise Exception('At least one worker is required')
+
+        if(maxInFlight_ < 1):
+            raise Exception('At least one block must be allowed in flight')
+
+        if((transport_ != self.TRANSPORT_PICKLE) and (transport_ != self.TRANSPORT_SHARED_MEMORY)):
+            raise Exception('Invalid transport specified')
+
+        super().__init__(file_, useNumpy_, blockCache_, archiveKey_)
+
+        self.mMaxWorkers = maxWorkers_
+        self.mMaxInFlight = maxInFlight_
+        self.mTransport = transport_
+        self.mClosed = False
+        self.mRing = None
+        ringParameters = None
+
+        if(transport_ == self.TRANSPORT_SHARED_MEMORY):
+            self.mRing = SharedMemoryRing(maxInFlight_, self.mMaxCompressedDataLen, self.mSectionSize)
+            ringParameters = [self.mRing.getName(), maxInFlight_, self.mMaxCompressedDataLen, self.mSectionSize]
+
+        self.mExecutor = concurrent.futures.ProcessPoolExecutor(maxWorkers_, initializer=_initializeWorker,
+                                                                initargs=(self.mSectionSize, self.mGenericMaxRun, self.mWordSize, useNumpy_,
+                                                                          self.mCoder, self.mRunLengthMode, self.mMoveToFront, ringParameters))
+
+    def _readFrameHeaders(self):
+        """
+        Read the frame headers in order. If the file can seek every frame is located through the block index, otherwise
+        the frames are read one after the other until the end frame. The compressed data of a frame must be read before
+        the next header is requested
+
+        :return: Generator that yields [compressed length, uncompressed length, CRC32] for every block
+        """
+
+        if(self.mFile.seekable()):
+            self._readIndex()
+
+            for [frameOffset, uncompressedOffset] in self.mBlockIndex:
+                self.mFile.seek(self.mStartOffset + frameOffset)
+                frameHeader = self._readFrameHeader()
+
+                if(frameHeader[0] == 0):
+                    raise Exception('Invalid block index')
+
+                yield frameHeader
+
+            return
+
+        while(True):
+            frameHeader = self._readFrameHeader()
+
+            if(frameHeader[0] == 0):
+                return
+
+            yield frameHeader
+
+    def _collectBlock(self, inFlightBlock_):
+        """
+        Wait for a block to be decompressed and get its data
+
+        :param inFlightBlock_: [future, slot] of the block, slot is None if the block was pickled
+        :return: The uncompressed data of the block (bytes)
+        """
+
+        [future, slot] = inFlightBlock_
+
+        if(slot is None):
+            return future.result()
+
+        blockLen = future.result()
+
+        return bytes(self.mRing.getOutputView(slot)[0:blockLen])
+
+    def readBlocks(self):
+        """
+        Decompress the blocks in parallel and return them in order. When the window is full the oldest block is waited
+        for before the next frame is read
+
+        :return: Generator that yields the uncompressed data of every block (bytes)
+        """
+
+        inFlight = collections.deque()                                          # [future, slot] of the blocks in the window, oldest first
+        frameHeaders = self._readFrameHeaders()
+        nextSlot = 0
+
+        try:
+            while(True):
+                # Return the oldest block first, this frees its ring slot for the next frame
+                if(len(inFlight) >= self.mMaxInFlight):
+                    yield self._collectBlock(inFlight.popleft())
+
+                frameHeader = next(frameHeaders, None)
+
+                if(frameHeader is None):
+                    break
+
+                [compressedDataLen, uncompressedDataLen, checksum] = frameHeader
+
+                if(self.mRing is None):
+                    future = self.mExecutor.submit(_dekompressBlock, self._readBytes(compressedDataLen), uncompressedDataLen, checksum)
+                    inFlight.append([future, None])
+                    continue
+
+                self._readBytesInto(self.mRing.getInputView(nextSlot)[0:compressedDataLen])
+
+                future = self.mExecutor.submit(_dekompressSharedBlock, nextSlot, compressedDataLen, uncompressedDataLen, checksum)
+                inFlight.append([future, nextSlot])
+                nextSlot = (nextSlot + 1) % self.mMaxInFlight
+
+            while(len(inFlight) > 0):
+                yield self._collectBlock(inFlight.popleft())
+        finally:
+            # The caller stopped early or a block failed, drop the blocks that have not started
+            for [future, slot] in inFlight:
+                future.cancel()
+
+            # Blocks that are already running still use their ring slots
+            if(self.mRing is not None):
+                concurrent.futures.wait([future for [future, slot] in inFlight])
+
+    def close(self):
+        """
+        Stop the worker processes and remove the shared memory ring. The file itself is not closed
+
+        :return: None
+        """
+
+        if(self.mClosed):
+            return
+
+        self.mClosed = True
+        self.mExecutor.shutdown(wait=True, cancel_futures=True)
+
+        if(self.mRing is not None):
+            self.mRing.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType_, excValue_, traceback_):
+        self.close()
+
+        return False
@@ -0,0 +1,229 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class writes the same archive as KompressedWriter but compresses the blocks in parallel. Every block is compressed
+with reset coder statistics so the blocks are independent of each other. They are sent to a pool of worker processes,
+each worker keeps one Kompressor for its whole life. The compressed blocks are written in the order they were added
+so the archive is byte for byte identical to the one KompressedWriter produces.
+
+At most maxInFlight_ blocks are compressed at the same time. When the window is full the writer waits for the oldest
+block, which bounds the memory used by blocks waiting to be written.
+
+Blocks can be sent to the workers in two ways. With TRANSPORT_PICKLE the block data and the compressed result are
+pickled through the pool queues. With TRANSPORT_SHARED_MEMORY every block in flight has a slot in a SharedMemoryRing,
+the block is copied into the slot, the worker compresses it straight into the output region of the slot and only the
+slot number and lengths go through the queues.
+"""
+
+import collections
+import concurrent.futures
+import os
+from Kompressor import Kompressor
+import KompressedArchive
+from KompressedArchive import KompressedWriter
+from SharedMemoryRing import SharedMemoryRing
+
+# Kompressor, output buffer and shared memory ring of the current worker process, created by _initializeWorker
+_workerKompressor = None
+_workerCompressedData = None
+_workerRing = None
+
+def _initializeWorker(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_, ringParameters_ = None):
+    """
+    Create the Kompressor used by the worker process for all the blocks it compresses
+
+    :param ringParameters_: [name, slot count, input size, output size] of the SharedMemoryRing to attach to, None if blocks are pickled
+    :return: None
+    """
+
+    global _workerKompressor
+    global _workerCompressedData
+    global _workerRing
+
+    _workerKompressor = Kompressor(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+    _workerCompressedData = bytearray(KompressedArchive.calculateMaxCompressedBlockLen(sectionSize_, encoderWordSize_))
+
+    if(ringParameters_ is not None):
+        [ringName, slotCount, inputSize, outputSize] = ringParameters_
+        _workerRing = SharedMemoryRing(slotCount, inputSize, outputSize, ringName)
+
+def _kompressBlock(blockData_):
+    """
+    Compress one block in a worker process, as KompressedWriter does
+
+    :param blockData_: The data of the block (bytes)
+    :return: [uncompressed size, CRC32 of the uncompressed data, compressed data (bytes)]
+    """
+
+    [blockLen, blockCrc, compressedDataLen] = KompressedArchive.kompressBlock(_workerKompressor, blockData_, _workerCompressedData)
+
+    return [blockLen, blockCrc, bytes(_workerCompressedData[0:compressedDataLen])]
+
+def _kompressSharedBlock(slot_, blockLen_):
+    """
+    Compress one block held in a slot of the shared memory ring. The compressed data is written to the output region
+    of the same slot
+
+    :param slot_: The slot holding the block
+    :param blockLen_: The size of the block
+    :return: [uncompressed size, CRC32 of the uncompressed data, compressed size]
+    """
+
+    blockView = _workerRing.getInputView(slot_)[0:blockLen_]
+    outputView = _workerRing.getOutputView(slot_)
+
+    try:
+        return KompressedArchive.kompressBlock(_workerKompressor, blockView, outputView)
+    finally:
+        blockView.release()
+        outputView.release()
+
+class ParallelKompressor(KompressedWriter):
+    TRANSPORT_PICKLE = 0
+    TRANSPORT_SHARED_MEMORY = 1
+
+    def __init__(self, file_, sectionSize_, genericMaxRun_, encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC,
+                 runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC, moveToFront_ = False, maxWorkers_ = None, maxInFlight_ = None,
+                 transport_ = TRANSPORT_PICKLE):
+        """
+        Initialize the writer, start the worker processes and write the archive header to file_
+
+        :param file_: Binary file object the archive is written to
+        :param sectionSize_: Max size of a block. Data is compressed one block at a time
+        :param genericMaxRun_: The max run of generic symbols
+        :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+        :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+        :param moveToFront_: Perform the move-to-front stage
+        :param maxWorkers_: The number of worker processes. If None the number of CPUs is used
+        :param maxInFlight_: The max number of blocks being compressed at the same time. If None twice the number of workers
+        :param transport_: How blocks are sent to the workers, TRANSPORT_PICKLE or TRANSPORT_SHARED_MEMORY
+        :return:
+        """
+
+        if(maxWorkers_ is None):
+            maxWorkers_ = os.cpu_count() or 1
+
+        if(maxInFlight_ is None):
+            maxInFlight_ = 2*maxWorkers_
+
+        if(maxWorkers_ < 1):
+            raise Exception('At least one worker is required')
+
+        if(maxInFlight_ < 1):
+            raise Exception('At least one block must be allowed in flight')
+
+        if((transport_ != self.TRANSPORT_PICKLE) and (transport_ != self.TRANSPORT_SHARED_MEMORY)):
+            raise Exception('Invalid transport specified')
+
+        super().__init__(file_, sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+
+        self.mMaxWorkers = maxWorkers_
+        self.mMaxInFlight = maxInFlight_
+        self.mTransport = transport_
+        self.mInFlight = collections.deque()                                    # [future, slot] of the blocks being compressed, oldest first
+        self.mNextSlot = 0                                                      # Ring slot used by the next block
+        self.mShutDown = False                                                  # The worker processes have been stopped
+        self.mRing = None
+        ringParameters = None
+
+        if(transport_ == self.TRANSPORT_SHARED_MEMORY):
+            self.mRing = SharedMemoryRing(maxInFlight_, sectionSize_, self.mMaxCompressedDataLen)
+            ringParameters = [self.mRing.getName(), maxInFlight_, sectionSize_, self.mMaxCompressedDataLen]
+
+        self.mExecutor = concurrent.futures.ProcessPoolExecutor(maxWorkers_, initializer=_initializeWorker,
+                                                                initargs=(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_,
+                                                                          ringParameters))
+
+    def _writeBlock(self, blockData_):
+        """
+        Send a block to the workers. If the window is full the oldest block is written first
+
+        :param blockData_: The data of the block, up to one section in size (bytes-like)
+        :return: None
+        """
+
+        if(len(self.mInFlight) >= self.mMaxInFlight):
+            self._writeOldestBlock()
+
+        if(self.mRing is None):
+            self.mInFlight.append([self.mExecutor.submit(_kompressBlock, bytes(blockData_)), None])
+            return
+
+        # The oldest block has been written so the slot coming around is free
+        slot = self.mNextSlot
+        self.mNextSlot = (self.mNextSlot + 1) % self.mMaxInFlight
+        self.mRing.getInputView(slot)[0:len(blockData_)] = blockData_
+
+        self.mInFlight.append([self.mExecutor.submit(_kompressSharedBlock, slot, len(blockData_)), slot])
+
+    def _writeOldestBlock(self):
+        """
+        Wait for the oldest block in flight and write it as a frame
+
+        :return: None
+        """
+
+        [future, slot] = self.mInFlight.popleft()
+
+        if(slot is None):
+            [blockLen, blockCrc, compressedData] = future.result()
+            self._writeFrame(blockLen, blockCrc, compressedData)
+            return
+
+        [blockLen, blockCrc, compressedDataLen] = future.result()
+        self._writeFrame(blockLen, blockCrc, self.mRing.getOutputView(slot)[0:compressedDataLen])
+
+    def _shutdown(self):
+        """
+        Stop the worker processes, blocks that have not started compressing are cancelled. The shared memory ring is
+        removed once the workers are gone. No more blocks can be written after that, so the archive is closed as well
+
+        :return: None
+        """
+
+        if(self.mShutDown):
+            return
+
+        self.mShutDown = True
+        self.mClosed = True
+        self.mInFlight.clear()
+        self.mExecutor.shutdown(wait=True, cancel_futures=True)
+
+        if(self.mRing is not None):
+            self.mRing.close()
+
+    def flush(self):
+        """
+        Compress any data waiting for a full section as a shorter block and write all the blocks in flight
+
+        :return: None
+        """
+
+        super().flush()
+
+        while(len(self.mInFlight) > 0):
+            self._writeOldestBlock()
+
+    def close(self):
+        """
+        Write all outstanding blocks and complete the archive, then stop the worker processes. The file itself is not
+        closed
+
+        :return: None
+        """
+
+        if(self.mClosed):
+            return
+
+        try:
+            super().close()
+        finally:
+            self._shutdown()
+
+    def __exit__(self, excType_, excValue_, traceback_):
+        try:
+            return super().__exit__(excType_, excValue_, traceback_)
+        finally:
+            self._shutdown()
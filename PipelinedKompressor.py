@@ -0,0 +1,162 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class compresses a sequence of sections with continuous encoder statistics, the same way as calling
+Kompressor.kompress() for every section without resetting in between, but overlaps the stages. The transform stages
+(BW transform, move-to-front and run replacement) do not depend on the encoder so they run in a pool of worker
+processes, one Kompressor per worker. The encoder stage runs in the calling process with a single Kompressor and
+encodes the transformed sections strictly in order, so its adaptive statistics carry over exactly as in the serial
+path and the output is byte for byte identical.
+
+At most maxInFlight_ sections are transformed or waiting to be encoded at any time. When the window is full the
+encoder waits for the oldest section before the next one is sent to the workers.
+"""
+
+import collections
+import concurrent.futures
+import os
+from array import array
+from Kompressor import Kompressor
+import utils
+
+# Kompressor of the current worker process, only its transform stages are used. Created by _initializeWorker
+_workerKompressor = None
+
+def _initializeWorker(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_):
+    """
+    Create the Kompressor used by the worker process to transform all the sections it receives
+
+    :return: None
+    """
+
+    global _workerKompressor
+
+    _workerKompressor = Kompressor(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+
+def _transformSection(sectionData_):
+    """
+    Run the transform stages on one section in a worker process
+
+    :param sectionData_: The data of the section (bytes or integer array)
+    :return: The transformed symbols, including the termination symbol (integer array)
+    """
+
+    transformedDataLen = _workerKompressor.transformSection(sectionData_, len(sectionData_))
+
+    return _workerKompressor.mSectionTransformData[0:transformedDataLen]
+
+class PipelinedKompressor:
+    def __init__(self, sectionSize_, genericMaxRun_, encoderWordSize_ = 16, useNumpy_ = None, coder_ = Kompressor.CODER_ARITHMETIC,
+                 runLengthMode_ = Kompressor.RUN_LENGTH_GENERIC, moveToFront_ = False, maxWorkers_ = None, maxInFlight_ = None):
+        """
+        Initialize the encoder stage and start the worker processes for the transform stages. The parameters must match
+        the Dekompressor used to decompress the data
+
+        :param sectionSize_: Max size of a section
+        :param genericMaxRun_: The max run of generic symbols
+        :param encoderWordSize_: The size of words (in bits) to use for encoding data
+        :param useNumpy_: Passed to Kompressor. If None NumPy will be used when it is available
+        :param coder_: The entropy coder to use, Kompressor.CODER_ARITHMETIC or Kompressor.CODER_RANGE
+        :param runLengthMode_: How runs are replaced, Kompressor.RUN_LENGTH_GENERIC or Kompressor.RUN_LENGTH_BIJECTIVE
+        :param moveToFront_: Perform the move-to-front stage
+        :param maxWorkers_: The number of worker processes. If None the number of CPUs is used
+        :param maxInFlight_: The max number of sections being transformed or waiting to be encoded. If None twice the number of workers
+        :return:
+        """
+
+        if(maxWorkers_ is None):
+            maxWorkers_ = os.cpu_count() or 1
+
+        if(maxInFlight_ is None):
+            maxInFlight_ = 2*maxWorkers_
+
+        if(maxWorkers_ < 1):
+            raise Exception('At least one worker is required')
+
+        if(maxInFlight_ < 1):
+            raise Exception('At least one section must be allowed in flight')
+
+        # The encoder of this Kompressor keeps its statistics from one section to the next
+        self.mKompressor = Kompressor(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_)
+
+        self.mSectionSize = sectionSize_
+        self.mMaxWorkers = maxWorkers_
+        self.mMaxInFlight = maxInFlight_
+        self.mMaxCompressedDataLen = utils.calculateMaxCompressedBytes(self.mKompressor.mSectionTransformDataMaxSize + 1, encoderWordSize_)
+        self.mCompressedData = bytearray(self.mMaxCompressedDataLen)
+        self.mExecutor = concurrent.futures.ProcessPoolExecutor(maxWorkers_, initializer=_initializeWorker,
+                                                                initargs=(sectionSize_, genericMaxRun_, encoderWordSize_, useNumpy_, coder_, runLengthMode_, moveToFront_))
+
+    def _encodeSection(self, future_, lastDataBlock_):
+        """
+        Wait for a section to be transformed and encode it
+
+        :param future_: The future of the transformed section
+        :param lastDataBlock_: Is this the last data block being encoded
+        :return: The compressed data of the section (bytes)
+        """
+
+        transformedData = future_.result()
+        compressedDataLen = self.mKompressor.encodeSection(transformedData, len(transformedData), self.mCompressedData, self.mMaxCompressedDataLen,
+                                                           lastDataBlock=lastDataBlock_)
+
+        return bytes(self.mCompressedData[0:compressedDataLen])
+
+    def kompressSections(self, sections_, lastDataBlock=True):
+        """
+        Compress a sequence of sections. Every section is compressed as Kompressor.kompress() would compress it after
+        the sections before it, with lastDataBlock set to False for all but the final section
+
+        :param sections_: Iterable of sections, each one either an integer array or a bytes-like object of up to sectionSize_ bytes
+        :param lastDataBlock: Passed to the encoder for the final section
+        :return: Generator that yields the compressed data of every section in order (bytes)
+        """
+
+        inFlight = collections.deque()                                          # Futures of the sections in the window, oldest first
+
+        try:
+            for sectionData in sections_:
+                if(not isinstance(sectionData, (array, bytes))):
+                    sectionData = bytes(sectionData)
+
+                if(len(sectionData) > self.mSectionSize):
+                    raise Exception('Data length exceeds max section size')
+
+                # A newer section exists so the oldest one is not the last data block
+                if(len(inFlight) >= self.mMaxInFlight):
+                    yield self._encodeSection(inFlight.popleft(), False)
+
+                inFlight.append(self.mExecutor.submit(_transformSection, sectionData))
+
+            while(len(inFlight) > 0):
+                future = inFlight.popleft()
+                yield self._encodeSection(future, lastDataBlock and (len(inFlight) == 0))
+        finally:
+            for future in inFlight:
+                future.cancel()
+
+    def reset(self):
+        """
+        Reset the encoder statistics. Dekompressor must be reset as well otherwise we will not be able to decompress data
+
+        :return: None
+        """
+
+        self.mKompressor.reset()
+
+    def close(self):
+        """
+        Stop the worker processes
+
+        :return: None
+        """
+
+        self.mExecutor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType_, excValue_, traceback_):
+        self.close()
+
+        return False
@@ -0,0 +1,178 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a byte oriented range coder decoder. It is meant to be matched with RangeEncoder and exposes
+the same interface as ARDecoder.
+"""
+
+from FrequencyModel import FrequencyModel
+
+class RangeDecoder:
+    TOP_VALUE = (1 << 24)                       # Once the top byte of low and low + range match it is shifted out
+    BOTTOM_VALUE = (1 << 16)                    # Min range allowed, also the max total symbol count
+    MASK_VALUE = 0xFFFFFFFF                     # Mask for the 32-bit low, range and code
+    FLUSH_BYTES = 4                             # Number of bytes that are loaded into the code when decoding starts
+
+    def __init__(self, vocabularySize_, terminationSymbol_):
+        """
+        Initialize the object
+
+        :param vocabularySize_: The size of the vocabulary. Symbols run from 0 to (vocabularySize_ - 1)
+        :param terminationSymbol_: Symbol which indicates the end of encoded data where decoding should stop
+        :return: None
+        """
+
+        if((vocabularySize_ < 1) or (vocabularySize_ >= self.BOTTOM_VALUE)):
+            raise Exception("Invalid vocabulary size specified")
+
+        self.mVocabularySize = vocabularySize_
+        self.mTerminationSymbol = terminationSymbol_
+        self.mMaxDecodingBytes = self.BOTTOM_VALUE                             # The max total symbol count before the statistics need to be re-normalized
+
+        self.mFrequencyModel = FrequencyModel(self.mVocabularySize)
+        self.mSymbolCount = self.mFrequencyModel.mSymbolCount
+
+        # Reset member variables that are not constant
+        self.reset()
+
+    def reset(self):
+        """ Reset all the member variables that are not constant for the duration of the object life
+
+        :return: None
+        """
+
+        self.mEncodedData = None                                                # Holds the encoded data that we are un-compressing. Bytearray
+        self.mEncodedDataCount = 0                                              # Number of encoded bytes that we are un-compressing
+        self.mDecodedDataLen = 0                                                # The number of symbols that have been decoded
+        self.mTotalSymbolCount = self.mVocabularySize                           # The total number of symbols encountered
+
+        # We are initializing with an assumption of a value of 1 for the count of each symbol
+        self.mFrequencyModel.reset()
+
+    def _normalize_stats(self):
+        """
+        Divide the total count for each symbol by 2 but ensure each symbol count is at least 1.
+
+        :return: None
+        """
+
+        self.mTotalSymbolCount = self.mFrequencyModel.normalize()
+
+    def decode(self, encodedData_, encodedDataLen_, decodedData_, maxDecodedDataLen_):
+        """
+        Decompress the data passed in. It is the responsibility of the caller to reset the decoder if required before
+        calling this function
+
+        :param encodedData_: The data that needs to be decoded (bytearray)
+        :param encodedDataLen_: The length of data that needs to be decoded
+        :param decodedData_: The decoded data (integer array)
+        :param maxDecodedDataLen_ : The max number of symbols that can be stored in decodedData_ array
+        :return: Returns the number of symbols stored in decodedData_
+        """
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(encodedData_) < encodedDataLen_):
+            raise Exception("Data passed in smaller than expected")
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(decodedData_) < maxDecodedDataLen_):
+            raise Exception("Decompressed data byte array passed in smaller than expected")
+
+        if(encodedDataLen_ < self.FLUSH_BYTES):
+            raise Exception("Exceeded encoded data buffer")
+
+        self.mEncodedData = encodedData_
+        self.mEncodedDataCount = encodedDataLen_
+
+        topValue = self.TOP_VALUE
+        bottomValue = self.BOTTOM_VALUE
+        maskValue = self.MASK_VALUE
+        maxTotalSymbolCount = self.mMaxDecodingBytes
+        terminationSymbol = self.mTerminationSymbol
+        vocabularySize = self.mVocabularySize
+        symbolCount = self.mSymbolCount
+        tree = self.mFrequencyModel.mTree
+        searchMask = self.mFrequencyModel.mSearchMask
+
+        totalSymbolCount = self.mTotalSymbolCount
+        low = 0
+        rangeValue = maskValue
+        code = 0
+        decodedDataLen = 0
+
+        # Load the first bytes into the code
+        for i in range(0, self.FLUSH_BYTES):
+            code = (code << 8) | encodedData_[i]
+
+        encodedDataIndex = self.FLUSH_BYTES
+
+        # Until we have reached the end keep decompressing
+        while(True):
+            rangeValue //= totalSymbolCount
+            currentCumulativeCount = ((code - low) & maskValue) // rangeValue
+
+            if(currentCumulativeCount >= totalSymbolCount):
+                raise Exception("Symbol count of out range")
+
+            # Search the frequency model tree for the symbol whose cumulative count range holds the current
+            # cumulative count (inlined for speed)
+            currentSymbol = 0
+            remainingCount = currentCumulativeCount
+            mask = searchMask
+
+            while(mask > 0):
+                index = currentSymbol + mask
+
+                if((index <= vocabularySize) and (tree[index] <= remainingCount)):
+                    currentSymbol = index
+                    remainingCount -= tree[index]
+
+                mask >>= 1
+
+            # The remaining count is the offset into the symbol's range, the rest is the cumulative count of the symbols before it
+            low += rangeValue*(currentCumulativeCount - remainingCount)
+            rangeValue *= symbolCount[currentSymbol]
+
+            # Shift out the same bytes the encoder output and shift in the next bytes of encoded data
+            while(True):
+                if((low ^ (low + rangeValue)) >= topValue):
+                    if(rangeValue >= bottomValue):
+                        break
+
+                    rangeValue = (-low) & (bottomValue - 1)
+
+                if(encodedDataIndex >= encodedDataLen_):
+                    raise Exception("Exceeded encoded data buffer")
+
+                code = ((code << 8) | encodedData_[encodedDataIndex]) & maskValue
+                encodedDataIndex += 1
+                low = (low << 8) & maskValue
+                rangeValue = (rangeValue << 8) & maskValue
+
+            # Update the statistics
+            symbolCount[currentSymbol] += 1
+            index = currentSymbol + 1
+
+            while(index <= vocabularySize):
+                tree[index] += 1
+                index += index & (-index)
+
+            totalSymbolCount += 1
+
+            if(totalSymbolCount >= maxTotalSymbolCount):
+                totalSymbolCount = self.mFrequencyModel.normalize()
+
+            # If we have reached the termination symbol then decoding is finished, otherwise store the decompressed symbol
+            if(currentSymbol == terminationSymbol):
+                break
+
+            if(decodedDataLen >= maxDecodedDataLen_):
+                raise Exception('Not enough space to store decoded data')
+
+            decodedData_[decodedDataLen] = currentSymbol
+            decodedDataLen += 1
+
+        self.mTotalSymbolCount = totalSymbolCount
+        self.mDecodedDataLen = decodedDataLen
+
+        return decodedDataLen
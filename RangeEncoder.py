@@ -0,0 +1,161 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class will implement a byte oriented range coder encoder. It is a carryless range coder (Subbotin) that keeps a
+32-bit low and range and outputs a whole byte whenever the top byte of the interval is settled, so no per bit work is
+required. It exposes the same interface as AREncoder and uses the same adaptive frequency model.
+"""
+
+from FrequencyModel import FrequencyModel
+
+class RangeEncoder:
+    TOP_VALUE = (1 << 24)                       # Once the top byte of low and low + range match it can be output
+    BOTTOM_VALUE = (1 << 16)                    # Min range allowed, also the max total symbol count
+    MASK_VALUE = 0xFFFFFFFF                     # Mask for the 32-bit low and range
+    FLUSH_BYTES = 4                             # Number of bytes of low that are output to terminate a block
+
+    def __init__(self, vocabularySize_):
+        """
+        Initialize the object
+
+        :param vocabularySize_: The size of the vocabulary. Symbols run from 0 to (vocabularySize_ - 1)
+        :return:
+        """
+
+        # The total count must stay at or below the min range so that every symbol keeps a non empty interval
+        if((vocabularySize_ < 1) or (vocabularySize_ >= self.BOTTOM_VALUE)):
+            raise Exception("Invalid vocabulary size specified")
+
+        self.mVocabularySize = vocabularySize_
+        self.mMaxEncodeBytes = self.BOTTOM_VALUE                                   # The max total symbol count before the statistics need to be re-normalized
+
+        self.mFrequencyModel = FrequencyModel(self.mVocabularySize)
+        self.mSymbolCount = self.mFrequencyModel.mSymbolCount
+
+        # Reset all the member variables on which encoding is based on
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all member variables that are not constant for the duration of the object life
+
+        :return: None
+        """
+
+        self.mEncodedData = None
+        self.mMaxEncodedDataLen = 0                                                # The max number of bytes that can be stored in mEncodedData
+        self.mEncodedDataCount = 0                                                 # The number of bytes compressed data is taking up
+        self.mTotalSymbolCount = self.mVocabularySize                              # The total number of symbols encountered
+
+        # We are initializing with an assumption of a value of 1 for the count of each symbol
+        self.mFrequencyModel.reset()
+
+    def _normalize_stats(self):
+        """
+        Divide the total count for each symbol by 2 but ensure each symbol count is at least 1.
+
+        :return: None
+        """
+
+        self.mTotalSymbolCount = self.mFrequencyModel.normalize()
+
+    def encode(self, dataToEncode_, dataLen_, encodedData_, maxEncodedDataLen_, lastDataBlock=True):
+        """
+        Encode the data passed in. The encoded data will be stored in encodedData_ and if there is not enough room an
+        exception will be thrown. Encoding statistics will not be reset when this function is called. It is up-to the caller
+        to ensure that statistics are initialized properly if required.
+
+        Every call is terminated by flushing low, so the next block always starts from a fresh interval and
+        lastDataBlock does not require any special handling. It is accepted so that the interface matches AREncoder.
+
+        :param dataToEncode_: The data that needs to be compressed (integer array)
+        :param dataLen_: The length of data that needs to be compressed
+        :param encodedData_: The compressed data should be stored in this byte array
+        :param maxEncodedDataLen_ : The max length of compressed data that can be stored in encodedData_
+        :param lastDataBlock: Unused
+        :return: The number of bytes stored in encodedData_
+        """
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(dataToEncode_) < dataLen_):
+            raise Exception("Data byte array passed in smaller than expected")
+
+        # If the byte array is smaller than data length pass in throw exception
+        if(len(encodedData_) < maxEncodedDataLen_):
+            raise Exception("Encoded data byte array passed in smaller than expected")
+
+        self.mEncodedData = encodedData_
+        self.mMaxEncodedDataLen = maxEncodedDataLen_
+
+        topValue = self.TOP_VALUE
+        bottomValue = self.BOTTOM_VALUE
+        maskValue = self.MASK_VALUE
+        maxTotalSymbolCount = self.mMaxEncodeBytes
+        vocabularySize = self.mVocabularySize
+        symbolCount = self.mSymbolCount
+        tree = self.mFrequencyModel.mTree
+
+        totalSymbolCount = self.mTotalSymbolCount
+        low = 0
+        rangeValue = maskValue
+        encodedDataCount = 0
+
+        for i in range(0, dataLen_):
+            symbol = dataToEncode_[i]
+
+            # Sum the counts of all symbols before the current symbol from the frequency model tree (inlined for speed)
+            cumulativeCountPrevSymbol = 0
+            index = symbol
+
+            while(index > 0):
+                cumulativeCountPrevSymbol += tree[index]
+                index &= index - 1
+
+            # Narrow the interval to the symbol's share of the range
+            rangeValue //= totalSymbolCount
+            low += rangeValue*cumulativeCountPrevSymbol
+            rangeValue *= symbolCount[symbol]
+
+            # Output bytes while the top byte is settled. If the range gets too small without the top byte settling
+            # shrink the range so that it stops at the next top byte boundary (carryless)
+            while(True):
+                if((low ^ (low + rangeValue)) >= topValue):
+                    if(rangeValue >= bottomValue):
+                        break
+
+                    rangeValue = (-low) & (bottomValue - 1)
+
+                if(encodedDataCount >= maxEncodedDataLen_):
+                    raise Exception('Out of space')
+
+                encodedData_[encodedDataCount] = (low >> 24) & 0xFF
+                encodedDataCount += 1
+                low = (low << 8) & maskValue
+                rangeValue = (rangeValue << 8) & maskValue
+
+            # Update the statistics
+            symbolCount[symbol] += 1
+            index = symbol + 1
+
+            while(index <= vocabularySize):
+                tree[index] += 1
+                index += index & (-index)
+
+            totalSymbolCount += 1
+
+            if(totalSymbolCount >= maxTotalSymbolCount):
+                totalSymbolCount = self.mFrequencyModel.normalize()
+
+        # Flush low to terminate the block
+        for i in range(0, self.FLUSH_BYTES):
+            if(encodedDataCount >= maxEncodedDataLen_):
+                raise Exception('Out of space')
+
+            encodedData_[encodedDataCount] = (low >> 24) & 0xFF
+            encodedDataCount += 1
+            low = (low << 8) & maskValue
+
+        self.mTotalSymbolCount = totalSymbolCount
+        self.mEncodedDataCount = encodedDataCount
+
+        return encodedDataCount
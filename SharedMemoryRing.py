@@ -0,0 +1,88 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This class implements a ring of fixed size slots in a multiprocessing.shared_memory segment. Every slot has an input
+region and an output region. The parallel compressor and decompressor write the data of a block into the input region
+of a slot, the worker process reads it from there and writes its result into the output region, so only the slot
+number and lengths have to be sent between the processes.
+
+Slots are used in order and there is one slot per block in flight. Because blocks are collected oldest first, a slot is
+always free again by the time it comes around.
+
+Views returned by getInputView() and getOutputView() must not outlive the ring. Workers release them after every block
+so objects holding on to them (the coders keep their last buffer) do not stop the segment from closing.
+"""
+
+from multiprocessing import shared_memory
+
+class SharedMemoryRing:
+    def __init__(self, slotCount_, inputSize_, outputSize_, name_ = None):
+        """
+        Create a new shared memory segment or attach to an existing one
+
+        :param slotCount_: The number of slots in the ring
+        :param inputSize_: The size of the input region of every slot
+        :param outputSize_: The size of the output region of every slot
+        :param name_: Name of an existing segment to attach to. If None a new segment is created and owned by this object
+        :return:
+        """
+
+        if(slotCount_ < 1):
+            raise Exception('At least one slot is required')
+
+        self.mSlotCount = slotCount_
+        self.mInputSize = inputSize_
+        self.mOutputSize = outputSize_
+        self.mSlotSize = inputSize_ + outputSize_
+        self.mOwner = (name_ is None)                                          # Only the owner removes the segment
+
+        if(self.mOwner):
+            self.mSharedMemory = shared_memory.SharedMemory(create=True, size=max(1, slotCount_*self.mSlotSize))
+        else:
+            self.mSharedMemory = shared_memory.SharedMemory(name=name_)
+
+    def getName(self):
+        """
+        Get the name other processes use to attach to the segment
+
+        :return: The segment name
+        """
+
+        return self.mSharedMemory.name
+
+    def getInputView(self, slot_):
+        """
+        Get the input region of a slot
+
+        :param slot_: The slot number, wraps around the ring
+        :return: Writable memoryview of the input region
+        """
+
+        slotStart = (slot_ % self.mSlotCount)*self.mSlotSize
+
+        return self.mSharedMemory.buf[slotStart:slotStart + self.mInputSize]
+
+    def getOutputView(self, slot_):
+        """
+        Get the output region of a slot
+
+        :param slot_: The slot number, wraps around the ring
+        :return: Writable memoryview of the output region
+        """
+
+        slotStart = (slot_ % self.mSlotCount)*self.mSlotSize + self.mInputSize
+
+        return self.mSharedMemory.buf[slotStart:slotStart + self.mOutputSize]
+
+    def close(self):
+        """
+        Detach from the segment. The owner also removes the segment
+
+        :return: None
+        """
+
+        self.mSharedMemory.close()
+
+        if(self.mOwner):
+            self.mSharedMemory.unlink()
+            self.mOwner = False
@@ -0,0 +1,295 @@
+__author__ = 'Marko Milutinovic'
+
+"""
+This module implements suffix array construction using the SA-IS (induced sorting) algorithm along with helpers that
+use the suffix array to sort the cyclic rotations of a data section for the BW transform.
+
+The rotations are sorted by building the suffix array of the data section concatenated with itself. For a data section
+that is not periodic every rotation is unique and the order of the suffixes starting in the first half matches the order
+of the rotations. Periodic data sections are reduced to their primitive period first so that identical rotations keep
+the same relative (ascending index) order that a stable comparison sort would produce.
+
+If NumPy is available the rotations can also be sorted by prefix doubling, which ranks the rotations using vectorized
+sorts instead of per symbol Python operations.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def buildSuffixArray(data_, alphabetSize_):
+    """
+    Build the suffix array of data_ using the SA-IS algorithm. The end of the data acts as an implicit sentinel that is
+    smaller than any symbol, so a suffix that is a prefix of another suffix is sorted first.
+
+    :param data_: Sequence of integer symbols. Every symbol must be in the range 0 to alphabetSize_ - 1
+    :param alphabetSize_: The number of distinct symbol values that can appear in data_
+    :return: List of suffix start indexes in lexicographical order
+    """
+
+    dataSize = len(data_)
+
+    if(dataSize == 0):
+        return []
+
+    if(dataSize == 1):
+        return [0]
+
+    if(dataSize == 2):
+        if(data_[0] < data_[1]):
+            return [0, 1]
+        return [1, 0]
+
+    suffixArray = [0]*dataSize
+
+    # Classify each suffix as S-type (True) or L-type (False)
+    isSType = [False]*dataSize
+
+    for i in range(dataSize - 2, -1, -1):
+        if(data_[i] == data_[i + 1]):
+            isSType[i] = isSType[i + 1]
+        else:
+            isSType[i] = (data_[i] < data_[i + 1])
+
+    # Generate the bucket boundaries. sumL holds the start of the L-type section of each bucket and sumS holds the
+    # start of the S-type section of each bucket
+    sumL = [0]*(alphabetSize_ + 1)
+    sumS = [0]*(alphabetSize_ + 1)
+
+    for i in range(0, dataSize):
+        if(not isSType[i]):
+            sumS[data_[i]] += 1
+        else:
+            sumL[data_[i] + 1] += 1
+
+    for i in range(0, alphabetSize_ + 1):
+        sumS[i] += sumL[i]
+
+        if(i < alphabetSize_):
+            sumL[i + 1] += sumS[i]
+
+    def induceSort(lmsIndexes_):
+        """
+        Place the LMS suffixes into their buckets and induce the order of the L-type and S-type suffixes from them
+
+        :param lmsIndexes_: The LMS suffix indexes in the order they should be placed into their buckets
+        :return: None
+        """
+
+        for i in range(0, dataSize):
+            suffixArray[i] = -1
+
+        bucket = sumS[:]
+
+        for index in lmsIndexes_:
+            if(index == dataSize):
+                continue
+
+            suffixArray[bucket[data_[index]]] = index
+            bucket[data_[index]] += 1
+
+        bucket = sumL[:]
+        suffixArray[bucket[data_[dataSize - 1]]] = dataSize - 1
+        bucket[data_[dataSize - 1]] += 1
+
+        for i in range(0, dataSize):
+            index = suffixArray[i]
+
+            if((index >= 1) and (not isSType[index - 1])):
+                suffixArray[bucket[data_[index - 1]]] = index - 1
+                bucket[data_[index - 1]] += 1
+
+        bucket = sumL[:]
+
+        for i in range(dataSize - 1, -1, -1):
+            index = suffixArray[i]
+
+            if((index >= 1) and isSType[index - 1]):
+                bucket[data_[index - 1] + 1] -= 1
+                suffixArray[bucket[data_[index - 1] + 1]] = index - 1
+
+    # Find the left most S-type (LMS) suffixes
+    lmsMap = [-1]*(dataSize + 1)
+    lmsIndexes = []
+
+    for i in range(1, dataSize):
+        if((not isSType[i - 1]) and isSType[i]):
+            lmsMap[i] = len(lmsIndexes)
+            lmsIndexes.append(i)
+
+    lmsCount = len(lmsIndexes)
+
+    induceSort(lmsIndexes)
+
+    if(lmsCount > 0):
+        sortedLms = []
+
+        for index in suffixArray:
+            if(lmsMap[index] != -1):
+                sortedLms.append(index)
+
+        # Name the LMS substrings. Equal substrings receive the same name
+        reducedData = [0]*lmsCount
+        reducedAlphabetSize = 0
+        reducedData[lmsMap[sortedLms[0]]] = 0
+
+        for i in range(1, lmsCount):
+            left = sortedLms[i - 1]
+            right = sortedLms[i]
+
+            if((lmsMap[left] + 1) < lmsCount):
+                endLeft = lmsIndexes[lmsMap[left] + 1]
+            else:
+                endLeft = dataSize
+
+            if((lmsMap[right] + 1) < lmsCount):
+                endRight = lmsIndexes[lmsMap[right] + 1]
+            else:
+                endRight = dataSize
+
+            same = True
+
+            if((endLeft - left) != (endRight - right)):
+                same = False
+            else:
+                while(left < endLeft):
+                    if(data_[left] != data_[right]):
+                        break
+
+                    left += 1
+                    right += 1
+
+                if((left == dataSize) or (data_[left] != data_[right])):
+                    same = False
+
+            if(not same):
+                reducedAlphabetSize += 1
+
+            reducedData[lmsMap[sortedLms[i]]] = reducedAlphabetSize
+
+        # Sort the reduced problem recursively and use it to order the LMS suffixes
+        reducedSuffixArray = buildSuffixArray(reducedData, reducedAlphabetSize + 1)
+
+        for i in range(0, lmsCount):
+            sortedLms[i] = lmsIndexes[reducedSuffixArray[i]]
+
+        induceSort(sortedLms)
+
+    return suffixArray
+
+def getPrimitivePeriod(data_, dataSize_):
+    """
+    Find the length of the shortest sequence which repeated produces data_. If data_ is not periodic the data size is
+    returned
+
+    :param data_: The data sequence (integer array)
+    :param dataSize_: The number of symbols in data_ to use
+    :return: Length of the primitive period of data_
+    """
+
+    if(dataSize_ == 0):
+        return 0
+
+    # Compute the KMP failure function, the longest proper border of the data gives the smallest period
+    failure = [0]*dataSize_
+    borderLen = 0
+
+    for i in range(1, dataSize_):
+        symbol = data_[i]
+
+        while((borderLen > 0) and (data_[borderLen] != symbol)):
+            borderLen = failure[borderLen - 1]
+
+        if(data_[borderLen] == symbol):
+            borderLen += 1
+
+        failure[i] = borderLen
+
+    period = dataSize_ - failure[dataSize_ - 1]
+
+    # A period only produces identical rotations if the data is made up of whole repetitions of it
+    if((dataSize_ % period) != 0):
+        return dataSize_
+
+    return period
+
+def sortRotations(data_, dataSize_, alphabetSize_=256):
+    """
+    Sort the cyclic rotations of data_ in lexicographical order. Identical rotations (periodic data) are ordered by
+    ascending start index.
+
+    :param data_: The data sequence (integer array)
+    :param dataSize_: The number of symbols in data_ to use
+    :param alphabetSize_: The number of distinct symbol values that can appear in data_
+    :return: List of rotation start indexes in sorted order
+    """
+
+    period = getPrimitivePeriod(data_, dataSize_)
+
+    if(period == 0):
+        return []
+
+    # Sort the rotations of the primitive period using the suffix array of the period concatenated with itself
+    doubledData = list(data_[0:period])
+    doubledData.extend(doubledData)
+
+    suffixArray = buildSuffixArray(doubledData, alphabetSize_)
+
+    periodRotations = [index for index in suffixArray if index < period]
+
+    if(period == dataSize_):
+        return periodRotations
+
+    # Every rotation of the period corresponds to dataSize_/period identical rotations of the full data
+    rotations = []
+
+    for index in periodRotations:
+        rotations.extend(range(index, dataSize_, period))
+
+    return rotations
+
+def sortRotationsPrefixDoubling(data_, dataSize_):
+    """
+    Sort the cyclic rotations of data_ in lexicographical order using prefix doubling. On each pass the rotations are
+    ranked by the (rank[i], rank[i + k mod n]) pairs which doubles the number of symbols compared. Identical rotations
+    (periodic data) are ordered by ascending start index. Requires NumPy.
+
+    :param data_: The data sequence (integer array)
+    :param dataSize_: The number of symbols in data_ to use
+    :return: NumPy array of rotation start indexes in sorted order
+    """
+
+    if(numpy is None):
+        raise Exception('NumPy is not available')
+
+    if(dataSize_ == 0):
+        return numpy.zeros(0, dtype=numpy.int64)
+
+    rank = numpy.asarray(data_[0:dataSize_]).astype(numpy.int64)
+    prefixLen = 1
+
+    while(prefixLen < dataSize_):
+        secondRank = numpy.roll(rank, -prefixLen)
+
+        # Sort by the rank of the first half and then the rank of the second half (lexsort sorts by the last key first)
+        order = numpy.lexsort((secondRank, rank))
+        sortedRank = rank[order]
+        sortedSecondRank = secondRank[order]
+
+        # Rotations receive a new rank whenever either half differs from the previous rotation in the sorted order
+        rankChanged = numpy.empty(dataSize_, dtype=numpy.int64)
+        rankChanged[0] = 0
+        rankChanged[1:] = (sortedRank[1:] != sortedRank[:-1]) | (sortedSecondRank[1:] != sortedSecondRank[:-1])
+
+        rank = numpy.empty(dataSize_, dtype=numpy.int64)
+        rank[order] = numpy.cumsum(rankChanged)
+
+        # Once every rotation has a unique rank the order is final
+        if(rank[order[-1]] == (dataSize_ - 1)):
+            break
+
+        prefixLen *= 2
+
+    # Stable sort keeps identical rotations in ascending index order
+    return numpy.argsort(rank, kind='stable')
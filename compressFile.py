@@ -1,11 +1,9 @@
 __author__ = 'marko'
 
 import sys
-from Kompressor import Kompressor
-from Dekompressor import Dekompressor
+from KompressedArchive import KompressedWriter, KompressedReader
 import cProfile
 import os
-import array
 from binascii import unhexlify
 
 def main():
@@ -26,15 +24,6 @@ def main():
     fileSize = 0
     compressedFileSize = 0
 
-    inputData = array.array('i', [0]*2048)
-    inputDataSize = 0
-
-    kompressor = Kompressor(2048*numLinesAtOnce, 10, 13)
-    dekompressor = Dekompressor(2048*numLinesAtOnce, 10, 13)
-
-    # Hold all the compressed data in lines
-    compressedFileData = []
-
     print('Input Filename: ' + inputFileName);
     print('Output Filename: ' + outputCompressedFileName);
 
@@ -43,40 +32,39 @@ def main():
     # Go through each line in file
 
     lineCount = 0
-    dataToCompress = []
+    dataToCompress = bytearray()
 
     with open(inputFileName, 'r+') as f, open(outputCompressedFileName, 'wb+') as outputCompressedFile:
 
+        # Every group of lines is stored as one block of the archive
+        writer = KompressedWriter(outputCompressedFile, 2048*numLinesAtOnce, 10, 13)
+
         for line in f:
 
             # Strip terminating characters and conver to hex from ascii
             line = line.strip()
-            lineBytes = bytearray.fromhex(line)
-            inputDataSize = len(lineBytes)
-
-            # Copy the data into the integer array
-            for i in range(0, inputDataSize):
-                inputData[i] = lineBytes[i]
-
-            dataToCompress.extend(inputData[:inputDataSize])
+            dataToCompress += bytearray.fromhex(line)
             dataToCompressSize = len(dataToCompress)
             lineCount += 1
 
             if(lineCount >= numLinesAtOnce):
-                compressedData = bytearray(2048*numLinesAtOnce)
-                compressedLineLen = kompressor.kompress(dataToCompress, dataToCompressSize, compressedData, 2048*numLinesAtOnce,lastDataBlock=False)
-
-                compressedFileData.append([compressedLineLen, dataToCompressSize, compressedData])
-
-                #Write compressed line to compressed file
-                outputCompressedFile.write(compressedData[0:compressedLineLen])
+                #Write compressed lines to compressed file
+                writer.write(dataToCompress)
+                writer.flush()
 
                 fileSize += dataToCompressSize
-                compressedFileSize += compressedLineLen
 
-                dataToCompress = []
+                dataToCompress = bytearray()
                 lineCount = 0
 
+        # Store the lines left over after the last full group
+        if(len(dataToCompress) > 0):
+            writer.write(dataToCompress)
+            fileSize += len(dataToCompress)
+
+        writer.close()
+        compressedFileSize = writer.mArchiveSize
+
     profile.disable()
 
     print('Input File Size: ' + str(fileSize))
@@ -85,50 +73,24 @@ def main():
 
     profile.print_stats()
 
-    decompressedFileData = []
-    decompressedSize = 0
-
-    # Dekompress the data stored in memory
-    for i in range(0,len(compressedFileData)):
-        decompressedData = bytearray(2048*numLinesAtOnce)
-        [compressedLineLen, inputDataSize, compressedLineData]  = compressedFileData[i]
-
-        decompressedDataLen = dekompressor.dekompress(compressedLineData, compressedLineLen, decompressedData, 2048*numLinesAtOnce)
-
-        if(decompressedDataLen != inputDataSize):
-            print('ERROR decompressing 1 at line [' + str(i) + ']')
-            #exit(0)
-
-        decompressedSize += decompressedDataLen
-        decompressedFileData.append([decompressedDataLen, decompressedData])
+    # Dekompress the compressed file. A group of lines longer than a section is split across several blocks so the
+    # whole stream is validated rather than each block
+    with open(outputCompressedFileName, 'rb') as compressedFile:
+        decompressedData = KompressedReader(compressedFile).read()
 
     #Go through and veriy all decompressed lines match original
-    count = 0
-    lineCount = 0
-    dataToCompare = bytearray()
+    originalData = bytearray()
 
     with open(inputFileName, 'r+') as f:
 
         for line in f:
             # Strip terminating characters and conver to hex from ascii
             line = line.strip()
-            lineBytes = bytearray.fromhex(line)
-
-            for dataByte in lineBytes:
-                dataToCompare.append(dataByte)
+            originalData += bytearray.fromhex(line)
 
-            dataToCompareSize = len(dataToCompare)
-            lineCount += 1
-
-            if(lineCount >= numLinesAtOnce):
-
-                if(decompressedFileData[count][0] != dataToCompareSize or decompressedFileData[count][1][:decompressedFileData[count][0]] != dataToCompare):
-                    print('ERROR decompressing 2 on line [' + str(count) + ']\r\n')
-                    exit(0)
-
-                lineCount = 0
-                dataToCompare = bytearray()
-                count += 1
+    if(decompressedData != originalData):
+        print('ERROR decompressing, decompressed data does not match the input file\r\n')
+        exit(0)
 
     print('\n\n')
     print('Decompression Validated')
@@ -0,0 +1,69 @@
+__author__ = 'Marko Milutinovic'
+
+import io
+import random
+from KompressedArchive import KompressedWriter
+
+class NonSeekableFile(io.RawIOBase):
+    """
+    Wraps a byte string in a readable file object that can not seek
+    """
+
+    def __init__(self, data_):
+        self.mFile = io.BytesIO(data_)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer_):
+        return self.mFile.readinto(buffer_)
+
+def createTestData(size_, seed_):
+    """
+    Create text like test data made of short and long runs of a few symbols, so it compresses but is not trivial
+
+    :param size_: The size of the data
+    :param seed_: Seed for the random generator, the same seed always gives the same data
+    :return: The data (bytes)
+    """
+
+    randomGenerator = random.Random(seed_)
+    data = bytearray()
+
+    while(len(data) < size_):
+        data += bytes([randomGenerator.choice(b'abcdef \n')])*randomGenerator.choice([1, 1, 2, 5, 40])
+
+    return bytes(data[0:size_])
+
+def createSections(count_, sectionSize_, seed_):
+    """
+    Create a list of sections of test data, each between one byte and a full section in size
+
+    :param count_: The number of sections
+    :param sectionSize_: The max size of a section
+    :param seed_: Seed for the random generator, the same seed always gives the same sections
+    :return: List of sections (bytes)
+    """
+
+    randomGenerator = random.Random(seed_)
+
+    return [createTestData(randomGenerator.randint(1, sectionSize_), randomGenerator.getrandbits(32)) for i in range(0, count_)]
+
+def createArchive(data_, sectionSize_, **kwargs):
+    """
+    Write data into an archive held in memory, using a generic max run of 10
+
+    :param data_: The data to store (bytes-like)
+    :param sectionSize_: Max size of a block
+    :param kwargs: Any other KompressedWriter parameters
+    :return: The archive (io.BytesIO positioned at the start of the archive)
+    """
+
+    archiveFile = io.BytesIO()
+
+    with KompressedWriter(archiveFile, sectionSize_, 10, **kwargs) as writer:
+        writer.write(data_)
+
+    archiveFile.seek(0)
+
+    return archiveFile
@@ -1,6 +1,7 @@
 __author__ = 'marko'
 
 import unittest
+import random
 from AREncoder import AREncoder
 from ARDecoder import ARDecoder
 from array import array
@@ -33,8 +34,7 @@ class TestARDecoder(unittest.TestCase):
         self.assertEqual(None, test_ardecoder.mDecodedData)
         self.assertEqual(0, test_ardecoder.mDecodedDataLen)
 
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(0, test_ardecoder.mBitReader.getBitPosition())
         self.assertEqual(256, test_ardecoder.mTotalSymbolCount)
 
         self.assertEqual(0, test_ardecoder.mLowerTag)
@@ -56,9 +56,9 @@ class TestARDecoder(unittest.TestCase):
         test_ardecoder.mCurrentBitCount = 9
         test_ardecoder.mCompressedData = 1
         test_ardecoder.mCompressedDataCount = 99
-        test_ardecoder.mCurrentEncodedByteIndex = 44
-        test_ardecoder.mCurrentEncodedDataBit = 99
-        test_ardecoder.mEncodedData = bytearray()
+        test_ardecoder.mEncodedData = bytearray([0xFF, 0xFF])
+        test_ardecoder.mBitReader.attach(test_ardecoder.mEncodedData, 2)
+        test_ardecoder.mBitReader.readBits(9)
         test_ardecoder.mDecodedData = bytearray()
 
         # Initialize byte array to a count of one for each symbol
@@ -79,8 +79,7 @@ class TestARDecoder(unittest.TestCase):
         self.assertEqual(0, test_ardecoder.mDecodedDataLen)
 
         self.assertEqual(test_ardecoder.mVocabularySize, test_ardecoder.mTotalSymbolCount)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(0, test_ardecoder.mBitReader.getBitPosition())
 
         self.assertEqual(0, test_ardecoder.mLowerTag)
         self.assertEqual(test_ardecoder.mWordBitMask, test_ardecoder.mUpperTag)
@@ -90,92 +89,6 @@ class TestARDecoder(unittest.TestCase):
         for i in range(0, test_ardecoder.mVocabularySize):
             self.assertEqual(1, test_ardecoder.mSymbolCount[i])
 
-    def test_get_next_bit_exceedmax(self):
-        # Purpose: Attempt to get the next bit when we have gone through all the encoded data
-        # Expectation: An exception should be raised
-
-        test_ardecoder = ARDecoder(11, 256, 256)
-
-        test_ardecoder.mCurrentEncodedDataByteIndex = 10
-        test_ardecoder.mEncodedDataCount = 10
-
-        with self.assertRaises(Exception):
-            test_ardecoder._get_next_bit()
-
-
-    def test_get_next_bit_valid_Data(self):
-        # Purpose: Get several bits of upcoming
-        # Expectation: The correct bits should be returned
-
-        test_ardecoder = ARDecoder(11, 256, 256)
-
-        test_ardecoder.reset()
-
-        test_ardecoder.mCurrentEncodedDataByteIndex = 0
-        test_ardecoder.mEncodedDataCount = 10
-        test_ardecoder.mEncodedData = bytearray(10)
-
-        test_ardecoder.mEncodedData[0] = 0xAA
-        test_ardecoder.mEncodedData[1] = 0xBB
-        test_ardecoder.mEncodedData[2] = 0xFF
-        test_ardecoder.mEncodedData[3] = 0x00
-
-
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(2, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(3, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(4, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(5, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(6, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(7, test_ardecoder.mCurrentEncodedDataBit)
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
-
-        self.assertEqual(1, test_ardecoder.mCurrentEncodedDataByteIndex)
-
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-
-        self.assertEqual(2, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
-
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-        self.assertEqual(1, test_ardecoder._get_next_bit())
-
-        self.assertEqual(3, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
-
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-        self.assertEqual(0, test_ardecoder._get_next_bit())
-
-        self.assertEqual(4, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
-
     def test_increment_count(self):
         # Purpose: Increment various indexes
         # Expectation: The cumulative counts will be updated appropriately
@@ -291,14 +204,13 @@ class TestARDecoder(unittest.TestCase):
         test_ardecoder.mEncodedData = bytearray(10)
         test_ardecoder.mEncodedData[0] = 0xFF
         test_ardecoder.mEncodedDataCount  = 1
+        test_ardecoder.mBitReader.attach(test_ardecoder.mEncodedData, test_ardecoder.mEncodedDataCount)
 
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(0, test_ardecoder.mBitReader.getBitPosition())
 
         test_ardecoder._rescale()
 
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(0, test_ardecoder.mBitReader.getBitPosition())
 
         self.assertEqual(510, test_ardecoder.mLowerTag)
         self.assertEqual(1025, test_ardecoder.mUpperTag)
@@ -315,9 +227,9 @@ class TestARDecoder(unittest.TestCase):
         test_ardecoder.mEncodedData = bytearray(10)
         test_ardecoder.mEncodedData[0] = 0xFF
         test_ardecoder.mEncodedDataCount = 1
+        test_ardecoder.mBitReader.attach(test_ardecoder.mEncodedData, test_ardecoder.mEncodedDataCount)
 
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(0, test_ardecoder.mBitReader.getBitPosition())
 
         test_ardecoder.mLowerTag = 0          # bottom of range
         test_ardecoder.mUpperTag = 1000       # just below middle of range
@@ -325,8 +237,7 @@ class TestARDecoder(unittest.TestCase):
 
         test_ardecoder._rescale()
 
-        self.assertEqual(0, test_ardecoder.mCurrentEncodedDataByteIndex)
-        self.assertEqual(1, test_ardecoder.mCurrentEncodedDataBit)
+        self.assertEqual(1, test_ardecoder.mBitReader.getBitPosition())
 
         self.assertEqual(0, test_ardecoder.mLowerTag)
         self.assertEqual(2001, test_ardecoder.mUpperTag)
@@ -497,6 +408,28 @@ class TestARDecoder(unittest.TestCase):
         self.assertEqual(176, test_ardecoder.mLowerTag)
         self.assertEqual(1576, test_ardecoder.mUpperTag)
 
+    def test_rescale_E1_and_E3_required(self):
+        # Purpose: Call when the lower and upper tag require two E1 scalings followed by two E3 scalings
+        # Expectation: The tags should be modified by E1 and E3 and four bits should be moved into the current tag
+
+        test_ardecoder = ARDecoder(11, 256, 256)
+
+        test_ardecoder.mEncodedDataCount = 10
+        test_ardecoder.mEncodedData = bytearray(10)
+        test_ardecoder.mEncodedData[0] = 0xA0
+        test_ardecoder.mBitReader.attach(test_ardecoder.mEncodedData, test_ardecoder.mEncodedDataCount)
+
+        test_ardecoder.mLowerTag = 192    # b00011000000
+        test_ardecoder.mUpperTag = 319    # b00100111111
+        test_ardecoder.mCurrentTag = 257  # b00100000001
+
+        test_ardecoder._rescale()
+
+        self.assertEqual(0, test_ardecoder.mLowerTag)
+        self.assertEqual(2044, test_ardecoder.mUpperTag)
+        self.assertEqual(1050, test_ardecoder.mCurrentTag)
+        self.assertEqual(4, test_ardecoder.mBitReader.getBitPosition())
+
     def test_update_range_tags(self):
         # Purpose: Test updating the upper lower tags with incoming symbols
         # Expectation: The upper and lower tags should be updated correctly and the stat counts should be incremented appropriately
@@ -1534,5 +1467,89 @@ class TestARDecoder(unittest.TestCase):
             self.assertEqual(data[i], decodedData[i])
 
 
+    def test_encode_decode_data_large_word_sizes(self):
+        # Purpose: Encode and decode several blocks of data using 24, 32 and 62 bit word sizes
+        # Expectation: The decoded data should match the original for every word size
+
+        randomGenerator = random.Random(9)
+
+        for wordSize in [24, 32, 62]:
+            test_arencoder = AREncoder(wordSize, 267)
+            test_ardecoder = ARDecoder(wordSize, 267, 256)
+
+            for block in range(0, 3):
+                data = array('i', [randomGenerator.choice([0, 0, 1, 258, 266, randomGenerator.randrange(256)]) for i in range(0, 2000)] + [256])
+                inputDataLen = len(data)
+                encodedData = bytearray(8192)
+                decodedData = array('i', [0]*inputDataLen)
+
+                encodedDataSize = test_arencoder.encode(data, inputDataLen, encodedData, 8192, lastDataBlock=(block == 2))
+                decodedDataSize = test_ardecoder.decode(encodedData, encodedDataSize, decodedData, inputDataLen)
+
+                self.assertEqual(inputDataLen - 1, decodedDataSize)
+                self.assertEqual(list(data[0:inputDataLen - 1]), list(decodedData[0:decodedDataSize]))
+
+    def test_decode_exact_space(self):
+        # Purpose: Decode data into an array that is exactly the size of the decoded data, and one entry smaller
+        # Expectation: The data should fill the exact array and an exception should be thrown for the smaller array
+
+        test_arencoder = AREncoder(16, 257)
+
+        data = array('i', [1, 2, 3, 4, 5, 6, 7, 8, 256])
+        encodedData = bytearray(64)
+        decodedData = array('i', [0]*8)
+
+        encodedDataSize = test_arencoder.encode(data, len(data), encodedData, 64)
+
+        self.assertEqual(8, ARDecoder(16, 257, 256).decode(encodedData, encodedDataSize, decodedData, 8))
+        self.assertEqual(list(data[0:8]), list(decodedData))
+
+        with self.assertRaises(Exception):
+            ARDecoder(16, 257, 256).decode(encodedData, encodedDataSize, array('i', [0]*7), 7)
+
+    def test_decode_symbols_matches_step_functions(self):
+        # Purpose: Decode random data with the fused decode loop and with the symbol search, update and rescale steps
+        # Expectation: The decoded data and the decoder state should be the same. The small word size forces normalization
+
+        randomGenerator = random.Random(5)
+        data = array('i', [min(int(randomGenerator.expovariate(0.1)), 255) for i in range(0, 3000)] + [256])
+        encodedData = bytearray(8192)
+
+        encodedDataSize = AREncoder(10, 257).encode(data, len(data), encodedData, 8192)
+
+        test_ardecoder = ARDecoder(10, 257, 256)
+        decodedData = array('i', [0]*len(data))
+        decodedDataSize = test_ardecoder.decode(encodedData, encodedDataSize, decodedData, len(data))
+
+        reference_ardecoder = ARDecoder(10, 257, 256)
+        referenceData = array('i', [0]*len(data))
+        reference_ardecoder.mBitReader.attach(encodedData, encodedDataSize)
+        reference_ardecoder.mCurrentTag = reference_ardecoder.mBitReader.readBits(10)
+        referenceDataSize = 0
+        finished = False
+
+        while(not finished):
+            currentCumulativeCount = ((reference_ardecoder.mCurrentTag - reference_ardecoder.mLowerTag + 1)*reference_ardecoder.mTotalSymbolCount - 1)//(reference_ardecoder.mUpperTag - reference_ardecoder.mLowerTag + 1)
+            [currentSymbol, symbolCumulativeCount] = reference_ardecoder.mFrequencyModel.findSymbol(currentCumulativeCount)
+
+            if(currentSymbol == 256):
+                finished = True
+            else:
+                referenceData[referenceDataSize] = currentSymbol
+                referenceDataSize += 1
+
+            reference_ardecoder._update_range_tags(currentSymbol, symbolCumulativeCount)
+            reference_ardecoder._rescale()
+
+        self.assertEqual(len(data) - 1, decodedDataSize)
+        self.assertEqual(referenceDataSize, decodedDataSize)
+        self.assertEqual(list(referenceData), list(decodedData))
+        self.assertEqual(reference_ardecoder.mLowerTag, test_ardecoder.mLowerTag)
+        self.assertEqual(reference_ardecoder.mUpperTag, test_ardecoder.mUpperTag)
+        self.assertEqual(reference_ardecoder.mCurrentTag, test_ardecoder.mCurrentTag)
+        self.assertEqual(reference_ardecoder.mTotalSymbolCount, test_ardecoder.mTotalSymbolCount)
+        self.assertEqual(list(reference_ardecoder.mSymbolCount), list(test_ardecoder.mSymbolCount))
+        self.assertEqual(reference_ardecoder.mBitReader.getBitPosition(), test_ardecoder.mBitReader.getBitPosition())
+
 if __name__ == '__main__':
     unittest.main()
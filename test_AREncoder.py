@@ -1,6 +1,7 @@
 __author__ = 'mmilutinovic'
 
 import unittest
+import random
 from AREncoder import AREncoder
 from array import array
 
@@ -13,6 +14,20 @@ class TestAREncoder(unittest.TestCase):
         with self.assertRaises(Exception):
             AREncoder(0, 257)
 
+        with self.assertRaises(Exception):
+            AREncoder(63, 257)
+
+    def test_instantiate_Arencoder_62bitword(self):
+        # Purpose: Instantiate encoder with the largest supported word size
+        # Expectation: The masks and max bytes should be based on the 62 bit word
+
+        test_encoder = AREncoder(62, 257)
+
+        self.assertEqual(2**60, test_encoder.mMaxEncodeBytes)
+        self.assertEqual(2**62 - 1, test_encoder.mWordBitMask)
+        self.assertEqual(2**61, test_encoder.mWordMSBMask)
+        self.assertEqual(2**60, test_encoder.mWordSecondMSBMask)
+
     def test_instantiate_Arencoder_valid(self):
         # Purpose: Instantiate kompressor with valid parameters
         # Expectation: The member variables should be initialized correctly
@@ -32,7 +47,7 @@ class TestAREncoder(unittest.TestCase):
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(2047, test_encoder.mUpperTag)
         self.assertEqual(0, test_encoder.mE3ScaleCount)
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         for i in range(0, test_encoder.mVocabularySize):
             self.assertEqual(1, test_encoder.mSymbolCount[i])
@@ -48,8 +63,8 @@ class TestAREncoder(unittest.TestCase):
         test_encoder.mLowerTag = 7
         test_encoder.mUpperTag = 9
         test_encoder.mE3ScaleCount = 99
-        test_encoder.mCurrentByte = 0xFF
-        test_encoder.mCurrentBitCount = 9
+        test_encoder.mBitWriter.attach(bytearray(16), 16)
+        test_encoder.mBitWriter.writeBits(0x1FF, 9)
 
         # Initialize byte array to a count of one for each symbol
         for i in range(0, 256):
@@ -64,117 +79,19 @@ class TestAREncoder(unittest.TestCase):
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(2047, test_encoder.mUpperTag)
         self.assertEqual(0, test_encoder.mE3ScaleCount)
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         # Initialize byte array to a count of one for each symbol
         for i in range(0, 256):
             self.assertEqual(1, test_encoder.mSymbolCount[i])
 
 
-    def test_append_bitmax_not_reached(self):
-        # Purpose: Append bits but ensure that the max of 8 is not exceeded
-        # Expectation: The current byte should contain the passed in bits and the bit count should be correct
-
-        test_encoder = AREncoder(11, 256)
-        test_encoder.mEncodedData = bytearray(1024)
-
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-
-        self.assertEqual(7, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0x4D, test_encoder.mEncodedData[0])
-        self.assertEqual(0, test_encoder.mEncodedData[1])
-
-    def test_append_bitmax_reached(self):
-        # Purpose: Append bits up to max of 8
-        # Expectation: The current byte should be 0 and the previous value should be in the compressed data byte array
-
-        test_encoder = AREncoder(11, 256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
-
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
-        self.assertEqual(1, test_encoder.mEncodedDataCount)
-        self.assertEqual(0x9B, test_encoder.mEncodedData[0])
-        self.assertEqual(0, test_encoder.mEncodedData[1])
-
-    def test_append_bit_past_one_byte(self):
-        # Purpose: Append bits past max of 8 bits per byte
-        # Expectation: The current byte should be based on bits past 8 and the previous value should be based on the first 8 bits
-
-        test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
-
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-        test_encoder._append_bit(1)
-
-        self.assertEqual(4, test_encoder.mCurrentBitCount)
-        self.assertEqual(0x0F, test_encoder.mEncodedData[1])
-        self.assertEqual(1, test_encoder.mEncodedDataCount)
-        self.assertEqual(0x9B, test_encoder.mEncodedData[0])
-
-    def test_append_bit_pastmax_byte(self):
-        # Purpose: Append bits past max bytes
-        # Expectation: An exception should be thrown
-
-        test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(65536)
-        test_encoder.mMaxEncodedDataLen = 65536
-
-        self.assertEqual(65536, len(test_encoder.mEncodedData))
-
-        # Fill up byte array
-        for i in range(0, 65535*8):
-            test_encoder._append_bit(1)
-
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-        test_encoder._append_bit(0)
-
-        self.assertEqual(65536, len(test_encoder.mEncodedData))
-
-        # Push it over the current max
-        with self.assertRaises(Exception):
-            test_encoder._append_bit(1)
-            test_encoder._append_bit(1)
-
     def test_increment_count(self):
         # Purpose: Increment various indexes
         # Expectation: The cumulative counts will be updated appropriately
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         for i in range(0, 256):
             self.assertEqual(1, test_encoder.mSymbolCount[i])
@@ -204,8 +121,7 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The stats should be normalized
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         for i in range(0, 256):
             self.assertEqual(1, test_encoder.mSymbolCount[i])
@@ -238,19 +154,19 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should not be modified and no bits should be added to compressed data
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 510    # b00111111110 (just below quarter mark)
         test_encoder.mUpperTag = 1025   # b10000000001 (halfway point)
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(0, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(510, test_encoder.mLowerTag)
         self.assertEqual(1025, test_encoder.mUpperTag)
@@ -260,20 +176,19 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E1 and a 0 bit should be added to compressed data
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 0     # b00000000000 (0)
         test_encoder.mUpperTag = 1023  # b01111111111 (just below halfway point)
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(1, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(1, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(2047, test_encoder.mUpperTag)
@@ -283,23 +198,22 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E1 and a 0 bit should be added to compressed data. Two 0 bits should be added to compensate for E3 Scale Count
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 0      # b00000000000 (0)
         test_encoder.mUpperTag = 1022   # b01111111110 (just below halfway point)
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         test_encoder.mE3ScaleCount = 2
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
         self.assertEqual(0, test_encoder.mE3ScaleCount)
-        self.assertEqual(3, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(3, test_encoder.mEncodedData[0])
+        self.assertEqual(3, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(3, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(2045, test_encoder.mUpperTag)
@@ -309,20 +223,19 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E1 and a 0 bit should be added to compressed data as many times as E1 was performed
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 0    # b00000000000
         test_encoder.mUpperTag = 256  # b00100000000
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(2, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(2, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(1027, test_encoder.mUpperTag)
@@ -332,20 +245,19 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E2 and a 1 bit should be added to compressed data
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 1024   # b10000000000 (above halfway)
         test_encoder.mUpperTag = 2012   # b11111011100
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(1, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(1, test_encoder.mEncodedData[0])
+        self.assertEqual(1, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(1, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(1977, test_encoder.mUpperTag)
@@ -355,23 +267,22 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E2 and a 1 bit should be added to compressed data. Two 0 bits should be added to compensate for E3 Scale Count
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 1024   # b10000000000 (above halfway)
         test_encoder.mUpperTag = 2012   # b11111011100
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         test_encoder.mE3ScaleCount = 2
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
         self.assertEqual(0, test_encoder.mE3ScaleCount)
-        self.assertEqual(3, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0x4, test_encoder.mEncodedData[0])
+        self.assertEqual(3, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(0x4, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(1977, test_encoder.mUpperTag)
@@ -381,20 +292,19 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E2 and a 1 bit should be added to compressed data for each scaling
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 1536   # b11000000000
         test_encoder.mUpperTag = 2047   # b11111111111
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(2, test_encoder.mCurrentBitCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0x3, test_encoder.mEncodedData[0])
+        self.assertEqual(2, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(1, test_encoder.mBitWriter.flush())
+        self.assertEqual(0x3, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(2047, test_encoder.mUpperTag)
@@ -404,21 +314,20 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified according to E3 and the E3 scale count should be incremented
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 512    # b01000000000 (above quarter mark)
         test_encoder.mUpperTag = 1500   # b10111011100 (below 3 quarters mark
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
         self.assertEqual(1, test_encoder.mE3ScaleCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(0, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(0, test_encoder.mLowerTag)
         self.assertEqual(1976, test_encoder.mUpperTag)
@@ -428,38 +337,53 @@ class TestAREncoder(unittest.TestCase):
         # Expectation: The tags should be modified by E3
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 812    # b01100101100
         test_encoder.mUpperTag = 1162   # b10010001010
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
 
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
         self.assertEqual(2, test_encoder.mE3ScaleCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(0, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
 
         self.assertEqual(176, test_encoder.mLowerTag)
         self.assertEqual(1576, test_encoder.mUpperTag)
 
+    def test_rescale_E1_and_E3_required(self):
+        # Purpose: Call when the lower and upper tag require two E1 scalings followed by two E3 scalings
+        # Expectation: Two 0 bits should be added to compressed data and the E3 scale count should be 2
+
+        test_encoder = AREncoder(11,256)
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
+
+        test_encoder.mLowerTag = 192    # b00011000000
+        test_encoder.mUpperTag = 319    # b00100111111
+
+        [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag)
+
+        self.assertEqual(2, test_encoder.mE3ScaleCount)
+        self.assertEqual(2, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(0, test_encoder.mLowerTag)
+        self.assertEqual(2044, test_encoder.mUpperTag)
+
     def test_update_range_tags(self):
         # Purpose: Test updating the upper lower tags with incoming symbols
         # Expectation: The upper and lower tags should be updated correctly and the stat counts should be incremented appropriately
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         test_encoder.mLowerTag = 0
         test_encoder.mUpperTag = 2047
 
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         # Pass in index for symbol 0x00 which currently has cumulative count of 1 out of total count of 256
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._update_range_tags(0, test_encoder.mLowerTag, test_encoder.mUpperTag)
@@ -470,7 +394,7 @@ class TestAREncoder(unittest.TestCase):
 
         self.assertEqual(2, test_encoder.mSymbolCount[0])
         self.assertEqual(257, test_encoder.mTotalSymbolCount)
-        self.assertEqual(0, test_encoder.mEncodedDataCount)
+        self.assertEqual(0, test_encoder.mBitWriter.getBitCount())
 
         # _rescale
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._rescale(test_encoder.mLowerTag, test_encoder.mUpperTag);
@@ -480,9 +404,7 @@ class TestAREncoder(unittest.TestCase):
 
         self.assertEqual(2, test_encoder.mSymbolCount[0])
         self.assertEqual(257, test_encoder.mTotalSymbolCount)
-        self.assertEqual(1, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
-        self.assertEqual(0, test_encoder.mCurrentBitCount)
+        self.assertEqual(8, test_encoder.mBitWriter.getBitCount())
 
         # Pass in index for symbol 0x00 which currently has cumulative count of 2 out of total count of 257
         [test_encoder.mLowerTag, test_encoder.mUpperTag] = test_encoder._update_range_tags(0, test_encoder.mLowerTag, test_encoder.mUpperTag)
@@ -502,10 +424,7 @@ class TestAREncoder(unittest.TestCase):
 
         self.assertEqual(3, test_encoder.mSymbolCount[0])
         self.assertEqual(258, test_encoder.mTotalSymbolCount)
-        self.assertEqual(1, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
-        self.assertEqual(0, test_encoder.mEncodedData[1])
-        self.assertEqual(7, test_encoder.mCurrentBitCount)
+        self.assertEqual(15, test_encoder.mBitWriter.getBitCount())
 
         # Pass in index for symbol 0xAA which currently has count of 1
         self.assertEqual(1, test_encoder.mSymbolCount[0xA9])
@@ -532,18 +451,18 @@ class TestAREncoder(unittest.TestCase):
         self.assertEqual(2, test_encoder.mSymbolCount[0xAA])
         self.assertEqual(259, test_encoder.mTotalSymbolCount)
 
-        self.assertEqual(2, test_encoder.mEncodedDataCount)
-        self.assertEqual(0, test_encoder.mEncodedData[0])
-        self.assertEqual(1, test_encoder.mEncodedData[1])
-        self.assertEqual(7, test_encoder.mCurrentBitCount)
+        self.assertEqual(23, test_encoder.mBitWriter.getBitCount())
+
+        self.assertEqual(3, test_encoder.mBitWriter.flush())
+        self.assertEqual(0, test_encoder.mBitWriter.mBuffer[0])
+        self.assertEqual(1, test_encoder.mBitWriter.mBuffer[1])
 
     def test_normalize_stats(self):
         # Purpose: Normalize statistics across several ranges
         # Expectation: The cumulative counts should be correct after each normalization
 
         test_encoder = AREncoder(11,256)
-        test_encoder.mEncodedData = bytearray(1024)
-        test_encoder.mMaxEncodedDataLen = 1024
+        test_encoder.mBitWriter.attach(bytearray(1024), 1024)
 
         # Normalize unchanged data, it should remain the same
         test_encoder._normalize_stats();
@@ -630,6 +549,34 @@ class TestAREncoder(unittest.TestCase):
         self.assertEqual(0x80, encodedData[3])
         self.assertEqual(0x00, encodedData[4])
 
+    def test_encode_symbols_matches_step_functions(self):
+        # Purpose: Encode random data with the fused encode loop and with the individual update, increment and rescale steps
+        # Expectation: The encoded bits and the encoder state should be the same. The small word size forces normalization
+
+        random.seed(11)
+        data = array('i', [min(int(random.expovariate(0.1)), 255) for i in range(0, 3000)])
+
+        test_encoder = AREncoder(10, 256)
+        test_encoder.mBitWriter.attach(bytearray(4096), 4096)
+        test_encoder._encode_symbols(data, len(data))
+
+        reference_encoder = AREncoder(10, 256)
+        reference_encoder.mBitWriter.attach(bytearray(4096), 4096)
+
+        for i in range(0, len(data)):
+            [reference_encoder.mLowerTag, reference_encoder.mUpperTag] = reference_encoder._update_range_tags(data[i], reference_encoder.mLowerTag, reference_encoder.mUpperTag)
+            reference_encoder._increment_count(data[i])
+            [reference_encoder.mLowerTag, reference_encoder.mUpperTag] = reference_encoder._rescale(reference_encoder.mLowerTag, reference_encoder.mUpperTag)
+
+        self.assertEqual(reference_encoder.mLowerTag, test_encoder.mLowerTag)
+        self.assertEqual(reference_encoder.mUpperTag, test_encoder.mUpperTag)
+        self.assertEqual(reference_encoder.mE3ScaleCount, test_encoder.mE3ScaleCount)
+        self.assertEqual(reference_encoder.mTotalSymbolCount, test_encoder.mTotalSymbolCount)
+        self.assertEqual(list(reference_encoder.mSymbolCount), list(test_encoder.mSymbolCount))
+        self.assertEqual(reference_encoder.mBitWriter.getBitCount(), test_encoder.mBitWriter.getBitCount())
+        self.assertEqual(reference_encoder.mBitWriter.flush(), test_encoder.mBitWriter.flush())
+        self.assertEqual(reference_encoder.mBitWriter.mBuffer, test_encoder.mBitWriter.mBuffer)
+
     def test_encode_data_not_enough_space(self):
         # Purpose: Encode the data set {0x00, 0x00, 0x01} but set the compressed data byte array size to 1 which is not enough to hold the compressed data
         # Expectation: An exception should be raised
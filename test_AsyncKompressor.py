@@ -0,0 +1,296 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import asyncio
+import concurrent.futures
+import io
+
+import AsyncKompressor
+from AsyncKompressor import AsyncKompressedWriter, AsyncKompressedReader
+from KompressedArchive import KompressedWriter, KompressedReader
+from Kompressor import Kompressor
+import testUtils
+
+class _MemoryStreamWriter:
+    """
+    Minimal stand-in for asyncio.StreamWriter that keeps the data written to it
+    """
+
+    def __init__(self):
+        self.mData = bytearray()
+        self.mDrainCount = 0
+
+    def write(self, data_):
+        self.mData += data_
+
+    async def drain(self):
+        self.mDrainCount += 1
+
+class AsyncKompressorTests(unittest.TestCase):
+    def _createStreamReader(self, data_):
+        streamReader = asyncio.StreamReader()
+        streamReader.feed_data(data_)
+        streamReader.feed_eof()
+
+        return streamReader
+
+    def test_akompress_adekompress(self):
+        """
+        Purpose: Compress and decompress data with the default executor, a thread pool and a process pool using
+                 different parameters
+        Expectation: The archives should match compress_stream and decompress to the original data
+        """
+
+        data = testUtils.createTestData(20000, 1)
+
+        configurations = [[{}, None],
+                          [{'coder_': Kompressor.CODER_RANGE, 'sectionSize_': 3000}, concurrent.futures.ThreadPoolExecutor(2)],
+                          [{'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True, 'sectionSize_': 4096}, concurrent.futures.ProcessPoolExecutor(1)]]
+
+        for [parameters, executor] in configurations:
+            expectedFile = io.BytesIO()
+            KompressedWriter(expectedFile, parameters.get('sectionSize_', 1 << 16), 10, coder_=parameters.get('coder_', Kompressor.CODER_ARITHMETIC),
+                             runLengthMode_=parameters.get('runLengthMode_', Kompressor.RUN_LENGTH_GENERIC), moveToFront_=parameters.get('moveToFront_', False)).write(data)
+
+            async def roundTrip():
+                archiveData = await AsyncKompressor.akompress(bytearray(data), executor_=executor, **parameters)
+                return [archiveData, await AsyncKompressor.adekompress(memoryview(archiveData), executor_=executor)]
+
+            [archiveData, uncompressedData] = asyncio.run(roundTrip())
+
+            if(executor is not None):
+                executor.shutdown()
+
+            self.assertTrue(archiveData.startswith(expectedFile.getvalue()))
+            self.assertEqual(data, uncompressedData)
+
+    def test_writer_matches_serial_writer(self):
+        """
+        Purpose: Write the same data with KompressedWriter and AsyncKompressedWriter using uneven writes and flushes
+        Expectation: The archives should be byte for byte identical and every call should drain the stream at least once
+        """
+
+        data = testUtils.createTestData(30000, 2)
+        writeSizes = [1, 700, 5000, 3, 9000]
+        flushAfter = [701, 5704]
+
+        for [sectionSize, parameters] in [[1024, {}], [700, {'coder_': Kompressor.CODER_RANGE, 'encoderWordSize_': 13}]]:
+            serialFile = io.BytesIO()
+            serialWriter = KompressedWriter(serialFile, sectionSize, 10, **parameters)
+            streamWriter = _MemoryStreamWriter()
+
+            async def writeArchive():
+                async with AsyncKompressedWriter(streamWriter, sectionSize, 10, **parameters) as writer:
+                    position = 0
+
+                    for writeSize in writeSizes:
+                        self.assertEqual(writeSize, await writer.write(data[position:position + writeSize]))
+                        serialWriter.write(data[position:position + writeSize])
+                        position += writeSize
+
+                        if(position in flushAfter):
+                            await writer.flush()
+                            serialWriter.flush()
+
+                    await writer.write(data[position:])
+                    serialWriter.write(data[position:])
+
+            asyncio.run(writeArchive())
+            serialWriter.close()
+
+            self.assertEqual(serialFile.getvalue(), bytes(streamWriter.mData))
+            self.assertLessEqual(len(writeSizes) + len(flushAfter) + 2, streamWriter.mDrainCount)
+
+    def test_writer_window_bounds_blocks_in_flight(self):
+        """
+        Purpose: Write many blocks in one call with a small window, then use a window of zero blocks
+        Expectation: No more blocks than the window should be in flight, finished blocks should be sent to the stream
+                     during the write and the archive should decompress to the original data. An exception should be
+                     thrown for a write after closing and for the empty window
+        """
+
+        data = testUtils.createTestData(20000, 6)
+        streamWriter = _MemoryStreamWriter()
+
+        async def writeArchive():
+            async with AsyncKompressedWriter(streamWriter, 500, 10, maxInFlight_=3) as writer:
+                await writer.write(data)
+
+                # Blocks that finished during the write have been sent already
+                self.assertGreaterEqual(3, len(writer.mInFlight))
+                self.assertEqual(40, len(writer.mBlockIndex) + len(writer.mInFlight))
+                self.assertLess(1, streamWriter.mDrainCount)
+                self.assertEqual(writer.mArchiveSize, len(streamWriter.mData))
+
+            self.assertEqual(0, len(writer.mInFlight))
+            self.assertEqual(40, len(writer.mBlockIndex))
+
+            with self.assertRaises(Exception):
+                await writer.write(b'abc')
+
+        asyncio.run(writeArchive())
+
+        self.assertEqual(data, bytes(KompressedReader(io.BytesIO(bytes(streamWriter.mData))).read()))
+
+        with self.assertRaises(Exception):
+            AsyncKompressedWriter(_MemoryStreamWriter(), 500, 10, maxInFlight_=0)
+
+    def test_writer_sends_finished_blocks(self):
+        """
+        Purpose: Write blocks with a window larger than the number of blocks, wait for them to be compressed and write
+                 less than a section
+        Expectation: The finished blocks should be sent to the stream by the second write
+        """
+
+        data = testUtils.createTestData(3000, 7)
+        streamWriter = _MemoryStreamWriter()
+
+        async def writeArchive():
+            async with AsyncKompressedWriter(streamWriter, 1000, 10, maxInFlight_=8) as writer:
+                await writer.write(data[0:2500])
+                await asyncio.wait(list(writer.mInFlight))
+                await writer.write(data[2500:2501])
+
+                self.assertEqual(0, len(writer.mInFlight))
+                self.assertEqual(2, len(writer.mBlockIndex))
+                self.assertEqual(writer.mArchiveSize, len(streamWriter.mData))
+
+                await writer.write(data[2501:])
+
+        asyncio.run(writeArchive())
+
+        self.assertEqual(data, bytes(KompressedReader(io.BytesIO(bytes(streamWriter.mData))).read()))
+
+    def test_writer_error_waits_for_blocks(self):
+        """
+        Purpose: Leave the writer context with an error while blocks are being compressed
+        Expectation: Every block in flight should be done once the context exits and the archive should not be completed
+        """
+
+        data = testUtils.createTestData(20000, 8)
+        streamWriter = _MemoryStreamWriter()
+
+        async def writeArchive():
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                with self.assertRaises(ValueError):
+                    async with AsyncKompressedWriter(streamWriter, 500, 10, executor_=executor, maxInFlight_=6) as writer:
+                        await writer.write(data)
+                        inFlight = list(writer.mInFlight)
+                        raise ValueError('Stop writing')
+
+                self.assertLess(0, len(inFlight))
+                self.assertTrue(all([future.done() for future in inFlight]))
+                self.assertEqual(0, len(writer.mInFlight))
+                self.assertFalse(writer.mClosed)
+
+        asyncio.run(writeArchive())
+
+    def test_reader_stream(self):
+        """
+        Purpose: Read an archive followed by more data from a StreamReader, block by block and all at once
+        Expectation: The blocks should decompress to the original data and the stream should be left after the archive
+        """
+
+        data = testUtils.createTestData(10000, 3)
+        archiveFile = testUtils.createArchive(data, 1024)
+
+        async def readArchive():
+            streamReader = self._createStreamReader(archiveFile.getvalue() + b'next')
+            reader = AsyncKompressedReader(streamReader)
+            blocks = [block async for block in reader]
+
+            self.assertEqual(b'', await reader.readBlock())
+            self.assertEqual(b'next', await streamReader.read())
+
+            return blocks
+
+        blocks = asyncio.run(readArchive())
+
+        self.assertEqual(10, len(blocks))
+        self.assertEqual(data, b''.join(blocks))
+
+        async def readAll(executor_):
+            return await AsyncKompressedReader(self._createStreamReader(archiveFile.getvalue()), executor_=executor_).read()
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            self.assertEqual(data, asyncio.run(readAll(executor)))
+
+    def test_connection_round_trip(self):
+        """
+        Purpose: Send an archive over a local connection with AsyncKompressedWriter and read it on the other end with
+                 AsyncKompressedReader
+        Expectation: The server should receive the original data
+        """
+
+        data = testUtils.createTestData(50000, 4)
+
+        async def roundTrip():
+            received = asyncio.get_running_loop().create_future()
+
+            async def handleConnection(streamReader_, streamWriter_):
+                received.set_result(await AsyncKompressedReader(streamReader_).read())
+                streamWriter_.close()
+
+            server = await asyncio.start_server(handleConnection, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+
+            [streamReader, streamWriter] = await asyncio.open_connection('127.0.0.1', port)
+
+            async with AsyncKompressedWriter(streamWriter, 4096, 10) as writer:
+                for position in range(0, len(data), 3000):
+                    await writer.write(data[position:position + 3000])
+
+            result = await received
+            streamWriter.close()
+            await streamWriter.wait_closed()
+            server.close()
+            await server.wait_closed()
+
+            return result
+
+        self.assertEqual(data, asyncio.run(roundTrip()))
+
+    def test_coder_cache_is_bounded(self):
+        """
+        Purpose: Get coders for more sets of parameters than the thread keeps, then get the most recent one again
+        Expectation: Only MAX_CACHED_CODERS coders should be kept and the most recently used coder should be reused
+        """
+
+        def getCoders():
+            coders = [AsyncKompressor._getCoder(Kompressor, (sectionSize, 10, 16, None, Kompressor.CODER_ARITHMETIC, Kompressor.RUN_LENGTH_GENERIC, False), 10)
+                      for sectionSize in range(100, 100 + 2*AsyncKompressor.MAX_CACHED_CODERS)]
+            lastCoder = AsyncKompressor._getCoder(Kompressor, (99 + 2*AsyncKompressor.MAX_CACHED_CODERS, 10, 16, None, Kompressor.CODER_ARITHMETIC,
+                                                               Kompressor.RUN_LENGTH_GENERIC, False), 10)
+
+            return [len(AsyncKompressor._threadState.coders), lastCoder is coders[-1]]
+
+        # A fresh thread starts with an empty cache
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            self.assertEqual([AsyncKompressor.MAX_CACHED_CODERS, True], executor.submit(getCoders).result())
+
+    def test_reader_errors(self):
+        """
+        Purpose: Read a truncated archive, an archive with a corrupted block and data that is not an archive
+        Expectation: An exception should be thrown
+        """
+
+        data = testUtils.createTestData(5000, 5)
+        archiveData = testUtils.createArchive(data, 1024).getvalue()
+        corruptedData = bytearray(archiveData)
+        corruptedData[40] ^= 0xFF
+
+        async def readAll(archiveData_):
+            return await AsyncKompressedReader(self._createStreamReader(archiveData_)).read()
+
+        async def readFirstBlock(archiveData_):
+            return await AsyncKompressedReader(self._createStreamReader(archiveData_)).readBlock()
+
+        for badData in [archiveData[0:-10], archiveData[0:100], bytes(corruptedData), b'not an archive at all']:
+            with self.assertRaises(Exception):
+                asyncio.run(readAll(badData))
+
+        # The blocks before the point where the archive was truncated can still be read
+        self.assertEqual(data[0:1024], asyncio.run(readFirstBlock(archiveData[0:-10])))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import random
+from BitStream import BitWriter, BitReader
+
+class TestBitStream(unittest.TestCase):
+
+    def test_write_bits_byte_not_complete(self):
+        # Purpose: Write bits but ensure that the max of 8 is not exceeded
+        # Expectation: The bit count should be correct and the outstanding bits should be stored in the LSBs of the byte
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 1024)
+
+        test_writer.writeBits(1, 1)
+        test_writer.writeBits(0, 1)
+        test_writer.writeBits(0, 1)
+        test_writer.writeBits(1, 1)
+        test_writer.writeBits(1, 1)
+        test_writer.writeBits(0, 1)
+        test_writer.writeBits(1, 1)
+
+        self.assertEqual(7, test_writer.getBitCount())
+        self.assertEqual(1, test_writer.flush())
+        self.assertEqual(0x4D, test_writer.mBuffer[0])
+        self.assertEqual(0, test_writer.mBuffer[1])
+
+    def test_write_bits_byte_complete(self):
+        # Purpose: Write bits up to max of 8
+        # Expectation: The byte should be stored in the byte array
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 1024)
+
+        for bit in [1, 0, 0, 1, 1, 0, 1, 1]:
+            test_writer.writeBits(bit, 1)
+
+        self.assertEqual(8, test_writer.getBitCount())
+        self.assertEqual(1, test_writer.flush())
+        self.assertEqual(0x9B, test_writer.mBuffer[0])
+        self.assertEqual(0, test_writer.mBuffer[1])
+
+    def test_write_bits_past_one_byte(self):
+        # Purpose: Write bits past max of 8 bits per byte
+        # Expectation: The first byte should be based on the first 8 bits and the second on the bits past 8
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 1024)
+
+        test_writer.writeBits(0x9B, 8)
+        test_writer.writeBits(0x3, 2)
+        test_writer.writeBits(0x3, 2)
+
+        self.assertEqual(12, test_writer.getBitCount())
+        self.assertEqual(2, test_writer.flush())
+        self.assertEqual(0x9B, test_writer.mBuffer[0])
+        self.assertEqual(0x0F, test_writer.mBuffer[1])
+
+    def test_write_bits_stale_buffer(self):
+        # Purpose: Write bits into a byte array that already holds data
+        # Expectation: The previous contents should not leak into the written bytes
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray([0xFF]*16), 16)
+
+        test_writer.writeBits(0x0, 4)
+        test_writer.writeBits(0x1, 12)
+        test_writer.writeBits(0x0, 3)
+
+        self.assertEqual(3, test_writer.flush())
+        self.assertEqual(bytearray([0x00, 0x01, 0x00]), test_writer.mBuffer[0:3])
+
+    def test_write_bits_matches_single_bits(self):
+        # Purpose: Write groups of bits of different lengths, including groups longer than the accumulator
+        # Expectation: The stored bytes should match writing the same bits one at a time
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(4096), 4096)
+
+        reference_writer = BitWriter()
+        reference_writer.attach(bytearray(4096), 4096)
+
+        random.seed(3)
+
+        for i in range(0, 500):
+            bit_count = random.randint(0, 80)
+            bit_values = random.getrandbits(bit_count) if bit_count > 0 else 0
+
+            test_writer.writeBits(bit_values, bit_count)
+
+            for j in range(bit_count - 1, -1, -1):
+                reference_writer.writeBits((bit_values >> j) & 0x01, 1)
+
+        self.assertEqual(reference_writer.getBitCount(), test_writer.getBitCount())
+        self.assertEqual(reference_writer.flush(), test_writer.flush())
+        self.assertEqual(reference_writer.mBuffer, test_writer.mBuffer)
+
+    def test_write_run(self):
+        # Purpose: Write runs of identical bits
+        # Expectation: The run bits should be stored, a run of length 0 should not store anything
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 1024)
+
+        test_writer.writeRun(1, 3)
+        test_writer.writeRun(0, 0)
+        test_writer.writeRun(0, 6)
+        test_writer.writeRun(1, 15)
+
+        self.assertEqual(24, test_writer.getBitCount())
+        self.assertEqual(3, test_writer.flush())
+        self.assertEqual(bytearray([0xE0, 0x7F, 0xFF]), test_writer.mBuffer[0:3])
+
+    def test_write_long_run(self):
+        # Purpose: Write a run that is far longer than the accumulator
+        # Expectation: All the bytes of the run should be stored
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 1024)
+
+        test_writer.writeBits(0, 4)
+        test_writer.writeRun(1, 8000)
+        test_writer.writeBits(0, 4)
+
+        self.assertEqual(1001, test_writer.flush())
+        self.assertEqual(0x0F, test_writer.mBuffer[0])
+        self.assertEqual(bytearray([0xFF]*999), test_writer.mBuffer[1:1000])
+        self.assertEqual(0xF0, test_writer.mBuffer[1000])
+
+    def test_write_bits_past_max(self):
+        # Purpose: Write bits past max bytes
+        # Expectation: An exception should be thrown as soon as the max is reached
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(65536), 65536)
+
+        # Fill up byte array
+        for i in range(0, 65535*8):
+            test_writer.writeBits(1, 1)
+
+        test_writer.writeBits(0, 7)
+
+        self.assertEqual((65535*8) + 7, test_writer.getBitCount())
+
+        # Push it over the current max
+        with self.assertRaises(Exception):
+            test_writer.writeBits(1, 1)
+
+    def test_write_run_past_max(self):
+        # Purpose: Write a run longer than the space left
+        # Expectation: An exception should be thrown
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(1024), 2)
+
+        test_writer.writeBits(0x5, 3)
+
+        with self.assertRaises(Exception):
+            test_writer.writeRun(1, 16)
+
+    def test_read_bits_exceed_max(self):
+        # Purpose: Attempt to read the next bit when we have gone through all the data
+        # Expectation: An exception should be raised
+
+        test_reader = BitReader()
+        test_reader.attach(bytearray(10), 10)
+
+        test_reader.readBits(80)
+
+        with self.assertRaises(Exception):
+            test_reader.readBit()
+
+    def test_read_bits_exceed_length(self):
+        # Purpose: Attempt to read bits past the length passed in, even though the byte array is larger
+        # Expectation: An exception should be raised
+
+        test_reader = BitReader()
+        test_reader.attach(bytearray(10), 2)
+
+        self.assertEqual(0, test_reader.readBits(12))
+
+        with self.assertRaises(Exception):
+            test_reader.readBits(5)
+
+    def test_read_bit_valid_data(self):
+        # Purpose: Read several bits one at a time
+        # Expectation: The correct bits should be returned MSB first
+
+        test_reader = BitReader()
+        test_reader.attach(bytearray([0xAA, 0xBB, 0xFF, 0x00]), 4)
+
+        bits = []
+
+        for i in range(0, 32):
+            bits.append(test_reader.readBit())
+
+        self.assertEqual([1, 0, 1, 0, 1, 0, 1, 0], bits[0:8])
+        self.assertEqual([1, 0, 1, 1, 1, 0, 1, 1], bits[8:16])
+        self.assertEqual([1]*8, bits[16:24])
+        self.assertEqual([0]*8, bits[24:32])
+        self.assertEqual(32, test_reader.getBitPosition())
+
+    def test_read_bits_valid_data(self):
+        # Purpose: Read groups of bits that start and end inside a byte and that span several bytes
+        # Expectation: The correct bits should be returned and the bit position should be updated
+
+        test_reader = BitReader()
+        test_reader.attach(bytearray([0xAA, 0xBB, 0xFF, 0x00]), 4)
+
+        self.assertEqual(0x0, test_reader.readBits(0))
+        self.assertEqual(0x5, test_reader.readBits(3))
+        self.assertEqual(3, test_reader.getBitPosition())
+        self.assertEqual(0x2AE, test_reader.readBits(11))
+        self.assertEqual(14, test_reader.getBitPosition())
+        self.assertEqual(0x3FF0, test_reader.readBits(14))
+        self.assertEqual(28, test_reader.getBitPosition())
+
+        with self.assertRaises(Exception):
+            test_reader.readBits(5)
+
+    def test_write_read_round_trip(self):
+        # Purpose: Write random groups of bits and read them back with different group sizes
+        # Expectation: The bits read should match the bits written
+
+        test_writer = BitWriter()
+        test_writer.attach(bytearray(8192), 8192)
+
+        random.seed(7)
+
+        bit_string = ''
+
+        for i in range(0, 1000):
+            bit_count = random.randint(1, 70)
+            bit_values = random.getrandbits(bit_count)
+            test_writer.writeBits(bit_values, bit_count)
+            bit_string += format(bit_values, '0%db' % bit_count)
+
+        # Pad to a whole byte so the last byte layout does not matter
+        padding = (8 - (len(bit_string) % 8)) % 8
+        test_writer.writeBits(0, padding)
+        bit_string += '0'*padding
+
+        byte_count = test_writer.flush()
+
+        test_reader = BitReader()
+        test_reader.attach(test_writer.mBuffer, byte_count)
+
+        position = 0
+
+        while(position < len(bit_string)):
+            bit_count = min(random.randint(1, 100), len(bit_string) - position)
+            self.assertEqual(int(bit_string[position:position + bit_count], 2), test_reader.readBits(bit_count))
+            position += bit_count
+
+        self.assertEqual(len(bit_string), test_reader.getBitPosition())
+
+if __name__ == '__main__':
+    unittest.main()
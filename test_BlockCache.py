@@ -0,0 +1,102 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+from BlockCache import BlockCache
+
+class TestBlockCache(unittest.TestCase):
+    def test_get_missing_block(self):
+        # Purpose: Look up a block that was never added
+        # Expectation: None should be returned and the miss should be counted
+
+        test_cache = BlockCache(100)
+
+        self.assertEqual(None, test_cache.get(('archive', 0)))
+        self.assertEqual([0, 1, 0], test_cache.getStatistics())
+
+    def test_put_and_get(self):
+        # Purpose: Add a block and look it up
+        # Expectation: The block should be returned as bytes and the hit should be counted
+
+        test_cache = BlockCache(100)
+
+        storedData = test_cache.put(('archive', 0), bytearray(b'block data'))
+
+        self.assertEqual(bytes, type(storedData))
+        self.assertIs(storedData, test_cache.get(('archive', 0)))
+        self.assertEqual(None, test_cache.get(('other archive', 0)))
+        self.assertEqual(10, test_cache.mCurrentBytes)
+        self.assertEqual([1, 1, 0], test_cache.getStatistics())
+
+    def test_evict_least_recently_used(self):
+        # Purpose: Add blocks past the byte budget after using the oldest block
+        # Expectation: The least recently used blocks should be evicted until the blocks fit
+
+        test_cache = BlockCache(100)
+
+        test_cache.put(('archive', 0), bytes(40))
+        test_cache.put(('archive', 1), bytes(40))
+        test_cache.get(('archive', 0))
+        test_cache.put(('archive', 2), bytes(40))
+
+        self.assertEqual(None, test_cache.get(('archive', 1)))
+        self.assertNotEqual(None, test_cache.get(('archive', 0)))
+        self.assertNotEqual(None, test_cache.get(('archive', 2)))
+        self.assertEqual(80, test_cache.mCurrentBytes)
+        self.assertEqual(1, test_cache.mEvictions)
+
+        # A large block pushes out several small ones
+        test_cache.put(('archive', 3), bytes(90))
+
+        self.assertEqual(90, test_cache.mCurrentBytes)
+        self.assertEqual(3, test_cache.mEvictions)
+
+    def test_block_larger_than_cache(self):
+        # Purpose: Add a block larger than the byte budget
+        # Expectation: The block should be returned but not stored and nothing should be evicted
+
+        test_cache = BlockCache(100)
+
+        test_cache.put(('archive', 0), bytes(50))
+        storedData = test_cache.put(('archive', 1), bytearray(101))
+
+        self.assertEqual(bytes(101), storedData)
+        self.assertEqual(None, test_cache.get(('archive', 1)))
+        self.assertEqual(50, test_cache.mCurrentBytes)
+        self.assertEqual(0, test_cache.mEvictions)
+
+    def test_replace_block(self):
+        # Purpose: Add a block with a key that is already cached
+        # Expectation: The block should be replaced and the cached size should only count it once
+
+        test_cache = BlockCache(100)
+
+        test_cache.put(('archive', 0), bytes(60))
+        test_cache.put(('archive', 0), bytes(30))
+
+        self.assertEqual(30, len(test_cache.get(('archive', 0))))
+        self.assertEqual(30, test_cache.mCurrentBytes)
+        self.assertEqual(0, test_cache.mEvictions)
+
+    def test_clear(self):
+        # Purpose: Clear a cache holding blocks
+        # Expectation: All blocks should be removed but the counters kept
+
+        test_cache = BlockCache(100)
+
+        test_cache.put(('archive', 0), bytes(60))
+        test_cache.get(('archive', 0))
+        test_cache.clear()
+
+        self.assertEqual(None, test_cache.get(('archive', 0)))
+        self.assertEqual(0, test_cache.mCurrentBytes)
+        self.assertEqual([1, 1, 0], test_cache.getStatistics())
+
+    def test_negative_size(self):
+        # Purpose: Create a cache with a negative byte budget
+        # Expectation: An exception should be thrown
+
+        with self.assertRaises(Exception):
+            BlockCache(-1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
 __author__ = 'Marko Milutinovic'
 
 import unittest
+import random
+import mmap
 from array import array
 
 from Dekompressor import Dekompressor
 from SimpleEncoder import SimpleEncoder
 from SimpleDecoder import SimpleDecoder
 from Kompressor import Kompressor
+import utils
 
 class KompressorTests(unittest.TestCase):
     def test_constructor(self):
@@ -356,7 +359,154 @@ class KompressorTests(unittest.TestCase):
         expandedData = array('i', [0]*5)
 
         with self.assertRaises(Exception):
-            expandedCount = dekompressor._expandRunsGeneric(257, 3, compressedData, 5, expandedData, 5)
+            expandedCount = dekompressor._expandRunsGeneric(257, 3, compressedData, 5, expandedData, 4)
+
+    def test_expandRunsGeneric_exact_fit(self):
+        """
+        Purpose: Pass in data that expands to exactly the size of the outgoing array, ending in a normal symbol and in
+                 an extended symbol
+        Expectation: All the symbols should be expanded without an exception
+        """
+
+        for useNumpy in [False, utils.isNumpyAvailable()]:
+            dekompressor = Dekompressor(256, 10, useNumpy_=useNumpy)
+
+            expandedData = array('i', [0]*5)
+            expandedCount = dekompressor._expandRunsGeneric(257, 3, array('i', [1, 257, 2, 0, 4]), 5, expandedData, 5)
+
+            self.assertEqual(5, expandedCount)
+            self.assertEqual([1, 1, 2, 0, 4], list(expandedData))
+
+            expandedData = array('i', [0]*5)
+            expandedCount = dekompressor._expandRunsGeneric(257, 3, array('i', [1, 2, 259]), 3, expandedData, 5)
+
+            self.assertEqual(5, expandedCount)
+            self.assertEqual([1, 2, 2, 2, 2], list(expandedData))
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_expandRunsGeneric_numpy_matches_python(self):
+        """
+        Purpose: Expand random run length replaced data using the NumPy and the pure Python implementations
+        Expectation: Both should produce the same symbols
+        """
+
+        randomGenerator = random.Random(6)
+        compressedData = array('i', [randomGenerator.randrange(256)])
+
+        while(len(compressedData) < 3000):
+            compressedData.append(randomGenerator.choice([randomGenerator.randrange(257), 257, 258, 266]))
+
+        numpyData = array('i', [0]*40000)
+        pythonData = array('i', [0]*40000)
+
+        numpyCount = Dekompressor(256, 10, useNumpy_=True)._expandRunsGeneric(257, 10, compressedData, len(compressedData), numpyData, 40000)
+        pythonCount = Dekompressor(256, 10, useNumpy_=False)._expandRunsGeneric(257, 10, compressedData, len(compressedData), pythonData, 40000)
+
+        self.assertEqual(pythonCount, numpyCount)
+        self.assertEqual(list(pythonData), list(numpyData))
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_expandRunsGeneric_numpy_exceptions(self):
+        """
+        Purpose: Pass invalid data to the NumPy and the pure Python implementations
+        Expectation: Both should throw the same exception for the first invalid symbol
+        """
+
+        invalidData = [([300, 1, 2], 20),
+                       ([1, 2, 268, 258, 1000], 20),
+                       ([1, 2, 258, 266, 3], 12),
+                       ([1, 2, 258, 3, 4, 5, 6], 6),
+                       ([1, 257, 1000, 266], 5)]
+
+        for (compressedData, expandedDataMaxSize) in invalidData:
+            exceptionMessages = []
+
+            for useNumpy in [True, False]:
+                dekompressor = Dekompressor(256, 10, useNumpy_=useNumpy)
+
+                with self.assertRaises(Exception) as context:
+                    dekompressor._expandRunsGeneric(257, 10, array('i', compressedData), len(compressedData), array('i', [0]*32), expandedDataMaxSize)
+
+                exceptionMessages.append(str(context.exception))
+
+            self.assertEqual(exceptionMessages[1], exceptionMessages[0])
+
+    def test_expandRunsBijective_small_set(self):
+        """
+        Purpose: Expand runs written in bijective base 2 (RUNA = 257 is 1, RUNB = 258 is 2)
+        Expectation: Each symbol should be repeated once plus the duplicate count written by the digits that follow it
+        """
+
+        for useNumpy in [False, utils.isNumpyAvailable()]:
+            dekompressor = Dekompressor(256, 10, useNumpy_=useNumpy, runLengthMode_=Dekompressor.RUN_LENGTH_BIJECTIVE)
+
+            compressedData = array('i', [1, 2, 257, 3, 258, 4, 257, 257, 5, 258, 257, 6])
+            expandedData = array('i', [0]*16)
+
+            expandedDataLen = dekompressor._expandRunsBijective(257, compressedData, len(compressedData), expandedData, 16)
+
+            self.assertEqual(16, expandedDataLen)
+            self.assertEqual([1, 2, 2, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 5, 6], list(expandedData))
+
+    def test_expandRunsBijective_invalid_data(self):
+        """
+        Purpose: Pass in data with an invalid first symbol, a symbol out of range and runs that do not fit
+        Expectation: An exception should be thrown
+        """
+
+        invalidData = [([257, 1, 2], 20, 'Invalid first symbol'),
+                       ([1, 2, 259, 3], 20, 'Symbol [259] out of range'),
+                       ([1, 2, 258, 3], 4, 'Not enough space in expansion array'),
+                       ([1] + [258]*70, 20, 'Not enough space in expansion array')]
+
+        for useNumpy in [False, utils.isNumpyAvailable()]:
+            dekompressor = Dekompressor(256, 10, useNumpy_=useNumpy, runLengthMode_=Dekompressor.RUN_LENGTH_BIJECTIVE)
+
+            for (compressedData, expandedDataMaxSize, message) in invalidData:
+                with self.assertRaises(Exception) as context:
+                    dekompressor._expandRunsBijective(257, array('i', compressedData), len(compressedData), array('i', [0]*32), expandedDataMaxSize)
+
+                self.assertEqual(message, str(context.exception))
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_expandRunsBijective_numpy_matches_python(self):
+        """
+        Purpose: Expand random bijective run length data using the NumPy and the pure Python implementations
+        Expectation: Both should produce the same symbols
+        """
+
+        randomGenerator = random.Random(14)
+        compressedData = array('i', [randomGenerator.randrange(256)])
+
+        while(len(compressedData) < 3000):
+            compressedData.append(randomGenerator.choice([randomGenerator.randrange(257), randomGenerator.randrange(257), 257, 258]))
+
+        numpyData = array('i', [0]*100000)
+        pythonData = array('i', [0]*100000)
+
+        numpyCount = Dekompressor(256, 10, useNumpy_=True)._expandRunsBijective(257, compressedData, len(compressedData), numpyData, 100000)
+        pythonCount = Dekompressor(256, 10, useNumpy_=False)._expandRunsBijective(257, compressedData, len(compressedData), pythonData, 100000)
+
+        self.assertEqual(pythonCount, numpyCount)
+        self.assertEqual(list(pythonData), list(numpyData))
+
+    def test_reverseMTFTransform(self):
+        """
+        Purpose: Reverse the move-to-front transform of a short sequence and pass in a rank outside the table
+        Expectation: The original symbols should be restored and an exception should be thrown for the invalid rank
+        """
+
+        dekompressor = Dekompressor(256, 10, moveToFront_=True)
+
+        self.assertEqual(True, dekompressor.mMoveToFront)
+
+        data = array('i', [1, 0, 1, 2, 0, 2, 9])
+        dekompressor._reverseMTFTransform(data, 6)
+
+        self.assertEqual([1, 1, 0, 2, 2, 1, 9], list(data))
+
+        with self.assertRaises(Exception):
+            dekompressor._reverseMTFTransform(array('i', [1, 256]), 2)
 
     def test_reverseBWTransform_invalidData(self):
         """
@@ -601,6 +751,49 @@ class KompressorTests(unittest.TestCase):
         for i in range(0, 34):
             self.assertEqual(preTransformData[i], restoredData[i])
 
+    def test_reverseBWTransform_reuse_buffers(self):
+        """
+        Purpose: Reverse several transforms of different sizes, including periodic data, with the same object using every available backend
+        Expectation: The reversed data should match the original data every time
+        """
+
+        sequences = [array('i', [7, 3, 3, 9, 0, 255, 3, 7, 7, 1]*30),
+                     array('i', [4, 2]),
+                     array('i', [3, 1, 2]*40),
+                     array('i', [5]*17),
+                     array('i', list(range(0, 256)) + list(range(255, -1, -1)))]
+
+        for useNumpy in ([False, True] if utils.isNumpyAvailable() else [False]):
+            kompressor = Kompressor(1024, 10, useNumpy_=useNumpy)
+            dekompressor = Dekompressor(1024, 10, useNumpy_=useNumpy)
+
+            self.assertEqual(useNumpy, dekompressor.mUseNumpy)
+
+            for sequence in sequences:
+                sequenceLen = len(sequence)
+                transformedData = array('i', [0]*(sequenceLen + 2))
+                restoredData = array('i', [0]*sequenceLen)
+
+                transformedLen = kompressor._performBWTransform(sequence, sequenceLen, transformedData, sequenceLen + 2)
+                restoredDataLen = dekompressor._reverseBWTransform(transformedData, transformedLen, restoredData, sequenceLen)
+
+                self.assertEqual(sequenceLen, restoredDataLen)
+                self.assertEqual(list(sequence), list(restoredData))
+
+    def test_reverseBWTransform_exceeds_section_size(self):
+        """
+        Purpose: Pass in more transformed data than the section size allows
+        Expectation: An exception should be thrown
+        """
+
+        dekompressor = Dekompressor(16, 10)
+
+        transformedData = array('i', [0]*20)
+        restoredData = array('i', [0]*20)
+
+        with self.assertRaises(Exception):
+            dekompressor._reverseBWTransform(transformedData, 20, restoredData, 20)
+
     def test_dekompressor_small_seq_allspecialsymbols(self):
         """
         Purpose: Kompressor and Dekompressor using a small data set and all special symbols
@@ -1037,6 +1230,179 @@ class KompressorTests(unittest.TestCase):
             self.assertEqual(inputData[i], uncompressedData[i])
 
 
+    def test_dekompressor_range_coder_multiblock(self):
+        """
+        Purpose: Kompressor and Dekompressor configured with the range coder compressing several sections
+        Expectation: After undergoing compression and decompression the end data should be the same as the original
+        """
+
+        kompressor = Kompressor(2048, 10, coder_=Kompressor.CODER_RANGE)
+        dekompressor = Dekompressor(2048, 10, coder_=Dekompressor.CODER_RANGE)
+
+        self.assertEqual(Kompressor.CODER_RANGE, kompressor.mCoder)
+        self.assertEqual(Dekompressor.CODER_RANGE, dekompressor.mCoder)
+
+        sections = [array('i', [0xfb, 0xbb, 0x71, 0xd5, 0x1c, 0x00, 0xa6, 0x0a, 0x00, 0x00, 0x00, 0x00]*100),
+                    array('i', list(range(0, 256))*7),
+                    array('i', [0x41]*2000)]
+
+        for section in sections:
+            sectionLen = len(section)
+            compressedData = bytearray(4096)
+            uncompressedData = bytearray(2048)
+
+            compressedDataLen = kompressor.kompress(section, sectionLen, compressedData, 4096)
+            uncompressedDataLen = dekompressor.dekompress(compressedData, compressedDataLen, uncompressedData, 2048)
+
+            self.assertEqual(sectionLen, uncompressedDataLen)
+            self.assertEqual(list(section), list(uncompressedData[0:uncompressedDataLen]))
+
+    def test_dekompressor_buffer_protocol(self):
+        """
+        Purpose: Compress bytes-like objects (bytes, bytearray, memoryview, mmap) and decompress into writable buffers
+        Expectation: The compressed data should match compressing an integer array and the data should be restored
+        """
+
+        data = bytes([0xfb, 0xbb, 0x71, 0xd5, 0x1c, 0x00, 0xa6, 0x0a, 0x00, 0x00, 0x00, 0x00]*100) + bytes(range(0, 256))
+
+        kompressor = Kompressor(2048, 10)
+        expectedData = bytearray(4096)
+        expectedDataLen = kompressor.kompress(array('i', list(data)), len(data), expectedData, 4096)
+
+        mappedData = mmap.mmap(-1, len(data))
+        mappedData.write(data)
+
+        for inputData in [data, bytearray(data), memoryview(b'..' + data)[2:], mappedData]:
+            kompressor.reset()
+            compressedData = bytearray(4096)
+            compressedDataLen = kompressor.kompress(inputData, len(data), compressedData, 4096)
+
+            self.assertEqual(expectedData[0:expectedDataLen], compressedData[0:compressedDataLen])
+
+        dekompressor = Dekompressor(2048, 10)
+        outputData = bytearray(len(data) + 10)
+        outputMap = mmap.mmap(-1, len(data))
+
+        for outputBuffer in [memoryview(outputData)[10:], outputMap]:
+            dekompressor.reset()
+            uncompressedDataLen = dekompressor.dekompress(bytes(expectedData[0:expectedDataLen]), expectedDataLen, outputBuffer, len(data))
+
+            self.assertEqual(len(data), uncompressedDataLen)
+
+        self.assertEqual(data, bytes(outputData[10:]))
+        self.assertEqual(data, outputMap[:])
+
+        mappedData.close()
+        outputMap.close()
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_dekompressor_buffer_protocol_numpy(self):
+        """
+        Purpose: Compress a NumPy uint8 array and decompress into a NumPy uint8 array
+        Expectation: The data should be restored
+        """
+
+        import numpy
+
+        data = numpy.frombuffer(bytes(range(0, 256))*4 + b'a'*500, dtype=numpy.uint8)
+
+        kompressor = Kompressor(2048, 10)
+        dekompressor = Dekompressor(2048, 10)
+        compressedData = bytearray(4096)
+        outputData = numpy.zeros(2048, dtype=numpy.uint8)
+
+        compressedDataLen = kompressor.kompress(data, len(data), compressedData, 4096)
+        uncompressedDataLen = dekompressor.dekompress(compressedData, compressedDataLen, outputData, 2048)
+
+        self.assertEqual(len(data), uncompressedDataLen)
+        self.assertTrue(numpy.array_equal(data, outputData[0:uncompressedDataLen]))
+
+    def test_dekompressor_bijective_run_length_multiblock(self):
+        """
+        Purpose: Kompressor and Dekompressor configured with the bijective run length mode compressing several sections
+                 with both coders
+        Expectation: After undergoing compression and decompression the end data should be the same as the original
+        """
+
+        sections = [array('i', [0xfb, 0xbb, 0x71, 0xd5, 0x1c, 0x00, 0xa6, 0x0a, 0x00, 0x00, 0x00, 0x00]*100),
+                    array('i', list(range(0, 256))*8),
+                    array('i', [0x41]*2048)]
+
+        for coder in [Kompressor.CODER_ARITHMETIC, Kompressor.CODER_RANGE]:
+            kompressor = Kompressor(2048, 10, coder_=coder, runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE)
+            dekompressor = Dekompressor(2048, 10, coder_=coder, runLengthMode_=Dekompressor.RUN_LENGTH_BIJECTIVE)
+
+            for section in sections:
+                sectionLen = len(section)
+                compressedData = bytearray(4096)
+                uncompressedData = bytearray(2048)
+
+                compressedDataLen = kompressor.kompress(array('i', section), sectionLen, compressedData, 4096, lastDataBlock=False)
+                uncompressedDataLen = dekompressor.dekompress(compressedData, compressedDataLen, uncompressedData, 2048)
+
+                self.assertEqual(sectionLen, uncompressedDataLen)
+                self.assertEqual(list(section), list(uncompressedData[0:uncompressedDataLen]))
+
+    def test_dekompressor_move_to_front_multiblock(self):
+        """
+        Purpose: Kompressor and Dekompressor configured with the move-to-front stage compressing several sections with
+                 both run length modes
+        Expectation: After undergoing compression and decompression the end data should be the same as the original
+        """
+
+        sections = [array('i', [0xfb, 0xbb, 0x71, 0xd5, 0x1c, 0x00, 0xa6, 0x0a, 0x00, 0x00, 0x00, 0x00]*100),
+                    array('i', list(range(0, 256))*7),
+                    array('i', [0x41]*2000)]
+
+        for runLengthMode in [Kompressor.RUN_LENGTH_GENERIC, Kompressor.RUN_LENGTH_BIJECTIVE]:
+            kompressor = Kompressor(2048, 10, runLengthMode_=runLengthMode, moveToFront_=True)
+            dekompressor = Dekompressor(2048, 10, runLengthMode_=runLengthMode, moveToFront_=True)
+
+            for section in sections:
+                sectionLen = len(section)
+                compressedData = bytearray(4096)
+                uncompressedData = bytearray(2048)
+
+                compressedDataLen = kompressor.kompress(array('i', section), sectionLen, compressedData, 4096, lastDataBlock=False)
+                uncompressedDataLen = dekompressor.dekompress(compressedData, compressedDataLen, uncompressedData, 2048)
+
+                self.assertEqual(sectionLen, uncompressedDataLen)
+                self.assertEqual(list(section), list(uncompressedData[0:uncompressedDataLen]))
+
+    def test_dekompressor_full_section_no_runs(self):
+        """
+        Purpose: Compress a full section of data that has no runs, so nothing is removed before encoding
+        Expectation: After undergoing compression and decompression the end data should be the same as the original
+        """
+
+        section = array('i', list(range(0, 256)))
+
+        for coder in [Kompressor.CODER_ARITHMETIC, Kompressor.CODER_RANGE]:
+            for useNumpy in [False, utils.isNumpyAvailable()]:
+                kompressor = Kompressor(256, 10, useNumpy_=useNumpy, coder_=coder)
+                dekompressor = Dekompressor(256, 10, useNumpy_=useNumpy, coder_=coder)
+
+                compressedData = bytearray(1024)
+                uncompressedData = bytearray(256)
+
+                compressedDataLen = kompressor.kompress(array('i', section), 256, compressedData, 1024)
+                uncompressedDataLen = dekompressor.dekompress(compressedData, compressedDataLen, uncompressedData, 256)
+
+                self.assertEqual(256, uncompressedDataLen)
+                self.assertEqual(list(section), list(uncompressedData))
+
+    def test_invalid_coder(self):
+        """
+        Purpose: Instantiate Kompressor and Dekompressor with an unknown coder
+        Expectation: An exception should be thrown
+        """
+
+        with self.assertRaises(Exception):
+            Kompressor(2048, 10, coder_=5)
+
+        with self.assertRaises(Exception):
+            Dekompressor(2048, 10, coder_=5)
+
     def test_dekompressor_largefile(self):
         """
         Purpose: Read in a hex file in ascii format line by line, convert to binary and compress and decompress
@@ -0,0 +1,84 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import random
+from FrequencyModel import FrequencyModel
+
+class TestFrequencyModel(unittest.TestCase):
+    def test_instantiate_invalid_vocabulary(self):
+        # Purpose: Instantiate the model with an empty vocabulary
+        # Expectation: An exception should be thrown
+
+        with self.assertRaises(Exception):
+            FrequencyModel(0)
+
+    def test_instantiate_valid(self):
+        # Purpose: Instantiate the model
+        # Expectation: Every symbol should have a count of 1
+
+        model = FrequencyModel(267)
+
+        self.assertEqual(267, model.mVocabularySize)
+        self.assertEqual(256, model.mSearchMask)
+
+        for i in range(0, 267):
+            self.assertEqual(1, model.mSymbolCount[i])
+            self.assertEqual(i + 1, model.getCumulativeCount(i))
+
+    def test_increment_and_cumulative_count(self):
+        # Purpose: Increment random symbols
+        # Expectation: The cumulative counts should match the sum of the individual counts
+
+        randomGenerator = random.Random(11)
+        model = FrequencyModel(300)
+        counts = [1]*300
+
+        for i in range(0, 2000):
+            symbol = randomGenerator.randrange(300)
+            model.increment(symbol)
+            counts[symbol] += 1
+
+        for i in range(0, 300):
+            self.assertEqual(counts[i], model.mSymbolCount[i])
+            self.assertEqual(sum(counts[0:i + 1]), model.getCumulativeCount(i))
+
+    def test_findSymbol(self):
+        # Purpose: Search for symbols using every possible cumulative count
+        # Expectation: The symbol whose cumulative count range holds the count should be returned with its cumulative count
+
+        model = FrequencyModel(5)
+
+        model.increment(1)
+        model.increment(1)
+        model.increment(4)
+
+        # Counts are [1, 3, 1, 1, 2]
+        expected = [[0, 1], [1, 4], [1, 4], [1, 4], [2, 5], [3, 6], [4, 8], [4, 8]]
+
+        for cumulativeCount in range(0, 8):
+            self.assertEqual(expected[cumulativeCount], model.findSymbol(cumulativeCount))
+
+        with self.assertRaises(Exception):
+            model.findSymbol(8)
+
+    def test_normalize_and_reset(self):
+        # Purpose: Normalize the counts and then reset the model
+        # Expectation: Counts should be halved (minimum of 1) and the tree rebuilt, reset should return all counts to 1
+
+        model = FrequencyModel(4)
+
+        for i in range(0, 9):
+            model.increment(2)
+
+        self.assertEqual(8, model.normalize())
+        self.assertEqual([1, 1, 5, 1], list(model.mSymbolCount))
+        self.assertEqual(8, model.getCumulativeCount(3))
+        self.assertEqual([2, 7], model.findSymbol(6))
+
+        model.reset()
+
+        self.assertEqual([1, 1, 1, 1], list(model.mSymbolCount))
+        self.assertEqual(4, model.getCumulativeCount(3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,476 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import io
+import random
+import struct
+
+import KompressedArchive
+from KompressedArchive import KompressedWriter, KompressedReader, compress_stream, decompress_stream
+from Kompressor import Kompressor
+from BlockCache import BlockCache
+import testUtils
+import utils
+
+class ShortReadFile(testUtils.NonSeekableFile):
+    """
+    Readable file object that never returns more than a few bytes per read
+    """
+
+    def __init__(self, data_, readSize_ = 100):
+        super().__init__(data_)
+
+        self.mReadSize = readSize_
+
+    def readinto(self, buffer_):
+        return self.mFile.readinto(memoryview(buffer_)[0:self.mReadSize])
+
+class NonBlockingFile(testUtils.NonSeekableFile):
+    """
+    Readable file object that reports no data available, as a non-blocking source does, once its data is used up
+    """
+
+    def readinto(self, buffer_):
+        readCount = self.mFile.readinto(buffer_)
+
+        if(readCount == 0):
+            return None
+
+        return readCount
+
+class KompressedArchiveTests(unittest.TestCase):
+    def test_header(self):
+        """
+        Purpose: Write an archive with non default parameters and read it back
+        Expectation: The reader should be configured from the parameters stored in the header
+        """
+
+        archiveFile = testUtils.createArchive(bytearray(b'abc'), 512, encoderWordSize_=20, coder_=Kompressor.CODER_RANGE,
+                                          runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE, moveToFront_=True)
+
+        self.assertEqual(KompressedArchive.ARCHIVE_MAGIC, archiveFile.getvalue()[0:4])
+
+        reader = KompressedReader(archiveFile)
+
+        self.assertEqual(512, reader.mSectionSize)
+        self.assertEqual(10, reader.mGenericMaxRun)
+        self.assertEqual(20, reader.mWordSize)
+        self.assertEqual(Kompressor.CODER_RANGE, reader.mCoder)
+        self.assertEqual(Kompressor.RUN_LENGTH_BIJECTIVE, reader.mRunLengthMode)
+        self.assertEqual(True, reader.mMoveToFront)
+        self.assertEqual(bytearray(b'abc'), reader.read())
+
+    def test_calculateMaxCompressedBlockLen(self):
+        """
+        Purpose: Calculate the max compressed block size for varying section and word sizes
+        Expectation: The size should match the buffers KompressedWriter and KompressedReader create from the coders
+        """
+
+        for [sectionSize, wordSize] in [[1, 16], [256, 13], [1000, 32], [1 << 16, 16]]:
+            archiveFile = testUtils.createArchive(b'', sectionSize, encoderWordSize_=wordSize)
+            maxCompressedDataLen = KompressedArchive.calculateMaxCompressedBlockLen(sectionSize, wordSize)
+
+            self.assertEqual(maxCompressedDataLen, KompressedReader(archiveFile).mMaxCompressedDataLen)
+            self.assertEqual(maxCompressedDataLen, utils.calculateMaxCompressedBytes(Kompressor(sectionSize, 10).mSectionTransformDataMaxSize + 1, wordSize))
+
+    def test_round_trip_multiple_blocks(self):
+        """
+        Purpose: Write data that spans several full sections and a partial section in several writes, with both coders
+        Expectation: The data read back should match, every full section should be one block
+        """
+
+        data = testUtils.createTestData(5000, 1)
+
+        for coder in [Kompressor.CODER_ARITHMETIC, Kompressor.CODER_RANGE]:
+            archiveFile = io.BytesIO()
+
+            with KompressedWriter(archiveFile, 1024, 10, coder_=coder) as writer:
+                for i in range(0, len(data), 700):
+                    writer.write(data[i:i + 700])
+
+            archiveFile.seek(0)
+            reader = KompressedReader(archiveFile)
+
+            self.assertEqual(5, reader.getBlockCount())
+            self.assertEqual(5000, reader.getUncompressedSize())
+            self.assertEqual(data, reader.read())
+
+    def test_round_trip_incompressible_full_sections(self):
+        """
+        Purpose: Write random data so that every block is a full section without any runs
+        Expectation: The data read back should match
+        """
+
+        randomGenerator = random.Random(2)
+        data = bytearray([randomGenerator.randrange(256) for i in range(0, 1024)])
+
+        for coder in [Kompressor.CODER_ARITHMETIC, Kompressor.CODER_RANGE]:
+            archiveFile = testUtils.createArchive(data, 256, coder_=coder)
+
+            self.assertEqual(data, KompressedReader(archiveFile).read())
+
+    def test_empty_archive(self):
+        """
+        Purpose: Close an archive without writing any data
+        Expectation: The archive should have no blocks and read back as empty
+        """
+
+        archiveFile = testUtils.createArchive(bytearray(), 256)
+        reader = KompressedReader(archiveFile)
+
+        self.assertEqual(0, reader.getBlockCount())
+        self.assertEqual(0, reader.getUncompressedSize())
+        self.assertEqual(bytearray(), reader.read())
+
+    def test_flush_creates_block(self):
+        """
+        Purpose: Flush the writer before a section is full
+        Expectation: The pending data should be written as a shorter block
+        """
+
+        archiveFile = io.BytesIO()
+
+        with KompressedWriter(archiveFile, 256, 10) as writer:
+            writer.write(b'first')
+            writer.flush()
+            writer.write(b'second')
+
+        archiveFile.seek(0)
+        reader = KompressedReader(archiveFile)
+
+        self.assertEqual(2, reader.getBlockCount())
+        self.assertEqual(bytearray(b'first'), reader.readBlock(0))
+        self.assertEqual(bytearray(b'second'), reader.readBlock(1))
+
+    def test_read_block_random_access(self):
+        """
+        Purpose: Read the blocks in reverse order through the block index
+        Expectation: Every block should match the matching section of the original data
+        """
+
+        data = testUtils.createTestData(3000, 3)
+        reader = KompressedReader(testUtils.createArchive(data, 512))
+
+        for blockIndex in range(reader.getBlockCount() - 1, -1, -1):
+            self.assertEqual(data[blockIndex*512:(blockIndex + 1)*512], reader.readBlock(blockIndex))
+
+        with self.assertRaises(Exception):
+            reader.readBlock(reader.getBlockCount())
+
+    def test_read_blocks_not_seekable(self):
+        """
+        Purpose: Stream the blocks from a file that can not seek
+        Expectation: The blocks should be read in order without using the block index
+        """
+
+        data = testUtils.createTestData(3000, 4)
+        archiveData = testUtils.createArchive(data, 512).getvalue()
+
+        reader = KompressedReader(io.BufferedReader(testUtils.NonSeekableFile(archiveData)))
+
+        self.assertEqual(data, reader.read())
+
+    def test_archive_not_at_start_of_file(self):
+        """
+        Purpose: Write an archive after other data in the file
+        Expectation: The archive should be read back when the reader starts at the archive position
+        """
+
+        data = testUtils.createTestData(2000, 5)
+        archiveFile = io.BytesIO()
+        archiveFile.write(b'prefix')
+
+        with KompressedWriter(archiveFile, 512, 10) as writer:
+            writer.write(data)
+
+        archiveFile.seek(6)
+        reader = KompressedReader(archiveFile)
+
+        self.assertEqual(data[1024:1536], reader.readBlock(2))
+        self.assertEqual(data, reader.read())
+
+    def test_read_at(self):
+        """
+        Purpose: Read ranges that start and end inside blocks, span several blocks and go past the end of the data
+        Expectation: The same bytes as slicing the original data should be returned
+        """
+
+        data = testUtils.createTestData(3000, 9)
+        reader = KompressedReader(testUtils.createArchive(data, 512))
+
+        for (offset, length) in [(0, 10), (100, 412), (511, 2), (512, 512), (500, 1500), (0, 3000), (2990, 100), (3000, 5), (4000, 1), (7, 0)]:
+            self.assertEqual(bytes(data[offset:offset + length]), reader.read_at(offset, length))
+
+        with self.assertRaises(Exception):
+            reader.read_at(-1, 10)
+
+    def test_read_at_uneven_blocks(self):
+        """
+        Purpose: Read ranges from an archive where the writer was flushed so the blocks have different sizes
+        Expectation: The binary search should find the covering block for every offset
+        """
+
+        data = testUtils.createTestData(2000, 10)
+        archiveFile = io.BytesIO()
+
+        # Blocks of 3, 512, 85, 1, 512, 287, 512 and 88 bytes
+        with KompressedWriter(archiveFile, 512, 10) as writer:
+            for (writeStart, writeEnd) in [(0, 3), (3, 600), (600, 601), (601, 1400), (1400, 2000)]:
+                writer.write(data[writeStart:writeEnd])
+                writer.flush()
+
+        archiveFile.seek(0)
+        reader = KompressedReader(archiveFile)
+
+        self.assertEqual(8, reader.getBlockCount())
+
+        for offset in range(0, 2000, 37):
+            self.assertEqual(bytes(data[offset:offset + 50]), reader.read_at(offset, 50))
+
+    def test_read_at_block_cache(self):
+        """
+        Purpose: Read ranges through a block cache that only holds two blocks, then share the cache with a second reader
+        Expectation: Repeated reads of the same blocks should be served from the cache and the data should match.
+                     Readers using the same archive key should share cached blocks
+        """
+
+        data = testUtils.createTestData(3000, 11)
+        archiveData = testUtils.createArchive(data, 512).getvalue()
+        blockCache = BlockCache(1024)
+
+        reader = KompressedReader(io.BytesIO(archiveData), blockCache_=blockCache, archiveKey_='archive')
+
+        self.assertEqual(bytes(data[10:20]), reader.read_at(10, 10))
+        self.assertEqual(bytes(data[600:700]), reader.read_at(600, 100))
+        self.assertEqual(bytes(data[0:1024]), reader.read_at(0, 1024))
+        self.assertEqual([2, 2, 0], blockCache.getStatistics())
+
+        # Block 2 evicts block 0
+        self.assertEqual(bytes(data[1100:1200]), reader.read_at(1100, 100))
+        self.assertEqual(bytes(data[100:200]), reader.read_at(100, 100))
+        self.assertEqual([2, 4, 2], blockCache.getStatistics())
+
+        # Cached blocks are immutable bytes
+        self.assertEqual(bytes, type(reader.readBlock(0)))
+
+        sharedReader = KompressedReader(io.BytesIO(archiveData), blockCache_=blockCache, archiveKey_='archive')
+
+        self.assertEqual(bytes(data[1300:1400]), sharedReader.read_at(1300, 100))
+        self.assertEqual([4, 4, 2], blockCache.getStatistics())
+
+        # Readers without a key never share blocks
+        otherReader = KompressedReader(io.BytesIO(archiveData), blockCache_=blockCache)
+
+        self.assertEqual(bytes(data[1300:1400]), otherReader.read_at(1300, 100))
+        self.assertEqual([4, 5, 3], blockCache.getStatistics())
+
+    def test_readBlockInto(self):
+        """
+        Purpose: Read the blocks of an archive that can not seek in order into a caller buffer, passed as a bytearray and
+                 as a memoryview
+        Expectation: Every block should match the original data and 0 should be returned at the end of the archive
+        """
+
+        data = testUtils.createTestData(2500, 14)
+        reader = KompressedReader(testUtils.NonSeekableFile(testUtils.createArchive(data, 1024).getvalue()))
+        blockData = bytearray(1024)
+
+        self.assertEqual(1024, reader.readBlockInto(blockData))
+        self.assertEqual(data[0:1024], blockData)
+
+        self.assertEqual(1024, reader.readBlockInto(memoryview(blockData)))
+        self.assertEqual(data[1024:2048], blockData)
+
+        self.assertEqual(452, reader.readBlockInto(blockData))
+        self.assertEqual(data[2048:2500], blockData[0:452])
+
+        self.assertEqual(0, reader.readBlockInto(blockData))
+
+        # A buffer smaller than the block can not hold it
+        with self.assertRaises(Exception):
+            KompressedReader(testUtils.createArchive(data, 1024)).readBlockInto(bytearray(100))
+
+    def test_readBlockInto_block_index(self):
+        """
+        Purpose: Read blocks through the block index into a caller buffer and as views, with and without a block cache
+        Expectation: The blocks should match the original data, with a block cache they should be added to the cache
+        """
+
+        data = testUtils.createTestData(2500, 17)
+        archiveData = testUtils.createArchive(data, 1024).getvalue()
+        blockCache = BlockCache(4096)
+
+        for reader in [KompressedReader(io.BytesIO(archiveData)), KompressedReader(io.BytesIO(archiveData), blockCache_=blockCache)]:
+            blockData = bytearray(1024)
+
+            self.assertEqual(452, reader.readBlockInto(blockData, 2))
+            self.assertEqual(data[2048:2500], blockData[0:452])
+
+            self.assertEqual(1024, reader.readBlockInto(memoryview(blockData), 0))
+            self.assertEqual(data[0:1024], blockData)
+
+            blockView = reader.readBlockView(1)
+            self.assertTrue(blockView.readonly)
+            self.assertEqual(data[1024:2048], blockView)
+
+            with self.assertRaises(Exception):
+                reader.readBlockInto(blockData, 3)
+
+        self.assertEqual([0, 3, 0], blockCache.getStatistics())
+
+    def test_compress_stream(self):
+        """
+        Purpose: Compress a stream that spans several sections and decompress it again, with and without NumPy
+        Expectation: The sizes returned should match the data and the archive, and the data should match the original
+        """
+
+        data = testUtils.createTestData(5000, 12)
+
+        for useNumpy in [False, None]:
+            archiveFile = io.BytesIO()
+
+            [uncompressedSize, archiveSize] = compress_stream(io.BytesIO(data), archiveFile, 1024, useNumpy_=useNumpy)
+
+            self.assertEqual(5000, uncompressedSize)
+            self.assertEqual(len(archiveFile.getvalue()), archiveSize)
+
+            archiveFile.seek(0)
+            outputFile = io.BytesIO()
+
+            self.assertEqual(5000, decompress_stream(archiveFile, outputFile, useNumpy_=useNumpy))
+            self.assertEqual(data, outputFile.getvalue())
+
+            archiveFile.seek(0)
+            self.assertEqual(5, KompressedReader(archiveFile).getBlockCount())
+
+    def test_compress_stream_short_reads(self):
+        """
+        Purpose: Compress and decompress streams that can not seek and return fewer bytes than requested
+        Expectation: Full sections should still be compressed as single blocks and the data should match the original
+        """
+
+        data = testUtils.createTestData(3000, 13)
+        archiveFile = io.BytesIO()
+
+        compress_stream(ShortReadFile(data), archiveFile, 512, coder_=Kompressor.CODER_RANGE, runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE)
+
+        archiveFile.seek(0)
+        self.assertEqual(6, KompressedReader(archiveFile).getBlockCount())
+
+        outputFile = io.BytesIO()
+        decompress_stream(ShortReadFile(archiveFile.getvalue()), outputFile)
+
+        self.assertEqual(data, outputFile.getvalue())
+
+    def test_read_short_reads(self):
+        """
+        Purpose: Read an archive from a stream that can not seek and returns fewer bytes than the header and frame headers
+        Expectation: The short reads should be continued and the data should match the original
+        """
+
+        data = testUtils.createTestData(3000, 16)
+        archiveData = testUtils.createArchive(data, 512).getvalue()
+
+        self.assertEqual(data, KompressedReader(ShortReadFile(archiveData, 3)).read())
+
+        outputFile = io.BytesIO()
+        decompress_stream(ShortReadFile(archiveData, 1), outputFile)
+
+        self.assertEqual(data, outputFile.getvalue())
+
+        with self.assertRaises(Exception):
+            KompressedReader(ShortReadFile(archiveData[0:10], 3))
+
+    def test_compress_stream_empty(self):
+        """
+        Purpose: Compress an empty stream
+        Expectation: An empty archive should be written and decompress to nothing
+        """
+
+        archiveFile = io.BytesIO()
+
+        self.assertEqual(0, compress_stream(io.BytesIO(), archiveFile)[0])
+
+        archiveFile.seek(0)
+        outputFile = io.BytesIO()
+
+        self.assertEqual(0, decompress_stream(archiveFile, outputFile))
+        self.assertEqual(b'', outputFile.getvalue())
+
+    def test_compress_stream_no_data_available(self):
+        """
+        Purpose: Compress a non-blocking stream that has no data available before it ends
+        Expectation: An exception should be thrown instead of writing a truncated archive
+        """
+
+        archiveFile = io.BytesIO()
+
+        with self.assertRaises(Exception):
+            compress_stream(NonBlockingFile(testUtils.createTestData(3000, 15)), archiveFile, 1024)
+
+        self.assertNotEqual(KompressedArchive.TRAILER_MAGIC, archiveFile.getvalue()[-4:])
+
+    def test_invalid_archive(self):
+        """
+        Purpose: Read data that is not an archive, an archive with an unknown version and a truncated archive
+        Expectation: An exception should be thrown
+        """
+
+        archiveData = testUtils.createArchive(testUtils.createTestData(1000, 6), 512).getvalue()
+
+        with self.assertRaises(Exception):
+            KompressedReader(io.BytesIO(b'not an archive at all'))
+
+        with self.assertRaises(Exception):
+            KompressedReader(io.BytesIO(archiveData[0:4] + bytes([99]) + archiveData[5:]))
+
+        with self.assertRaises(Exception):
+            KompressedReader(io.BytesIO(archiveData[0:-4])).getBlockCount()
+
+    def test_checksum_mismatch(self):
+        """
+        Purpose: Change the checksum stored in the first frame
+        Expectation: An exception should be thrown when the block is read
+        """
+
+        archiveData = bytearray(testUtils.createArchive(testUtils.createTestData(1000, 7), 512).getvalue())
+        checksumOffset = KompressedArchive.HEADER_SIZE + 8
+
+        archiveData[checksumOffset] ^= 0xFF
+
+        reader = KompressedReader(io.BytesIO(archiveData))
+
+        with self.assertRaises(Exception):
+            reader.readBlock(0)
+
+        self.assertEqual(1000 - 512, len(reader.readBlock(1)))
+
+    def test_write_after_close(self):
+        """
+        Purpose: Write to an archive after it has been closed
+        Expectation: An exception should be thrown
+        """
+
+        writer = KompressedWriter(io.BytesIO(), 256, 10)
+        writer.close()
+
+        with self.assertRaises(Exception):
+            writer.write(b'data')
+
+    def test_trailer(self):
+        """
+        Purpose: Parse the trailer of an archive directly
+        Expectation: The trailer should point to the block index and hold the uncompressed size and block count
+        """
+
+        archiveData = testUtils.createArchive(testUtils.createTestData(1500, 8), 512).getvalue()
+
+        [indexOffset, uncompressedSize, blockCount, magic] = struct.unpack(KompressedArchive.TRAILER_FORMAT, archiveData[-KompressedArchive.TRAILER_SIZE:])
+
+        self.assertEqual(KompressedArchive.TRAILER_MAGIC, magic)
+        self.assertEqual(1500, uncompressedSize)
+        self.assertEqual(3, blockCount)
+        self.assertEqual(len(archiveData) - KompressedArchive.TRAILER_SIZE - (3*KompressedArchive.INDEX_ENTRY_SIZE), indexOffset)
+
+if __name__ == '__main__':
+    unittest.main()
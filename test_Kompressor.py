@@ -1,9 +1,12 @@
 __author__ = 'Marko Milutinovic'
 
 import unittest
+import random
 from array import array
 
 from Kompressor import Kompressor
+from Kompressor import SortKey
+import utils
 from SimpleEncoder import SimpleEncoder
 
 class KompressorTests(unittest.TestCase):
@@ -21,12 +24,33 @@ class KompressorTests(unittest.TestCase):
         self.assertEqual(257+10, kompressor.mVocabularySize)
         self.assertEqual(1, kompressor.mBWTransformStoreBytes)
         self.assertNotEqual(None, kompressor.mSectionTransformData)
-        self.assertEqual(257, len(kompressor.mSectionTransformData))
+        self.assertEqual(258, len(kompressor.mSectionTransformData))
         self.assertEqual(257, kompressor.mSectionTransformDataMaxSize)
         self.assertNotEqual(None, kompressor.mEncoder)
         self.assertEqual(False, kompressor.mContinuousModeEnabled)
         self.assertEqual(0, kompressor.mContinuousModeTotalData)
         self.assertEqual(0, kompressor.mContinuousModeDataCompressed)
+        self.assertEqual(utils.isNumpyAvailable(), kompressor.mUseNumpy)
+
+    def test_constructor_numpy_disabled(self):
+        """
+        Purpose: Instantiate an object with NumPy explicitly disabled
+        Expectation: The suffix array BW transform should be selected
+        """
+
+        kompressor = Kompressor(256, 10, useNumpy_=False)
+
+        self.assertEqual(False, kompressor.mUseNumpy)
+
+    @unittest.skipIf(utils.isNumpyAvailable(), 'NumPy is available')
+    def test_constructor_numpy_unavailable(self):
+        """
+        Purpose: Request the NumPy backend when NumPy is not installed
+        Expectation: An exception should be thrown
+        """
+
+        with self.assertRaises(Exception):
+            Kompressor(256, 10, useNumpy_=True)
 
     def test_replaceRunsGeneric_no_data(self):
         """
@@ -256,6 +280,125 @@ class KompressorTests(unittest.TestCase):
         self.assertEqual(2, data[2])
         self.assertEqual(3, data[3])
 
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_replaceRunsGeneric_numpy_matches_python(self):
+        """
+        Purpose: Replace runs in random data with long runs using the NumPy and the pure Python implementations
+        Expectation: Both should produce the same symbols for every max run length
+        """
+
+        randomGenerator = random.Random(4)
+        data = []
+
+        while(len(data) < 5000):
+            data.extend([randomGenerator.randrange(4)]*randomGenerator.choice([1, 1, 2, 3, 7, 40]))
+
+        for maxRunLength in [2, 3, 6, 255]:
+            numpyData = array('i', data)
+            pythonData = array('i', data)
+
+            numpyLength = Kompressor(256, 10, useNumpy_=True)._replaceRunsGeneric(259, maxRunLength, numpyData, len(data))
+            pythonLength = Kompressor(256, 10, useNumpy_=False)._replaceRunsGeneric(259, maxRunLength, pythonData, len(data))
+
+            self.assertEqual(pythonLength, numpyLength)
+            self.assertEqual(list(pythonData), list(numpyData))
+
+    def test_constructor_bijective_run_length(self):
+        """
+        Purpose: Instantiate an object using the bijective run length mode
+        Expectation: The vocabulary should only be extended by the RUNA and RUNB symbols
+        """
+
+        kompressor = Kompressor(256, 10, runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE)
+
+        self.assertEqual(Kompressor.RUN_LENGTH_BIJECTIVE, kompressor.mRunLengthMode)
+        self.assertEqual(257, kompressor.mRunSymbolA)
+        self.assertEqual(257+2, kompressor.mVocabularySize)
+
+        with self.assertRaises(Exception):
+            Kompressor(256, 10, runLengthMode_=5)
+
+    def test_replaceRunsBijective_no_data(self):
+        """
+        Purpose: Pass in an empty array
+        Expectation: The length returned should be 0
+        """
+
+        kompressor = Kompressor(256, 10, runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE)
+
+        self.assertEqual(0, kompressor._replaceRunsBijective(257, array('i', [1, 2]), 0))
+
+    def test_replaceRunsBijective_runs(self):
+        """
+        Purpose: Pass in array with runs of 1 to 5 symbols and a long run
+        Expectation: Each run should be replaced by its first symbol followed by the bijective base 2 digits of the
+                     duplicate count, least significant first (RUNA = 257 is 1, RUNB = 258 is 2)
+        """
+
+        for useNumpy in [False, utils.isNumpyAvailable()]:
+            kompressor = Kompressor(256, 10, useNumpy_=useNumpy, runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE)
+
+            data = array('i', [1, 2, 2, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 5] + [6]*1001)
+
+            newLength = kompressor._replaceRunsBijective(257, data, len(data))
+
+            # 1000 duplicates = 2 + 2*1 + 4*1 + 8*2 + 16*1 + 32*2 + 64*2 + 128*2 + 256*2
+            self.assertEqual(21, newLength)
+            self.assertEqual([1, 2, 257, 3, 258, 4, 257, 257, 5, 258, 257, 6, 258, 257, 257, 258, 257, 258, 258, 258, 258], list(data[0:newLength]))
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_replaceRunsBijective_numpy_matches_python(self):
+        """
+        Purpose: Replace runs in random data with long runs using the NumPy and the pure Python implementations
+        Expectation: Both should produce the same symbols
+        """
+
+        randomGenerator = random.Random(13)
+        data = []
+
+        while(len(data) < 5000):
+            data.extend([randomGenerator.randrange(4)]*randomGenerator.choice([1, 1, 2, 3, 7, 40, 700]))
+
+        numpyData = array('i', data)
+        pythonData = array('i', data)
+
+        numpyLength = Kompressor(256, 10, useNumpy_=True)._replaceRunsBijective(257, numpyData, len(data))
+        pythonLength = Kompressor(256, 10, useNumpy_=False)._replaceRunsBijective(257, pythonData, len(data))
+
+        self.assertEqual(pythonLength, numpyLength)
+        self.assertEqual(list(pythonData), list(numpyData))
+
+    def test_performMTFTransform(self):
+        """
+        Purpose: Perform the move-to-front transform on a short sequence and on random data
+        Expectation: Every symbol should be replaced by its rank in the table of symbols ordered by how recently they
+                     were seen
+        """
+
+        kompressor = Kompressor(256, 10, moveToFront_=True)
+
+        self.assertEqual(True, kompressor.mMoveToFront)
+
+        data = array('i', [1, 1, 0, 2, 2, 1])
+        kompressor._performMTFTransform(data, 6)
+
+        self.assertEqual([1, 0, 1, 2, 0, 2], list(data))
+
+        # Compare against a straightforward list based move-to-front
+        randomGenerator = random.Random(15)
+        data = array('i', [randomGenerator.choice([0, 7, 7, 7, 100, 255, randomGenerator.randrange(256)]) for i in range(0, 3000)])
+        symbolOrder = list(range(0, 256))
+        expectedRanks = []
+
+        for symbol in data:
+            rank = symbolOrder.index(symbol)
+            expectedRanks.append(rank)
+            symbolOrder.insert(0, symbolOrder.pop(rank))
+
+        kompressor._performMTFTransform(data, len(data))
+
+        self.assertEqual(expectedRanks, list(data))
+
     def test_bytearrayLessThan_same(self):
         # Purpose: Compare the same permutation of bytearray
         # Expectation: 0 should be returned
@@ -550,6 +693,47 @@ class KompressorTests(unittest.TestCase):
 
         test_kompressor._performBWTransform(data, 156, transformedData, 157)
 
+    def test_performBWTransform_large_section(self):
+        # Purpose: Run transform on a large data section containing long runs and repeated blocks with every available backend
+        # Expectation: The transform should match the one produced by sorting the rotations with SortKey
+
+        data = array('i', ([0x00]*300 + list(range(0, 256)) + [0x41, 0x42, 0x43]*200)*2)
+        dataSize = len(data)
+
+        sortedRotations = [key[0] for key in sorted([[i, data, dataSize] for i in range(0, dataSize)], key=SortKey)]
+        originalSequenceIndex = sortedRotations.index(0)
+
+        for useNumpy in ([False, True] if utils.isNumpyAvailable() else [False]):
+            test_kompressor = Kompressor(4096, 10, useNumpy_=useNumpy)
+
+            transformedData = array('i', [0]*(dataSize + 2))
+
+            outputLen = test_kompressor._performBWTransform(data, dataSize, transformedData, dataSize + 2)
+
+            self.assertEqual(dataSize + 2, outputLen)
+            self.assertEqual(originalSequenceIndex & 0xFF, transformedData[0])
+            self.assertEqual((originalSequenceIndex >> 8) & 0xFF, transformedData[1])
+
+            for i in range(0, dataSize):
+                self.assertEqual(data[(sortedRotations[i] - 1)%dataSize], transformedData[i + 2])
+
+    def test_performBWTransform_periodic_data(self):
+        # Purpose: Run transform on data made up of a repeated sequence so that several rotations are identical
+        # Expectation: The original sequence index should point to the first of the identical rotations
+
+        data = array('i', [3, 1, 2]*4)
+
+        for useNumpy in ([False, True] if utils.isNumpyAvailable() else [False]):
+            test_kompressor = Kompressor(256, 10, useNumpy_=useNumpy)
+
+            transformedData = array('i', [0]*13)
+
+            outputLen = test_kompressor._performBWTransform(data, 12, transformedData, 13)
+
+            self.assertEqual(13, outputLen)
+            self.assertEqual(8, transformedData[0])
+            self.assertEqual([3, 3, 3, 3, 1, 1, 1, 1, 2, 2, 2, 2], list(transformedData[1:13]))
+
     def test_kompress_small_data_set(self):
         # Purpose: Compress a small data set with special symbols 1 and 2
         # Expectation: The encoded data should match what is expected
@@ -0,0 +1,343 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import io
+import os
+import random
+import tempfile
+
+import KompressorFile
+from KompressorFile import KompressorFile as KFile
+from KompressedArchive import KompressedReader
+from Kompressor import Kompressor
+from BlockCache import BlockCache
+import testUtils
+
+class KompressorFileTests(unittest.TestCase):
+    def test_write_read_round_trip(self):
+        """
+        Purpose: Write data in uneven pieces and read it back in uneven pieces
+        Expectation: The data read should match the data written and the archive should be readable by KompressedReader
+        """
+
+        data = testUtils.createTestData(20000, 1)
+        archiveFile = io.BytesIO()
+
+        with KFile(None, 'wb', archiveFile, 1024, 10) as testFile:
+            position = 0
+
+            for size in [1, 500, 3000, 7, 10000]:
+                self.assertEqual(size, testFile.write(data[position:position + size]))
+                position += size
+                self.assertEqual(position, testFile.tell())
+
+            testFile.write(data[position:])
+
+        self.assertFalse(archiveFile.closed)
+
+        archiveFile.seek(0)
+        self.assertEqual(data, bytes(KompressedReader(archiveFile).read()))
+
+        archiveFile.seek(0)
+
+        with KFile(None, 'rb', archiveFile) as testFile:
+            self.assertTrue(testFile.readable())
+            self.assertFalse(testFile.writable())
+            self.assertTrue(testFile.seekable())
+
+            readData = testFile.read(1) + testFile.read(2000) + testFile.read(0) + testFile.read()
+
+            self.assertEqual(data, readData)
+            self.assertEqual(b'', testFile.read())
+            self.assertEqual(len(data), testFile.tell())
+
+    def test_readinto(self):
+        """
+        Purpose: Read into caller buffers that span several blocks and into a buffer of a different item size
+        Expectation: The buffers should be filled with the data and the count should stop at the end of the data
+        """
+
+        data = testUtils.createTestData(5000, 2)
+        testFile = KFile(None, 'rb', testUtils.createArchive(data, 512))
+
+        buffer = bytearray(1500)
+        self.assertEqual(1500, testFile.readinto(buffer))
+        self.assertEqual(data[0:1500], buffer)
+
+        wordBuffer = memoryview(bytearray(400)).cast('I')
+        self.assertEqual(400, testFile.readinto(wordBuffer))
+        self.assertEqual(data[1500:1900], wordBuffer.tobytes())
+
+        buffer = bytearray(10000)
+        self.assertEqual(3100, testFile.readinto(buffer))
+        self.assertEqual(data[1900:], buffer[0:3100])
+        self.assertEqual(0, testFile.readinto(buffer))
+
+        testFile.close()
+
+    def test_readinto_full_blocks(self):
+        """
+        Purpose: Read into buffers that hold several sections, from seekable files with and without a block cache and
+                 from a file that can not seek
+        Expectation: Blocks that start at the position should be decompressed straight into the buffer without
+                     becoming the current block, and the data should match
+        """
+
+        data = testUtils.createTestData(5000, 8)
+        archiveData = testUtils.createArchive(data, 512).getvalue()
+
+        for [archiveFile, blockCache] in [[io.BytesIO(archiveData), None], [io.BytesIO(archiveData), BlockCache(4096)],
+                                          [testUtils.NonSeekableFile(archiveData), None]]:
+            testFile = KFile(None, 'rb', archiveFile, blockCache_=blockCache)
+
+            buffer = bytearray(1024)
+            self.assertEqual(1024, testFile.readinto(buffer))
+            self.assertEqual(data[0:1024], buffer)
+            self.assertEqual(0, len(testFile.mBlockView))
+
+            # A buffer smaller than a section is filled from the current block
+            buffer = bytearray(100)
+            self.assertEqual(100, testFile.readinto(buffer))
+            self.assertEqual(data[1024:1124], buffer)
+            self.assertEqual(1024, testFile.mBlockStart)
+
+            buffer = bytearray(10000)
+            self.assertEqual(3876, testFile.readinto(buffer))
+            self.assertEqual(data[1124:], buffer[0:3876])
+            self.assertEqual(0, testFile.readinto(buffer))
+
+            testFile.close()
+
+    def test_readline(self):
+        """
+        Purpose: Read lines that span blocks, lines limited by size and iterate over the file
+        Expectation: The lines should match the lines of the original data
+        """
+
+        data = b''.join([(b'line %d ' % i)*(i % 50) + b'\n' for i in range(0, 300)]) + b'no newline'
+        testFile = KFile(None, 'rb', testUtils.createArchive(data, 256))
+
+        expectedLines = data.splitlines(True)
+
+        self.assertEqual(expectedLines[0], testFile.readline())
+        self.assertEqual(expectedLines[1][0:3], testFile.readline(3))
+        self.assertEqual(expectedLines[1][3:], testFile.readline())
+        self.assertEqual(expectedLines[2:], list(testFile))
+        self.assertEqual(b'', testFile.readline())
+
+        testFile.close()
+
+    def test_seek(self):
+        """
+        Purpose: Seek to random positions using every whence value and read from there
+        Expectation: The data read should match the data at the position, seeking past the end should read nothing
+        """
+
+        data = testUtils.createTestData(10000, 3)
+        blockCache = BlockCache(4096)
+        testFile = KFile(None, 'rb', testUtils.createArchive(data, 700), blockCache_=blockCache)
+        randomGenerator = random.Random(4)
+
+        for i in range(0, 50):
+            offset = randomGenerator.randint(0, len(data))
+            size = randomGenerator.randint(0, 2000)
+
+            self.assertEqual(offset, testFile.seek(offset))
+            self.assertEqual(data[offset:offset + size], testFile.read(size))
+
+        self.assertEqual(100, testFile.seek(100, io.SEEK_SET))
+        self.assertEqual(150, testFile.seek(50, io.SEEK_CUR))
+        self.assertEqual(data[150:160], testFile.read(10))
+        self.assertEqual(len(data) - 10, testFile.seek(-10, io.SEEK_END))
+        self.assertEqual(data[-10:], testFile.read())
+        self.assertEqual(len(data) + 100, testFile.seek(100, io.SEEK_END))
+        self.assertEqual(b'', testFile.read(10))
+
+        with self.assertRaises(ValueError):
+            testFile.seek(-1)
+
+        self.assertGreater(blockCache.getStatistics()[0], 0)
+
+        testFile.close()
+
+    def test_not_seekable(self):
+        """
+        Purpose: Read an archive from a file object that can not seek
+        Expectation: Reads and forward seeks should work, backward seeks and seeks from the end should raise an exception
+        """
+
+        data = testUtils.createTestData(6000, 5)
+        testFile = KFile(None, 'rb', testUtils.NonSeekableFile(testUtils.createArchive(data, 1000).getvalue()))
+
+        self.assertFalse(testFile.seekable())
+        self.assertEqual(data[0:1500], testFile.read(1500))
+        self.assertEqual(3500, testFile.seek(2000, io.SEEK_CUR))
+        self.assertEqual(data[3500:3600], testFile.read(100))
+
+        # Moving back inside the current block is allowed
+        self.assertEqual(3200, testFile.seek(3200))
+        self.assertEqual(data[3200:3300], testFile.read(100))
+
+        with self.assertRaises(io.UnsupportedOperation):
+            testFile.seek(100)
+
+        with self.assertRaises(io.UnsupportedOperation):
+            testFile.seek(0, io.SEEK_END)
+
+        self.assertEqual(data[3300:], testFile.read())
+
+        testFile.close()
+
+    def test_empty_file(self):
+        """
+        Purpose: Write nothing and read the file back
+        Expectation: Reads should return no data
+        """
+
+        testFile = KFile(None, 'rb', testUtils.createArchive(b'', 1024))
+
+        self.assertEqual(b'', testFile.read())
+        self.assertEqual(b'', testFile.readline())
+        self.assertEqual(0, testFile.readinto(bytearray(10)))
+        self.assertEqual(0, testFile.seek(0, io.SEEK_END))
+
+        testFile.close()
+
+    def test_wrong_mode_and_closed(self):
+        """
+        Purpose: Perform operations that are not allowed by the mode and operations on a closed file
+        Expectation: The io exceptions should be raised
+        """
+
+        with self.assertRaises(ValueError):
+            KFile(None, 'a', io.BytesIO())
+
+        writeFile = KFile(None, 'wb', io.BytesIO())
+
+        with self.assertRaises(io.UnsupportedOperation):
+            writeFile.read()
+
+        with self.assertRaises(io.UnsupportedOperation):
+            writeFile.seek(0)
+
+        writeFile.close()
+        writeFile.close()
+
+        self.assertTrue(writeFile.closed)
+
+        with self.assertRaises(ValueError):
+            writeFile.write(b'abc')
+
+        readFile = KFile(None, 'rb', testUtils.createArchive(b'abc', 1024))
+
+        with self.assertRaises(io.UnsupportedOperation):
+            readFile.write(b'abc')
+
+        readFile.close()
+
+        with self.assertRaises(ValueError):
+            readFile.read()
+
+    def test_open_file_name(self):
+        """
+        Purpose: Write and read a file on disk through open in binary and text mode with non default parameters
+        Expectation: The data should match and the files should be closed when the file objects are closed
+        """
+
+        data = testUtils.createTestData(30000, 6)
+        text = 'café line\n'*2000
+
+        with tempfile.TemporaryDirectory() as directory:
+            binaryName = os.path.join(directory, 'binary.kmp')
+            textName = os.path.join(directory, 'text.kmp')
+
+            with KompressorFile.open(binaryName, 'wb', 4096, 10, coder_=Kompressor.CODER_RANGE,
+                                     runLengthMode_=Kompressor.RUN_LENGTH_BIJECTIVE, moveToFront_=True) as testFile:
+                testFile.write(data)
+
+            with KompressorFile.open(binaryName) as testFile:
+                self.assertEqual(data, testFile.read())
+
+            with KompressorFile.open(textName, 'wt', encoding='utf-8') as testFile:
+                testFile.write(text)
+
+            with KompressorFile.open(textName, 'rt', encoding='utf-8') as testFile:
+                self.assertEqual(text.splitlines(True), testFile.readlines())
+
+            with self.assertRaises(ValueError):
+                KompressorFile.open(textName, 'rbt')
+
+            with self.assertRaises(ValueError):
+                KompressorFile.open(textName, 'rb', encoding='utf-8')
+
+            with self.assertRaises(TypeError):
+                KompressorFile.open(1234)
+
+    def test_open_file_object(self):
+        """
+        Purpose: Open an existing file object
+        Expectation: The file object should be used as is and should not be closed with the KompressorFile
+        """
+
+        archiveFile = io.BytesIO()
+
+        with KompressorFile.open(archiveFile, 'w') as testFile:
+            testFile.write(b'abc'*1000)
+
+        self.assertFalse(archiveFile.closed)
+
+        archiveFile.seek(0)
+
+        with KompressorFile.open(archiveFile, 'r') as testFile:
+            self.assertEqual(b'abc'*1000, testFile.read())
+
+    def test_open_block_cache(self):
+        """
+        Purpose: Open an archive through open with a block cache and read the same blocks twice with seeks in between
+        Expectation: The data should match and the blocks read again should be taken from the cache
+        """
+
+        data = testUtils.createTestData(5000, 9)
+        blockCache = BlockCache(8192)
+
+        with KompressorFile.open(testUtils.createArchive(data, 1024), 'rb', blockCache_=blockCache) as testFile:
+            for offset in [3000, 100, 3100, 200]:
+                testFile.seek(offset)
+                self.assertEqual(data[offset:offset + 100], testFile.read(100))
+
+        self.assertEqual([2, 3, 0], blockCache.getStatistics())
+
+    def test_standard_keyword_arguments(self):
+        """
+        Purpose: Call open, the constructor and the read and seek methods with the keyword names used by io and gzip
+        Expectation: The keywords should be accepted and behave the same as positional arguments
+        """
+
+        data = testUtils.createTestData(5000, 7)
+        archiveFile = io.BytesIO()
+
+        with KFile(fileobj=archiveFile, mode='wb', sectionSize_=1024) as testFile:
+            testFile.write(data)
+
+        archiveFile.seek(0)
+
+        with KompressorFile.open(archiveFile, mode='rb') as testFile:
+            self.assertEqual(data[0:10], testFile.read(size=10))
+            self.assertEqual(data[10:13], testFile.read1(size=3))
+            self.assertEqual(data[13], testFile.peek(size=1)[0])
+            self.assertEqual(5000, testFile.seek(0, whence=io.SEEK_END))
+            self.assertEqual(100, testFile.seek(offset=100))
+            self.assertEqual(io.BytesIO(data[100:]).readline(4), testFile.readline(size=4))
+
+        textFile = io.BytesIO()
+
+        with KompressorFile.open(textFile, mode='wt', encoding='utf-8', errors='strict', newline='') as testFile:
+            testFile.write('café\r\nline\n')
+
+        textFile.seek(0)
+
+        with KompressorFile.open(filename=textFile, mode='rt', encoding='utf-8', newline='') as testFile:
+            self.assertEqual(['café\r\n', 'line\n'], testFile.readlines())
+
+if __name__ == '__main__':
+    unittest.main()
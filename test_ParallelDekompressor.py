@@ -0,0 +1,170 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import io
+from multiprocessing import shared_memory
+
+from ParallelDekompressor import ParallelDekompressor
+from Kompressor import Kompressor
+import testUtils
+
+class ParallelDekompressorTests(unittest.TestCase):
+    def test_read_blocks_in_order(self):
+        """
+        Purpose: Decompress archives written with different parameters from seekable and non seekable files, with windows
+                 smaller and larger than the number of workers
+        Expectation: The blocks should be returned in order and should match the original data
+        """
+
+        data = testUtils.createTestData(25000, 1)
+
+        configurations = [[1000, {}, 2, 1],
+                          [700, {'coder_': Kompressor.CODER_RANGE}, 2, 3],
+                          [2048, {'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True}, 3, 8],
+                          [4096, {'encoderWordSize_': 13}, 1, None]]
+
+        for [sectionSize, parameters, maxWorkers, maxInFlight] in configurations:
+            archiveData = testUtils.createArchive(data, sectionSize, **parameters).getvalue()
+            expectedBlocks = [data[i:i + sectionSize] for i in range(0, len(data), sectionSize)]
+
+            for archiveFile in [io.BytesIO(archiveData), testUtils.NonSeekableFile(archiveData)]:
+                with ParallelDekompressor(archiveFile, maxWorkers_=maxWorkers, maxInFlight_=maxInFlight) as reader:
+                    self.assertEqual(expectedBlocks, list(reader.readBlocks()))
+
+        with ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=2) as reader:
+            self.assertEqual(data, reader.read())
+            self.assertEqual(data[5000:5100], reader.read_at(5000, 100))
+
+    def test_shared_memory_transport(self):
+        """
+        Purpose: Decompress archives using the shared memory transport from seekable and non seekable files, with
+                 windows smaller and larger than the number of workers, including a read that stops early
+        Expectation: The blocks should be returned in order and the shared memory should be removed on close
+        """
+
+        data = testUtils.createTestData(25000, 5)
+
+        configurations = [[1000, {}, 2, 1],
+                          [700, {'coder_': Kompressor.CODER_RANGE}, 2, 3],
+                          [2048, {'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True}, 3, 8]]
+
+        for [sectionSize, parameters, maxWorkers, maxInFlight] in configurations:
+            archiveData = testUtils.createArchive(data, sectionSize, **parameters).getvalue()
+            expectedBlocks = [data[i:i + sectionSize] for i in range(0, len(data), sectionSize)]
+
+            for archiveFile in [io.BytesIO(archiveData), testUtils.NonSeekableFile(archiveData)]:
+                with ParallelDekompressor(archiveFile, maxWorkers_=maxWorkers, maxInFlight_=maxInFlight,
+                                          transport_=ParallelDekompressor.TRANSPORT_SHARED_MEMORY) as reader:
+                    ringName = reader.mRing.getName()
+                    self.assertEqual(expectedBlocks, list(reader.readBlocks()))
+
+                with self.assertRaises(FileNotFoundError):
+                    shared_memory.SharedMemory(name=ringName)
+
+        with ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=2, maxInFlight_=3, transport_=ParallelDekompressor.TRANSPORT_SHARED_MEMORY) as reader:
+            blocks = reader.readBlocks()
+
+            self.assertEqual(expectedBlocks[0], next(blocks))
+
+            blocks.close()
+
+            self.assertEqual(data, reader.read())
+
+    def test_archive_not_at_start_of_file(self):
+        """
+        Purpose: Read an archive written after other data in the file
+        Expectation: The frames should be located relative to the start of the archive
+        """
+
+        data = testUtils.createTestData(3000, 2)
+        archiveFile = io.BytesIO(b'prefix' + testUtils.createArchive(data, 512).getvalue())
+        archiveFile.seek(6)
+
+        with ParallelDekompressor(archiveFile, maxWorkers_=2) as reader:
+            self.assertEqual(data, reader.read())
+
+    def test_stop_early(self):
+        """
+        Purpose: Stop reading the blocks before the end and then read them all again
+        Expectation: The second read should start from the first block
+        """
+
+        data = testUtils.createTestData(10000, 3)
+
+        with ParallelDekompressor(testUtils.createArchive(data, 500), maxWorkers_=2, maxInFlight_=4) as reader:
+            blocks = reader.readBlocks()
+
+            self.assertEqual(data[0:500], next(blocks))
+            self.assertEqual(data[500:1000], next(blocks))
+
+            blocks.close()
+
+            self.assertEqual(data, reader.read())
+
+    def test_empty_archive(self):
+        """
+        Purpose: Read an archive with no blocks
+        Expectation: No blocks should be returned
+        """
+
+        with ParallelDekompressor(testUtils.createArchive(b'', 512), maxWorkers_=1) as reader:
+            self.assertEqual([], list(reader.readBlocks()))
+
+    def test_checksum_mismatch(self):
+        """
+        Purpose: Change the checksum stored in the second frame
+        Expectation: The first block should be returned and an exception should be thrown for the second
+        """
+
+        data = testUtils.createTestData(2000, 4)
+        archiveData = bytearray(testUtils.createArchive(data, 512).getvalue())
+
+        with ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=1) as reader:
+            reader._readIndex()
+            checksumOffset = reader.mBlockIndex[1][0] + 8
+
+        archiveData[checksumOffset] ^= 0xFF
+
+        with ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=2) as reader:
+            blocks = reader.readBlocks()
+
+            self.assertEqual(data[0:512], next(blocks))
+
+            with self.assertRaises(Exception):
+                next(blocks)
+
+    def test_close_twice(self):
+        """
+        Purpose: Close a reader using the shared memory transport again after the context manager closed it
+        Expectation: The later calls should do nothing
+        """
+
+        data = testUtils.createTestData(3000, 8)
+
+        with ParallelDekompressor(testUtils.createArchive(data, 1024), maxWorkers_=1, transport_=ParallelDekompressor.TRANSPORT_SHARED_MEMORY) as reader:
+            self.assertEqual(data, reader.read())
+
+        reader.close()
+        reader.close()
+
+        self.assertTrue(reader.mClosed)
+
+    def test_invalid_parameters(self):
+        """
+        Purpose: Create a ParallelDekompressor with no workers, an empty window or an invalid transport
+        Expectation: An exception should be thrown
+        """
+
+        archiveData = testUtils.createArchive(b'abc', 512).getvalue()
+
+        with self.assertRaises(Exception):
+            ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=0)
+
+        with self.assertRaises(Exception):
+            ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=1, maxInFlight_=0)
+
+        with self.assertRaises(Exception):
+            ParallelDekompressor(io.BytesIO(archiveData), maxWorkers_=1, transport_=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import io
+from multiprocessing import shared_memory
+
+from ParallelKompressor import ParallelKompressor
+from KompressedArchive import KompressedWriter, KompressedReader
+from Kompressor import Kompressor
+import testUtils
+
+class ParallelKompressorTests(unittest.TestCase):
+    def _writeArchive(self, writer_, data_, writeSizes_, flushAfter_):
+        position = 0
+
+        for writeSize in writeSizes_:
+            writer_.write(data_[position:position + writeSize])
+            position += writeSize
+
+            if(position in flushAfter_):
+                writer_.flush()
+
+        writer_.write(data_[position:])
+        writer_.close()
+
+    def test_matches_serial_writer(self):
+        """
+        Purpose: Write the same data with KompressedWriter and ParallelKompressor using different parameters, uneven
+                 writes and flushes, and windows smaller and larger than the number of workers
+        Expectation: The archives should be byte for byte identical and should decompress to the original data
+        """
+
+        data = testUtils.createTestData(30000, 1)
+        writeSizes = [1, 700, 5000, 3, 9000]
+        flushAfter = [701, 5704]
+
+        configurations = [[1024, {}, 2, 1],
+                          [700, {'coder_': Kompressor.CODER_RANGE}, 2, 3],
+                          [2048, {'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True}, 3, 8],
+                          [4096, {'encoderWordSize_': 13}, 1, None]]
+
+        for [sectionSize, parameters, maxWorkers, maxInFlight] in configurations:
+            serialFile = io.BytesIO()
+            parallelFile = io.BytesIO()
+
+            self._writeArchive(KompressedWriter(serialFile, sectionSize, 10, **parameters), data, writeSizes, flushAfter)
+
+            parallelWriter = ParallelKompressor(parallelFile, sectionSize, 10, maxWorkers_=maxWorkers, maxInFlight_=maxInFlight, **parameters)
+            self._writeArchive(parallelWriter, data, writeSizes, flushAfter)
+
+            self.assertEqual(serialFile.getvalue(), parallelFile.getvalue())
+            self.assertEqual(len(parallelFile.getvalue()), parallelWriter.mArchiveSize)
+
+            parallelFile.seek(0)
+            self.assertEqual(data, bytes(KompressedReader(parallelFile).read()))
+
+    def test_shared_memory_transport(self):
+        """
+        Purpose: Write the same data with KompressedWriter and ParallelKompressor using the shared memory transport,
+                 with windows smaller and larger than the number of workers
+        Expectation: The archives should be byte for byte identical and the shared memory should be removed on close
+        """
+
+        data = testUtils.createTestData(30000, 3)
+        writeSizes = [1, 700, 5000, 3, 9000]
+        flushAfter = [701, 5704]
+
+        configurations = [[1024, {}, 2, 1],
+                          [700, {'coder_': Kompressor.CODER_RANGE}, 2, 3],
+                          [2048, {'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True}, 3, 8]]
+
+        for [sectionSize, parameters, maxWorkers, maxInFlight] in configurations:
+            serialFile = io.BytesIO()
+            parallelFile = io.BytesIO()
+
+            self._writeArchive(KompressedWriter(serialFile, sectionSize, 10, **parameters), data, writeSizes, flushAfter)
+
+            parallelWriter = ParallelKompressor(parallelFile, sectionSize, 10, maxWorkers_=maxWorkers, maxInFlight_=maxInFlight,
+                                                transport_=ParallelKompressor.TRANSPORT_SHARED_MEMORY, **parameters)
+            ringName = parallelWriter.mRing.getName()
+            self._writeArchive(parallelWriter, data, writeSizes, flushAfter)
+
+            self.assertEqual(serialFile.getvalue(), parallelFile.getvalue())
+
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=ringName)
+
+    def test_window_bounds_blocks_in_flight(self):
+        """
+        Purpose: Write many blocks in one call with a small window
+        Expectation: No more blocks than the window should be in flight and the blocks should be written as they complete
+        """
+
+        data = testUtils.createTestData(20000, 2)
+        archiveFile = io.BytesIO()
+
+        with ParallelKompressor(archiveFile, 500, 10, maxWorkers_=2, maxInFlight_=3) as writer:
+            writer.write(data)
+
+            self.assertEqual(3, len(writer.mInFlight))
+            self.assertEqual(37, len(writer.mBlockIndex))
+
+        self.assertEqual(0, len(writer.mInFlight))
+        self.assertEqual(40, len(writer.mBlockIndex))
+
+        archiveFile.seek(0)
+        self.assertEqual(data, bytes(KompressedReader(archiveFile).read()))
+
+    def test_empty_archive(self):
+        """
+        Purpose: Close a ParallelKompressor without writing any data
+        Expectation: The archive should match the empty archive written by KompressedWriter
+        """
+
+        serialFile = io.BytesIO()
+        parallelFile = io.BytesIO()
+
+        KompressedWriter(serialFile, 1024, 10).close()
+        ParallelKompressor(parallelFile, 1024, 10, maxWorkers_=1).close()
+
+        self.assertEqual(serialFile.getvalue(), parallelFile.getvalue())
+
+    def test_invalid_parameters(self):
+        """
+        Purpose: Create a ParallelKompressor with no workers, an empty window or an invalid transport and write after closing
+        Expectation: An exception should be thrown
+        """
+
+        with self.assertRaises(Exception):
+            ParallelKompressor(io.BytesIO(), 1024, 10, maxWorkers_=0)
+
+        with self.assertRaises(Exception):
+            ParallelKompressor(io.BytesIO(), 1024, 10, maxWorkers_=1, maxInFlight_=0)
+
+        with self.assertRaises(Exception):
+            ParallelKompressor(io.BytesIO(), 1024, 10, maxWorkers_=1, transport_=2)
+
+        writer = ParallelKompressor(io.BytesIO(), 1024, 10, maxWorkers_=1)
+        writer.close()
+
+        with self.assertRaises(Exception):
+            writer.write(b'abc')
+
+    def test_close_twice(self):
+        """
+        Purpose: Close a writer using the shared memory transport again after it was closed, and after the context
+                 manager was left because of an error
+        Expectation: The later calls should do nothing and the archive should not be changed
+        """
+
+        archiveFile = io.BytesIO()
+
+        with ParallelKompressor(archiveFile, 1024, 10, maxWorkers_=1, transport_=ParallelKompressor.TRANSPORT_SHARED_MEMORY) as writer:
+            writer.write(testUtils.createTestData(3000, 5))
+
+        archiveData = archiveFile.getvalue()
+        writer.close()
+        writer.close()
+
+        self.assertEqual(archiveData, archiveFile.getvalue())
+
+        archiveFile = io.BytesIO()
+
+        with self.assertRaises(ValueError):
+            with ParallelKompressor(archiveFile, 1024, 10, maxWorkers_=1, transport_=ParallelKompressor.TRANSPORT_SHARED_MEMORY) as writer:
+                writer.write(testUtils.createTestData(3000, 5))
+                raise ValueError('Stop writing')
+
+        archiveData = archiveFile.getvalue()
+        writer.close()
+
+        self.assertEqual(archiveData, archiveFile.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
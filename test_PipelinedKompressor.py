@@ -0,0 +1,91 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+from array import array
+
+from PipelinedKompressor import PipelinedKompressor
+from Kompressor import Kompressor
+from Dekompressor import Dekompressor
+import testUtils
+
+class PipelinedKompressorTests(unittest.TestCase):
+    def _kompressSerial(self, kompressor_, sections_, lastDataBlock_):
+        compressedSections = []
+        compressedData = bytearray(8192)
+
+        for i in range(0, len(sections_)):
+            lastDataBlock = lastDataBlock_ and (i == (len(sections_) - 1))
+            compressedDataLen = kompressor_.kompress(sections_[i], len(sections_[i]), compressedData, 8192, lastDataBlock=lastDataBlock)
+            compressedSections.append(bytes(compressedData[0:compressedDataLen]))
+
+        return compressedSections
+
+    def test_matches_serial_continuous_statistics(self):
+        """
+        Purpose: Compress a sequence of sections without resetting the encoder, serially and with the pipeline, using
+                 different parameters and windows smaller and larger than the number of workers
+        Expectation: The compressed sections should be byte for byte identical and should decompress in order with a
+                     single Dekompressor
+        """
+
+        configurations = [[1024, {}, 2, 1, False],
+                          [700, {'coder_': Kompressor.CODER_RANGE}, 2, 3, True],
+                          [2048, {'runLengthMode_': Kompressor.RUN_LENGTH_BIJECTIVE, 'moveToFront_': True}, 3, 8, False],
+                          [1024, {'encoderWordSize_': 13}, 1, None, True]]
+
+        for [sectionSize, parameters, maxWorkers, maxInFlight, lastDataBlock] in configurations:
+            sections = testUtils.createSections(12, sectionSize, sectionSize)
+            expectedSections = self._kompressSerial(Kompressor(sectionSize, 10, **parameters), sections, lastDataBlock)
+
+            with PipelinedKompressor(sectionSize, 10, maxWorkers_=maxWorkers, maxInFlight_=maxInFlight, **parameters) as kompressor:
+                compressedSections = list(kompressor.kompressSections(sections, lastDataBlock))
+
+            self.assertEqual(expectedSections, compressedSections)
+
+            dekompressor = Dekompressor(sectionSize, 10, parameters.get('encoderWordSize_', 16), None, parameters.get('coder_', Dekompressor.CODER_ARITHMETIC),
+                                        parameters.get('runLengthMode_', Dekompressor.RUN_LENGTH_GENERIC), parameters.get('moveToFront_', False))
+            uncompressedData = bytearray(sectionSize)
+
+            for i in range(0, len(sections)):
+                uncompressedDataLen = dekompressor.dekompress(compressedSections[i], len(compressedSections[i]), uncompressedData, sectionSize)
+                self.assertEqual(sections[i], uncompressedData[0:uncompressedDataLen])
+
+    def test_sequences_and_reset(self):
+        """
+        Purpose: Compress two sequences with the same pipeline, resetting the encoder before the second one, with
+                 sections passed as integer arrays
+        Expectation: The first sequence should continue the statistics and the second should match a fresh Kompressor
+        """
+
+        sections = testUtils.createSections(6, 512, 3)
+        kompressor = Kompressor(512, 10)
+        expectedSections = self._kompressSerial(kompressor, sections[0:3], False) + self._kompressSerial(kompressor, sections[3:6], False)
+
+        with PipelinedKompressor(512, 10, maxWorkers_=2) as pipelinedKompressor:
+            compressedSections = list(pipelinedKompressor.kompressSections(sections[0:3], False))
+            compressedSections += list(pipelinedKompressor.kompressSections([array('i', list(section)) for section in sections[3:6]], False))
+
+            self.assertEqual(expectedSections, compressedSections)
+
+            pipelinedKompressor.reset()
+
+            self.assertEqual(self._kompressSerial(Kompressor(512, 10), sections[3:6], True), list(pipelinedKompressor.kompressSections(sections[3:6])))
+
+    def test_invalid_parameters(self):
+        """
+        Purpose: Create a PipelinedKompressor with no workers or an empty window and pass a section that is too large
+        Expectation: An exception should be thrown
+        """
+
+        with self.assertRaises(Exception):
+            PipelinedKompressor(512, 10, maxWorkers_=0)
+
+        with self.assertRaises(Exception):
+            PipelinedKompressor(512, 10, maxWorkers_=1, maxInFlight_=0)
+
+        with PipelinedKompressor(512, 10, maxWorkers_=1) as kompressor:
+            with self.assertRaises(Exception):
+                list(kompressor.kompressSections([b'a'*513]))
+
+if __name__ == '__main__':
+    unittest.main()
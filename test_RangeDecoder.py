@@ -0,0 +1,132 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import random
+from RangeEncoder import RangeEncoder
+from RangeDecoder import RangeDecoder
+from array import array
+
+class TestRangeDecoder(unittest.TestCase):
+
+    def test_instantiate_RangeDecoder_valid(self):
+        # Purpose: Instantiate decoder with valid parameters
+        # Expectation: The member variables should be initialized correctly
+
+        test_decoder = RangeDecoder(257, 256)
+
+        self.assertEqual(257, test_decoder.mVocabularySize)
+        self.assertEqual(256, test_decoder.mTerminationSymbol)
+        self.assertEqual(65536, test_decoder.mMaxDecodingBytes)
+        self.assertEqual(257, test_decoder.mTotalSymbolCount)
+        self.assertEqual(None, test_decoder.mEncodedData)
+        self.assertEqual(0, test_decoder.mDecodedDataLen)
+
+    def test_encode_decode_data_small_set(self):
+        # Purpose: Encode the data set {0x00, 0x00, 0x01, 0x01}
+        # Expectation: The decoded data should match the original
+
+        test_encoder = RangeEncoder(257)
+        test_decoder = RangeDecoder(257, 256)
+
+        data = array('i', [0x00, 0x00, 0x01, 0x01, 256])
+        encodedData = bytearray(16)
+        decodedData = bytearray(16)
+
+        encodedDataSize = test_encoder.encode(data, 5, encodedData, 16)
+        decodedDataSize = test_decoder.decode(encodedData, encodedDataSize, decodedData, 16)
+
+        self.assertEqual(4, decodedDataSize)
+
+        for i in range(0, 4):
+            self.assertEqual(data[i], decodedData[i])
+
+    def test_encode_decode_data_multiple_blocks(self):
+        # Purpose: Encode several blocks of skewed random data, carrying statistics between blocks, and then decode them
+        # Expectation: The decoded data should match the original and statistics should match between encoder and decoder
+
+        randomGenerator = random.Random(21)
+
+        test_encoder = RangeEncoder(267)
+        test_decoder = RangeDecoder(267, 256)
+
+        for block in range(0, 5):
+            data = array('i', [randomGenerator.choice([0, 0, 0, 1, 257, 266, randomGenerator.randrange(256)]) for i in range(0, 3000)] + [256])
+            encodedData = bytearray(8192)
+            decodedData = array('i', [0]*3001)
+
+            encodedDataSize = test_encoder.encode(data, len(data), encodedData, 8192)
+            decodedDataSize = test_decoder.decode(encodedData, encodedDataSize, decodedData, 3001)
+
+            self.assertEqual(3000, decodedDataSize)
+            self.assertEqual(list(data[0:3000]), list(decodedData[0:3000]))
+            self.assertEqual(test_encoder.mTotalSymbolCount, test_decoder.mTotalSymbolCount)
+
+    def test_encode_decode_data_normalized(self):
+        # Purpose: Encode and decode enough data that the statistics need to be normalized
+        # Expectation: The decoded data should match the original
+
+        randomGenerator = random.Random(4)
+
+        test_encoder = RangeEncoder(257)
+        test_decoder = RangeDecoder(257, 256)
+
+        data = array('i', [randomGenerator.choice([7, 7, 7, 9, randomGenerator.randrange(256)]) for i in range(0, 70000)] + [256])
+        encodedData = bytearray(70000)
+        decodedData = array('i', [0]*70001)
+
+        encodedDataSize = test_encoder.encode(data, len(data), encodedData, 70000)
+        decodedDataSize = test_decoder.decode(encodedData, encodedDataSize, decodedData, 70001)
+
+        self.assertEqual(70000, decodedDataSize)
+        self.assertEqual(list(data[0:70000]), list(decodedData[0:70000]))
+
+    def test_decode_truncated_data(self):
+        # Purpose: Decode encoded data that has been cut short
+        # Expectation: An exception should be thrown
+
+        test_encoder = RangeEncoder(257)
+        test_decoder = RangeDecoder(257, 256)
+
+        data = array('i', list(range(0, 256))*4 + [256])
+        encodedData = bytearray(2048)
+
+        encodedDataSize = test_encoder.encode(data, len(data), encodedData, 2048)
+
+        with self.assertRaises(Exception):
+            test_decoder.decode(encodedData, encodedDataSize // 2, array('i', [0]*2048), 2048)
+
+    def test_decode_not_enough_space(self):
+        # Purpose: Decode data into an array that is too small
+        # Expectation: An exception should be thrown
+
+        test_encoder = RangeEncoder(257)
+        test_decoder = RangeDecoder(257, 256)
+
+        data = array('i', [1, 2, 3, 4, 5, 6, 7, 8, 256])
+        encodedData = bytearray(64)
+
+        encodedDataSize = test_encoder.encode(data, len(data), encodedData, 64)
+
+        with self.assertRaises(Exception):
+            test_decoder.decode(encodedData, encodedDataSize, array('i', [0]*4), 4)
+
+    def test_decode_exact_space(self):
+        # Purpose: Decode data into an array that is exactly the size of the decoded data, and one entry smaller
+        # Expectation: The data should fill the exact array and an exception should be thrown for the smaller array
+
+        test_encoder = RangeEncoder(257)
+
+        data = array('i', [1, 2, 3, 4, 5, 6, 7, 8, 256])
+        encodedData = bytearray(64)
+        decodedData = array('i', [0]*8)
+
+        encodedDataSize = test_encoder.encode(data, len(data), encodedData, 64)
+
+        self.assertEqual(8, RangeDecoder(257, 256).decode(encodedData, encodedDataSize, decodedData, 8))
+        self.assertEqual(list(data[0:8]), list(decodedData))
+
+        with self.assertRaises(Exception):
+            RangeDecoder(257, 256).decode(encodedData, encodedDataSize, array('i', [0]*7), 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+from RangeEncoder import RangeEncoder
+from array import array
+
+class TestRangeEncoder(unittest.TestCase):
+
+    def test_instantiate_RangeEncoder_invalid_parameters(self):
+        # Purpose: Instantiate object with vocabulary sizes that can't be supported
+        # Expectation: An exception should be thrown
+
+        with self.assertRaises(Exception):
+            RangeEncoder(0)
+
+        with self.assertRaises(Exception):
+            RangeEncoder(RangeEncoder.BOTTOM_VALUE)
+
+    def test_instantiate_RangeEncoder_valid(self):
+        # Purpose: Instantiate encoder with valid parameters
+        # Expectation: The member variables should be initialized correctly
+
+        test_encoder = RangeEncoder(257)
+
+        self.assertEqual(257, test_encoder.mVocabularySize)
+        self.assertEqual(65536, test_encoder.mMaxEncodeBytes)
+        self.assertEqual(257, test_encoder.mTotalSymbolCount)
+        self.assertEqual(None, test_encoder.mEncodedData)
+        self.assertEqual(0, test_encoder.mEncodedDataCount)
+
+        for i in range(0, test_encoder.mVocabularySize):
+            self.assertEqual(1, test_encoder.mSymbolCount[i])
+
+    def test_encode_updates_statistics(self):
+        # Purpose: Encode a small data set and then reset the encoder
+        # Expectation: The statistics should reflect the encoded symbols until reset is called
+
+        test_encoder = RangeEncoder(257)
+
+        data = array('i', [0, 0, 1, 256])
+        encodedData = bytearray(64)
+
+        encodedDataSize = test_encoder.encode(data, 4, encodedData, 64)
+
+        self.assertEqual(encodedDataSize, test_encoder.mEncodedDataCount)
+        self.assertEqual(3, test_encoder.mSymbolCount[0])
+        self.assertEqual(2, test_encoder.mSymbolCount[1])
+        self.assertEqual(2, test_encoder.mSymbolCount[256])
+        self.assertEqual(261, test_encoder.mTotalSymbolCount)
+
+        test_encoder.reset()
+
+        self.assertEqual(1, test_encoder.mSymbolCount[0])
+        self.assertEqual(257, test_encoder.mTotalSymbolCount)
+        self.assertEqual(0, test_encoder.mEncodedDataCount)
+
+    def test_encode_normalizes_statistics(self):
+        # Purpose: Encode enough symbols to reach the max total symbol count
+        # Expectation: The statistics should be normalized
+
+        test_encoder = RangeEncoder(257)
+
+        data = array('i', [5]*(65536 - 257))
+        encodedData = bytearray(4096)
+
+        test_encoder.encode(data, len(data), encodedData, 4096)
+
+        self.assertEqual(32640, test_encoder.mSymbolCount[5])
+        self.assertEqual(32640 + 256, test_encoder.mTotalSymbolCount)
+
+    def test_encode_data_data_len_invalid(self):
+        # Purpose: Pass in a data byte array that is smaller than the specified data length
+        # Expectation: An exception should be thrown
+
+        test_encoder = RangeEncoder(257)
+
+        with self.assertRaises(Exception):
+            test_encoder.encode(array('i', [0, 1]), 3, bytearray(16), 16)
+
+    def test_encode_data_compressed_data_len_invalid(self):
+        # Purpose: Pass in an encoded data byte array that is smaller than the specified max length
+        # Expectation: An exception should be thrown
+
+        test_encoder = RangeEncoder(257)
+
+        with self.assertRaises(Exception):
+            test_encoder.encode(array('i', [0, 1]), 2, bytearray(16), 17)
+
+    def test_encode_data_not_enough_space(self):
+        # Purpose: Encode data that needs more space than is available
+        # Expectation: An exception should be thrown
+
+        test_encoder = RangeEncoder(257)
+
+        data = array('i', list(range(0, 256)) + [256])
+
+        with self.assertRaises(Exception):
+            test_encoder.encode(data, len(data), bytearray(32), 32)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+from multiprocessing import shared_memory
+
+from SharedMemoryRing import SharedMemoryRing
+
+class TestSharedMemoryRing(unittest.TestCase):
+
+    def test_slots(self):
+        # Purpose: Write into the input and output regions of every slot and attach a second ring to the same segment
+        # Expectation: The regions should not overlap, slot numbers should wrap around and both rings should see the same data
+
+        ring = SharedMemoryRing(3, 10, 20, None)
+        attachedRing = SharedMemoryRing(3, 10, 20, ring.getName())
+
+        for slot in range(0, 3):
+            ring.getInputView(slot)[:] = bytes([slot])*10
+            ring.getOutputView(slot)[:] = bytes([slot + 100])*20
+
+        for slot in range(0, 3):
+            self.assertEqual(bytes([slot])*10, bytes(attachedRing.getInputView(slot)))
+            self.assertEqual(bytes([slot + 100])*20, bytes(attachedRing.getOutputView(slot)))
+
+        self.assertEqual(bytes(ring.getInputView(1)), bytes(ring.getInputView(4)))
+
+        attachedRing.close()
+        ring.close()
+        ring.close()
+
+    def test_close_removes_segment(self):
+        # Purpose: Close the ring that created the segment
+        # Expectation: The segment should no longer exist
+
+        ring = SharedMemoryRing(1, 8, 8, None)
+        ringName = ring.getName()
+        ring.close()
+
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=ringName)
+
+    def test_invalid_slot_count(self):
+        # Purpose: Create a ring without slots
+        # Expectation: An exception should be thrown
+
+        with self.assertRaises(Exception):
+            SharedMemoryRing(0, 8, 8, None)
+
+if __name__ == '__main__':
+    unittest.main()
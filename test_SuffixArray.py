@@ -0,0 +1,93 @@
+__author__ = 'Marko Milutinovic'
+
+import unittest
+import random
+from array import array
+
+import SuffixArray
+import utils
+from Kompressor import SortKey
+
+class TestSuffixArray(unittest.TestCase):
+    def test_buildSuffixArray_small(self):
+        # Purpose: Build the suffix array of a short sequence with repeated symbols
+        # Expectation: The suffixes should be ordered lexicographically with shorter prefixes first
+
+        data = [1, 0, 2, 1, 0, 2, 1]
+
+        suffixArray = SuffixArray.buildSuffixArray(data, 3)
+
+        self.assertEqual(sorted(range(0, len(data)), key=lambda i: data[i:]), suffixArray)
+
+    def test_buildSuffixArray_random(self):
+        # Purpose: Build suffix arrays of random sequences over small and large alphabets
+        # Expectation: The suffix array should match a naive sort of all suffixes
+
+        randomGenerator = random.Random(7)
+
+        for alphabetSize in [1, 2, 4, 256]:
+            for dataSize in range(1, 60):
+                data = [randomGenerator.randrange(alphabetSize) for i in range(0, dataSize)]
+
+                suffixArray = SuffixArray.buildSuffixArray(data, alphabetSize)
+
+                self.assertEqual(sorted(range(0, dataSize), key=lambda i: data[i:]), suffixArray)
+
+    def test_getPrimitivePeriod(self):
+        # Purpose: Find the period of periodic and non-periodic sequences
+        # Expectation: The shortest repeating period should be returned or the data size when there is none
+
+        self.assertEqual(0, SuffixArray.getPrimitivePeriod([], 0))
+        self.assertEqual(1, SuffixArray.getPrimitivePeriod([5], 1))
+        self.assertEqual(1, SuffixArray.getPrimitivePeriod([5, 5, 5, 5], 4))
+        self.assertEqual(2, SuffixArray.getPrimitivePeriod([1, 2, 1, 2, 1, 2], 6))
+        self.assertEqual(5, SuffixArray.getPrimitivePeriod([1, 2, 1, 2, 1], 5))
+        self.assertEqual(3, SuffixArray.getPrimitivePeriod([1, 2, 3, 1, 2, 3, 9], 6))
+
+    def test_sortRotations_matches_comparison_sort(self):
+        # Purpose: Sort rotations of random and periodic data
+        # Expectation: The order should match the stable comparison sort using SortKey, including identical rotations
+
+        randomGenerator = random.Random(3)
+
+        for testIndex in range(0, 200):
+            period = [randomGenerator.randrange(3) for i in range(0, randomGenerator.randint(1, 6))]
+
+            if(testIndex % 2 == 0):
+                data = array('i', period*randomGenerator.randint(1, 6))
+            else:
+                data = array('i', [randomGenerator.randrange(4) for i in range(0, randomGenerator.randint(1, 40))])
+
+            dataSize = len(data)
+            expected = [key[0] for key in sorted([[i, data, dataSize] for i in range(0, dataSize)], key=SortKey)]
+
+            self.assertEqual(expected, SuffixArray.sortRotations(data, dataSize, 4))
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_sortRotationsPrefixDoubling_matches_suffix_array(self):
+        # Purpose: Sort rotations of random and periodic data using prefix doubling
+        # Expectation: The order should match the order produced using the suffix array
+
+        randomGenerator = random.Random(5)
+
+        for testIndex in range(0, 200):
+            period = [randomGenerator.randrange(3) for i in range(0, randomGenerator.randint(1, 6))]
+
+            if(testIndex % 2 == 0):
+                data = array('i', period*randomGenerator.randint(1, 6))
+            else:
+                data = array('i', [randomGenerator.randrange(256) for i in range(0, randomGenerator.randint(1, 40))])
+
+            dataSize = len(data)
+
+            self.assertEqual(SuffixArray.sortRotations(data, dataSize, 256), SuffixArray.sortRotationsPrefixDoubling(data, dataSize).tolist())
+
+    @unittest.skipIf(not utils.isNumpyAvailable(), 'NumPy is not available')
+    def test_sortRotationsPrefixDoubling_no_data(self):
+        # Purpose: Sort the rotations of an empty data section
+        # Expectation: An empty order should be returned
+
+        self.assertEqual(0, len(SuffixArray.sortRotationsPrefixDoubling(array('i'), 0)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 __author__ = 'marko'
 
 import unittest
+from array import array
 import utils
 
 
@@ -36,7 +37,57 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(2, utils.calculateMaxBytes(3))
         self.assertEqual(512, utils.calculateMaxBytes(11))
         self.assertEqual(16384, utils.calculateMaxBytes(16))
-        self.assertEqual(0, utils.calculateMaxBytes(50))
+        self.assertEqual(4194304, utils.calculateMaxBytes(24))
+        self.assertEqual(1073741824, utils.calculateMaxBytes(32))
+        self.assertEqual(2**48, utils.calculateMaxBytes(50))
+        self.assertEqual(2**60, utils.calculateMaxBytes(62))
+        self.assertEqual(0, utils.calculateMaxBytes(63))
+
+   def test_calculateMaxCompressedBytes(self):
+        # Purpose: Pass in varying symbol counts and word sizes
+        # Expectation: Every symbol should be allowed at least the word size (min 16 bits) plus termination bytes
+
+        self.assertEqual(13, utils.calculateMaxCompressedBytes(0, 16))
+        self.assertEqual(4621, utils.calculateMaxCompressedBytes(2048, 13))
+        self.assertEqual(8 + ((2050*34) + 7)//8, utils.calculateMaxCompressedBytes(2048, 32))
+        self.assertLess(2048*2, utils.calculateMaxCompressedBytes(2048, 16))
+
+   def test_getSymbolArray(self):
+        # Purpose: Pass in integer sequences and bytes-like objects
+        # Expectation: Integer sequences should be returned as they are, bytes-like objects should be copied into a byte array
+
+        symbols = array('i', [1, 2, 300])
+        self.assertIs(symbols, utils.getSymbolArray(symbols, 3))
+
+        for data in [b'abcdef', bytearray(b'abcdef'), memoryview(b'xxabcdef')[2:]]:
+            result = utils.getSymbolArray(data, 4)
+            self.assertEqual('B', result.typecode)
+            self.assertEqual([97, 98, 99, 100], list(result))
+
+        self.assertEqual([0, 1], list(utils.getSymbolArray(memoryview(bytearray([0, 1, 2, 3])).cast('b'), 2)))
+
+        with self.assertRaises(Exception):
+            utils.getSymbolArray(b'abc', 4)
+
+        with self.assertRaises(Exception):
+            utils.getSymbolArray(memoryview(bytearray(8)).cast('I'), 2)
+
+   def test_storeBytes(self):
+        # Purpose: Store symbols into integer sequences and writable bytes-like objects
+        # Expectation: The symbols should be stored at the start, symbols outside the byte range should throw an exception
+
+        symbols = array('i', [5, 6, 255, 300])
+
+        for output in [bytearray(6), array('i', [0]*6), [0]*6]:
+            utils.storeBytes(output, symbols, 3)
+            self.assertEqual([5, 6, 255, 0, 0, 0], list(output))
+
+        output = bytearray(6)
+        utils.storeBytes(memoryview(output)[1:], symbols, 3)
+        self.assertEqual(bytearray([0, 5, 6, 255, 0, 0]), output)
+
+        with self.assertRaises(Exception):
+            utils.storeBytes(bytearray(6), symbols, 4)
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,9 @@
 __author__ = 'Marko Milutinovic'
 
 import math
+from array import array
+
+MAX_WORD_SIZE = 62 # The largest tag word size supported by the arithmetic coder
 
 def getMinBytesToRepresent(maxValue_):
     """
@@ -24,14 +27,88 @@ def calculateMaxBytes(wordSize_):
     Calculate the max number of bytes we can compress before we are required
     to normalize the statistics during AR encoding
 
-    :param wordSize_: The number of bits used when generating tags. Must be greater than 2 and less than or equal to 16 to produce a valid result
+    :param wordSize_: The number of bits used when generating tags. Must be greater than 2 and less than or equal to MAX_WORD_SIZE to produce a valid result
     :return: Return the max bytes before we need to normalize the statistics
     """
 
     # If an invalid value is passed in return 0
-    if((wordSize_ <= 2) or (wordSize_ > 16)):
+    if((wordSize_ <= 2) or (wordSize_ > MAX_WORD_SIZE)):
         return 0
 
-    maxBytes = math.pow(2, (wordSize_ - 2))
+    return (1 << (wordSize_ - 2))
+
+def calculateMaxCompressedBytes(symbolCount_, wordSize_):
+    """
+    Calculate an upper bound on the number of bytes the encoders can produce for a block of symbols. A symbol never
+    costs more than the tag word size in bits with the arithmetic coder or 16 bits with the range coder, the extra
+    symbols and bytes cover the termination of the block
+
+    :param symbolCount_: The number of symbols that will be encoded, including the termination symbol
+    :param wordSize_: The number of bits used when generating tags
+    :return: The max number of bytes the encoded block can take up
+    """
+
+    return (((symbolCount_ + 2)*(max(wordSize_, 16) + 2)) + 7)//8 + 8
+
+def getSymbolArray(data_, dataLen_):
+    """
+    Get the data to compress as a sequence of integer symbols. An array or list is already a sequence of symbols and is
+    returned as it is. Any other object must support the buffer protocol with one byte items (bytes, bytearray,
+    memoryview, mmap, NumPy uint8 arrays), its first dataLen_ bytes are copied in bulk through a memoryview
+
+    :param data_: The data, an integer array or list or a bytes-like object
+    :param dataLen_: The number of symbols that will be used
+    :return: The integer sequence holding the data (array or list)
+    """
+
+    if(isinstance(data_, (array, list))):
+        return data_
+
+    dataView = memoryview(data_)
+
+    if(dataView.itemsize != 1):
+        raise Exception('Data must be made up of one byte items')
+
+    if(dataLen_ > dataView.nbytes):
+        raise Exception('Data length exceeds the size of the data')
+
+    symbols = array('B')
+    symbols.frombytes(dataView.cast('B')[0:dataLen_])
+
+    return symbols
+
+def storeBytes(outputData_, symbols_, dataLen_):
+    """
+    Store byte symbols at the start of outputData_ in one operation. Every symbol must be in the byte range
+
+    :param outputData_: Where the data is stored, an integer array or list or a writable bytes-like object
+    :param symbols_: The symbols to store (integer array)
+    :param dataLen_: The number of symbols to store
+    :return: None
+    """
+
+    try:
+        data = bytes(symbols_[0:dataLen_].tolist())
+    except ValueError:
+        raise Exception('Invalid symbol, not in byte range')
+
+    if(isinstance(outputData_, array)):
+        outputData_[0:dataLen_] = array(outputData_.typecode, list(data))
+    elif(isinstance(outputData_, list)):
+        outputData_[0:dataLen_] = data
+    else:
+        memoryview(outputData_).cast('B')[0:dataLen_] = data
+
+def isNumpyAvailable():
+    """
+    Check if the optional NumPy dependency can be imported
+
+    :return: True if NumPy is available, False otherwise
+    """
+
+    try:
+        import numpy
+    except ImportError:
+        return False
 
-    return int(maxBytes)
+    return True